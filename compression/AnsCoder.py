@@ -0,0 +1,180 @@
+#!/usr/bin/python3
+
+import struct
+import sys
+from array import array
+
+from ArithmeticCoding import SYMBOL_COUNT, get_model_cost
+from HuffmanCoder import BYTE_ESCAPE, BYTE_ESCAPE_BITS, ESCAPE, ESCAPE_BITS
+
+# Frequencies of one model sum up to 2 ** ANS_BITS, decoding looks a symbol up in table of that size
+ANS_BITS = 14
+# States are kept within [STATE_LOW, STATE_LOW << WORD_BITS), whole words are moved in and out of them
+WORD_BITS = 16
+STATE_LOW = 1 << 16
+WORD_MASK = (1 << WORD_BITS) - 1
+# Symbols are coded by states in turn, decoding of consecutive symbols does not depend on each other
+STATES = 4
+STATE = struct.Struct('<I')
+
+
+class AnsCoder:
+    """
+    Static model range variant of asymmetric numeral systems coding of chunks with interleaved states
+
+    Symbol i of chunk is coded by state i % STATES. Encoder goes over chunk backwards and writes
+    16 bit words whenever a state would overflow, decoder reads them forwards, so decoding is
+    a table lookup, a multiplication and at most one word read per symbol. Encoded chunk is its symbol
+    count, final encoder states and words. Symbols missing in model are coded as escape followed by
+    raw code point or byte value in two uniform parts.
+
+    Properties
+    ----------
+    frequencies : dict
+        quantized frequency by symbol, frequencies sum up to a power of two
+    binary : bool
+        notes if chunks are bytes instead of str
+    bits : int
+        frequencies sum up to 2 ** bits
+    intervals : dict
+        (frequency, start, state limit) by symbol, list indexed by byte value in byte mode,
+        state which reaches limit moves its low word out before coding the symbol
+    escape : tuple
+        (frequency, start, state limit) of escape symbol, none if model has no escape
+    escape_bits : int
+        bits of raw symbol following escape
+    decode_table : list
+        (symbol, frequency, slot minus start) for every slot, symbol is none for escape
+    """
+    def __init__(self, frequencies, binary=False):
+        """
+        AnsCoder constructor
+
+        :param frequencies: dict of frequencies quantized to a power of two total
+        :param binary: bool
+        """
+        self.frequencies = frequencies
+        self.binary = binary
+        total = sum(frequencies.values())
+        self.bits = max(total.bit_length() - 1, 0)
+        if total and total != 1 << self.bits:
+            raise ValueError('Frequencies must sum up to a power of two')
+        escape = BYTE_ESCAPE if binary else ESCAPE
+        self.escape = None
+        self.escape_bits = BYTE_ESCAPE_BITS if binary else ESCAPE_BITS
+        self.intervals = [None] * BYTE_ESCAPE if binary else {}
+        self.decode_table = []
+
+        start = 0
+        for symbol in sorted(frequencies):
+            frequency = frequencies[symbol]
+            interval = (frequency, start, ((STATE_LOW >> self.bits) << WORD_BITS) * frequency)
+            decoded = None if symbol == escape else (chr(symbol) if binary else symbol)
+            if decoded is None:
+                self.escape = interval
+            else:
+                self.intervals[symbol] = interval
+            self.decode_table += [(decoded, frequency, slot) for slot in range(frequency)]
+            start += frequency
+
+    def get_cost(self, frequencies) -> float:
+        """
+        Get bits of coding symbols counted in frequencies
+
+        :param frequencies: dict
+        :return: float
+        """
+        escape = BYTE_ESCAPE if self.binary else ESCAPE
+
+        return get_model_cost(self.frequencies, frequencies, escape, self.escape_bits)
+
+    def encode(self, chunk) -> bytes:
+        """
+        Encodes one chunk
+
+        :param chunk: str or bytes
+        :return: bytes
+        """
+        states = [STATE_LOW] * STATES
+        words = array('H')
+        push = words.append
+        bits = self.bits
+        intervals = self.intervals
+        high_bits = self.escape_bits // 2
+        low_bits = self.escape_bits - high_bits
+
+        for position in range(len(chunk) - 1, -1, -1):
+            symbol = chunk[position]
+            state = states[position % STATES]
+            interval = intervals[symbol] if self.binary else intervals.get(symbol)
+            if interval is None:
+                if not self.escape:
+                    raise KeyError(symbol)
+                # raw parts are pushed in reverse, decoder reads escape, high and low part
+                value = symbol if self.binary else ord(symbol)
+                for part, part_bits in ((value & ((1 << low_bits) - 1), low_bits), (value >> low_bits, high_bits)):
+                    if state >= STATE_LOW << (WORD_BITS - part_bits):
+                        push(state & WORD_MASK)
+                        state >>= WORD_BITS
+                    state = (state << part_bits) | part
+                interval = self.escape
+
+            frequency, start, limit = interval
+            if state >= limit:
+                push(state & WORD_MASK)
+                state >>= WORD_BITS
+            quotient, remainder = divmod(state, frequency)
+            states[position % STATES] = (quotient << bits) + remainder + start
+
+        words.reverse()
+        # words are stored little endian
+        if sys.byteorder == 'big':
+            words.byteswap()
+
+        return SYMBOL_COUNT.pack(len(chunk)) + b''.join(STATE.pack(state) for state in states) + words.tobytes()
+
+    def decode(self, chunk) -> str:
+        """
+        Decodes one chunk
+
+        :param chunk: bytes
+        :return: str or bytes
+        """
+        count, = SYMBOL_COUNT.unpack_from(chunk)
+        offset = SYMBOL_COUNT.size
+        states = [STATE.unpack_from(chunk, offset + STATE.size * index)[0] for index in range(STATES)]
+        words = array('H')
+        words.frombytes(chunk[offset + STATE.size * STATES:])
+        if sys.byteorder == 'big':
+            words.byteswap()
+        position = 0
+        bits = self.bits
+        mask = (1 << bits) - 1
+        decode_table = self.decode_table
+        high_bits = self.escape_bits // 2
+        low_bits = self.escape_bits - high_bits
+        output = []
+        append = output.append
+
+        for index in range(count):
+            state = states[index % STATES]
+            symbol, frequency, bias = decode_table[state & mask]
+            state = frequency * (state >> bits) + bias
+            if state < STATE_LOW:
+                state = (state << WORD_BITS) | words[position]
+                position += 1
+            if symbol is None:
+                value = 0
+                for part_bits in (high_bits, low_bits):
+                    value = (value << part_bits) | (state & ((1 << part_bits) - 1))
+                    state >>= part_bits
+                    if state < STATE_LOW:
+                        state = (state << WORD_BITS) | words[position]
+                        position += 1
+                symbol = chr(value)
+            states[index % STATES] = state
+            append(symbol)
+
+        if self.binary:
+            return ''.join(output).encode('latin-1')
+        return ''.join(output)
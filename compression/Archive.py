@@ -0,0 +1,641 @@
+#!/usr/bin/python3
+
+import os
+import struct
+import zlib
+from collections import namedtuple
+
+# 0xfe never appears in UTF-8, so version 1 files which start with file name never match
+MAGIC = b'\xfeGMA'
+VERSION = 2
+# trained dictionary file is a header of the same layout with magic of its own
+DICTIONARY_MAGIC = b'\xfeGMD'
+
+# magic, version, flags, size of header sections which follow
+HEADER = struct.Struct('<4sBBI')
+# section type, section size
+SECTION = struct.Struct('<BI')
+# frame type, compressed size, uncompressed size
+FRAME = struct.Struct('<BII')
+# frame offset, compressed size, uncompressed size, newline count, offset of code table frame or 0 for header codes,
+# CRC32 of chunk bytes before encoding, UTF-8 bytes of text chunks
+INDEX_FIELDS = (
+    ('offset', 'Q'), ('data_size', 'I'), ('size', 'I'), ('lines', 'I'), ('table', 'Q'), ('checksum', 'I')
+)
+INDEX_ENTRY = struct.Struct('<' + ''.join(field_format for _, field_format in INDEX_FIELDS))
+# entry count, size of one entry
+INDEX = struct.Struct('<IH')
+# index offset, magic
+FOOTER = struct.Struct('<Q4s')
+# order and maximum count of contexts of context model
+CONTEXT_MODEL = struct.Struct('<BI')
+# CRC32 of whole content before encoding, payload of end frame
+CHECKSUM = struct.Struct('<I')
+# size, creation time, modification time and name size of archived file
+MEMBER = struct.Struct('<QddH')
+# id of trained dictionary, CRC32 of its code table
+DICTIONARY_ID = struct.Struct('<I')
+
+SECTION_PROPERTIES = 1
+SECTION_CODE_LENGTHS = 2
+SECTION_BYTE_CODE_LENGTHS = 3
+# code length of escape symbol, present if codes were estimated from samples
+SECTION_ESCAPE = 4
+# multi character tokens and their code lengths
+SECTION_VOCABULARY = 5
+# quantized symbol frequencies of arithmetic or asymmetric numeral systems coder
+SECTION_FREQUENCIES = 6
+# parameters of adaptive context model
+SECTION_CONTEXT_MODEL = 7
+# names, sizes and times of archived files, content of all files follows each other in chunks
+SECTION_MEMBERS = 8
+# id of trained dictionary holding code lengths and escape, archive leaves their sections out
+SECTION_DICTIONARY = 9
+# CRC32 of magic, version, flags and all other sections, always the last section
+SECTION_HEADER_CHECKSUM = 10
+
+# archive holds raw bytes of input file instead of UTF-8 text
+FLAG_BYTES = 1
+# every chunk is coded with code table frame preceding it instead of header codes
+FLAG_BLOCKS = 2
+# every chunk holds literals and matches coded with code tables of the chunk
+FLAG_MATCHES = 4
+# chunks are arithmetic coded with header frequencies instead of huffman codes
+FLAG_ARITHMETIC = 8
+# chunks are arithmetic coded with context model built anew for every chunk
+FLAG_CONTEXT = 16
+# chunks are coded with asymmetric numeral systems with header frequencies
+FLAG_ANS = 32
+# every chunk starts with id of its codec, chunks estimated to gain nothing by coding are stored
+FLAG_CODECS = 64
+# archive holds no model, every chunk is stored
+FLAG_STORED = 128
+
+FRAME_END = 0
+FRAME_CHUNK = 1
+FRAME_TABLE = 2
+
+IndexEntry = namedtuple('IndexEntry', [field for field, _ in INDEX_FIELDS])
+# file of multiple file archive, name is relative path with / separators, size is in bytes,
+# name of empty directory ends with / and its size is 0
+Member = namedtuple('Member', ['name', 'size', 'created', 'modified'])
+
+
+def pack_sections(sections) -> bytes:
+    """
+    Packs type and size of every header section followed by its payload
+
+    :param sections: dict of section payloads by section type
+    :return: bytes
+    """
+    return b''.join(SECTION.pack(section, len(data)) + data for section, data in sections.items())
+
+
+def unpack_sections(body) -> dict:
+    """
+    Unpacks header sections packed by pack_sections
+
+    :param body: bytes
+    :return: dict of section payloads by section type
+    """
+    sections = {}
+    position = 0
+    while position < len(body):
+        if position + SECTION.size > len(body):
+            raise ValueError('Header section is truncated')
+        section, section_size = SECTION.unpack_from(body, position)
+        position += SECTION.size
+        if position + section_size > len(body):
+            raise ValueError('Header section is truncated')
+        sections[section] = body[position:position + section_size]
+        position += section_size
+
+    return sections
+
+
+def pack_properties(file_name, created, modified) -> bytes:
+    """
+    Packs document properties into header section
+
+    :param file_name: str
+    :param created: float
+    :param modified: float
+    :return: bytes
+    """
+    return struct.pack('<dd', created, modified) + file_name.encode()
+
+
+def unpack_properties(data) -> dict:
+    """
+    Unpacks document properties from header section
+
+    :param data: bytes
+    :return: dict
+    """
+    created, modified = struct.unpack_from('<dd', data)
+
+    return {'f_name': data[16:].decode(), 'f_created': created, 'f_modified': modified}
+
+
+def pack_code_lengths(code_lengths) -> bytes:
+    """
+    Packs symbol count, UTF-8 size of all symbols, code length per symbol and all symbols
+
+    :param code_lengths: list of (symbol, length) tuples in canonical order
+    :return: bytes
+    """
+    symbols = ''.join(symbol for symbol, _ in code_lengths).encode()
+
+    return struct.pack('<II', len(code_lengths), len(symbols)) \
+        + bytes(length for _, length in code_lengths) \
+        + symbols
+
+
+def unpack_code_lengths(data) -> list:
+    """
+    Unpacks code lengths packed by pack_code_lengths
+
+    :param data: bytes
+    :return: list of (symbol, length) tuples in canonical order
+    """
+    symbol_count, symbols_size = struct.unpack_from('<II', data)
+    lengths = data[8:8 + symbol_count]
+    symbols = data[8 + symbol_count:8 + symbol_count + symbols_size].decode()
+
+    return list(zip(symbols, lengths))
+
+
+def pack_byte_code_lengths(code_lengths) -> bytes:
+    """
+    Packs code length of every byte value, zero length notes unused byte
+
+    :param code_lengths: list of (byte, length) tuples
+    :return: bytes
+    """
+    lengths = bytearray(256)
+    for symbol, length in code_lengths:
+        lengths[symbol] = length
+
+    return bytes(lengths)
+
+
+def unpack_byte_code_lengths(data) -> list:
+    """
+    Unpacks code lengths packed by pack_byte_code_lengths
+
+    :param data: bytes
+    :return: list of (byte, length) tuples in canonical order
+    """
+    return sorted(
+        ((symbol, length) for symbol, length in enumerate(data) if length),
+        key=lambda item: (item[1], item[0])
+    )
+
+
+def pack_vocabulary(code_lengths) -> bytes:
+    """
+    Packs token count, code length per token and sorted tokens, every token stores size of UTF-8 prefix
+    shared with previous token, size of the rest and the rest
+
+    :param code_lengths: list of (token, length) tuples
+    :return: bytes
+    """
+    code_lengths = sorted(code_lengths)
+    data = bytearray(struct.pack('<I', len(code_lengths)))
+    data += bytes(length for _, length in code_lengths)
+
+    previous = b''
+    for token, _ in code_lengths:
+        token = token.encode()
+        shared = 0
+        while shared < min(len(token), len(previous), 255) and token[shared] == previous[shared]:
+            shared += 1
+        data += bytes((shared, len(token) - shared)) + token[shared:]
+        previous = token
+
+    return bytes(data)
+
+
+def unpack_vocabulary(data) -> list:
+    """
+    Unpacks tokens packed by pack_vocabulary
+
+    :param data: bytes
+    :return: list of (token, length) tuples sorted by token
+    """
+    count, = struct.unpack_from('<I', data)
+    lengths = data[4:4 + count]
+    position = 4 + count
+
+    tokens = []
+    previous = b''
+    for _ in range(count):
+        shared, rest = data[position], data[position + 1]
+        previous = previous[:shared] + data[position + 2:position + 2 + rest]
+        position += 2 + rest
+        tokens.append(previous.decode())
+
+    return list(zip(tokens, lengths))
+
+
+def pack_members(members) -> bytes:
+    """
+    Packs member count and size, times and UTF-8 name of every member
+
+    :param members: list of Member
+    :return: bytes
+    """
+    data = bytearray(struct.pack('<I', len(members)))
+    for member in members:
+        name = member.name.encode()
+        data += MEMBER.pack(member.size, member.created, member.modified, len(name)) + name
+
+    return bytes(data)
+
+
+def unpack_members(data) -> list:
+    """
+    Unpacks members packed by pack_members
+
+    :param data: bytes
+    :return: list of Member
+    """
+    count, = struct.unpack_from('<I', data)
+    position = 4
+
+    members = []
+    for _ in range(count):
+        size, created, modified, name_size = MEMBER.unpack_from(data, position)
+        position += MEMBER.size
+        members.append(Member(data[position:position + name_size].decode(), size, created, modified))
+        position += name_size
+
+    return members
+
+
+def pack_frequencies(frequencies, escape_frequency=0, binary=False) -> bytes:
+    """
+    Packs symbol count, size of all symbols, escape frequency, frequency per symbol and all symbols,
+    symbols are UTF-8 characters or single bytes if binary
+
+    :param frequencies: list of (symbol, frequency) tuples
+    :param escape_frequency: int, 0 if there is no escape symbol
+    :param binary: bool
+    :return: bytes
+    """
+    if binary:
+        symbols = bytes(symbol for symbol, _ in frequencies)
+    else:
+        symbols = ''.join(symbol for symbol, _ in frequencies).encode()
+
+    return struct.pack('<III', len(frequencies), len(symbols), escape_frequency) \
+        + struct.pack('<{}I'.format(len(frequencies)), *(frequency for _, frequency in frequencies)) \
+        + symbols
+
+
+def unpack_frequencies(data, binary=False) -> tuple:
+    """
+    Unpacks frequencies packed by pack_frequencies
+
+    :param data: bytes
+    :param binary: bool
+    :return: list of (symbol, frequency) tuples, escape frequency
+    """
+    symbol_count, symbols_size, escape_frequency = struct.unpack_from('<III', data)
+    frequencies = struct.unpack_from('<{}I'.format(symbol_count), data, 12)
+    symbols = data[12 + 4 * symbol_count:12 + 4 * symbol_count + symbols_size]
+    if not binary:
+        symbols = symbols.decode()
+
+    return list(zip(symbols, frequencies)), escape_frequency
+
+
+def get_checksum(data) -> int:
+    """
+    Get CRC32 of data
+
+    :param data: bytes
+    :return: int
+    """
+    return zlib.crc32(data)
+
+
+def multiply_matrix(matrix, vector) -> int:
+    """
+    Multiplies 32 by 32 bit matrix over GF(2) by vector
+
+    :param matrix: list of 32 columns
+    :param vector: int
+    :return: int
+    """
+    product = 0
+    column = 0
+    while vector:
+        if vector & 1:
+            product ^= matrix[column]
+        vector >>= 1
+        column += 1
+
+    return product
+
+
+def combine_checksums(checksum, next_checksum, next_size) -> int:
+    """
+    Get CRC32 of two joined parts from CRC32 of each part, first checksum is shifted by zero bytes of
+    the second part length with squared zero bit operator, like crc32_combine of zlib
+
+    :param checksum: int, CRC32 of first part
+    :param next_checksum: int, CRC32 of second part
+    :param next_size: int, byte length of second part
+    :return: int
+    """
+    if not next_size:
+        return checksum
+
+    # operator of one zero bit, then of two and four zero bits
+    odd = [0xedb88320] + [1 << bit for bit in range(31)]
+    even = [multiply_matrix(odd, column) for column in odd]
+    odd = [multiply_matrix(even, column) for column in even]
+    while next_size:
+        # operators of one zero byte, two bytes, four bytes and so on
+        even = [multiply_matrix(odd, column) for column in odd]
+        if next_size & 1:
+            checksum = multiply_matrix(even, checksum)
+        next_size >>= 1
+        if not next_size:
+            break
+        odd = [multiply_matrix(even, column) for column in even]
+        if next_size & 1:
+            checksum = multiply_matrix(odd, checksum)
+        next_size >>= 1
+
+    return checksum ^ next_checksum
+
+
+def is_archive(data_stream) -> bool:
+    """
+    Returns true if data stream starts with versioned archive, stream position is not changed
+
+    :param data_stream: BufferedReader
+    :return: bool
+    """
+    return data_stream.peek(len(MAGIC))[:len(MAGIC)] == MAGIC
+
+
+def is_entry_of_frame(entry, offset, data_size, size, table) -> bool:
+    """
+    Returns true if index entry describes chunk frame
+
+    :param entry: IndexEntry
+    :param offset: int, offset of chunk frame
+    :param data_size: int
+    :param size: int
+    :param table: int, offset of code table frame preceding chunk, 0 if there is none
+    :return: bool
+    """
+    return entry.offset == offset and entry.data_size == data_size and entry.size == size and entry.table == table
+
+
+class ArchiveWriter:
+    """
+    Writes versioned archive: header sections, length prefixed chunk and code table frames and footer index
+
+    Properties
+    ----------
+    data_stream : BufferedWriter
+        output stream
+    index : list
+        IndexEntry of every written chunk
+    checksum : int
+        CRC32 of content of all written chunks
+    position : int
+        bytes written so far, offsets are counted instead of asked from stream so it may be a pipe
+    """
+    def __init__(self, data_stream):
+        """
+        ArchiveWriter constructor
+
+        :param data_stream: BufferedWriter
+        """
+        self.data_stream = data_stream
+        self.index = []
+        self.checksum = 0
+        self.position = 0
+
+    def write(self, data) -> None:
+        """
+        Writes data to output stream
+
+        :param data: bytes
+        :return: None
+        """
+        self.data_stream.write(data)
+        self.position += len(data)
+
+    def write_header(self, sections, flags=0) -> None:
+        """
+        Writes archive header, checksum of header goes last
+
+        :param sections: dict of section payloads by section type
+        :param flags: int
+        :return: None
+        """
+        body = pack_sections(sections)
+        checksum = CHECKSUM.pack(get_checksum(MAGIC + bytes((VERSION, flags)) + body))
+        body += pack_sections({SECTION_HEADER_CHECKSUM: checksum})
+        self.write(HEADER.pack(MAGIC, VERSION, flags, len(body)))
+        self.write(body)
+
+    def write_table(self, data) -> int:
+        """
+        Writes code table of following chunks as frame
+
+        :param data: bytes
+        :return: int, offset of table frame
+        """
+        offset = self.position
+        self.write(FRAME.pack(FRAME_TABLE, len(data), len(data)))
+        self.write(data)
+
+        return offset
+
+    def write_chunk(self, data, size, lines=0, table=0, checksum=0, raw_size=None) -> None:
+        """
+        Writes one encoded chunk as frame
+
+        :param data: bytes
+        :param size: int, size of chunk before encoding
+        :param lines: int, count of newlines in chunk before encoding
+        :param table: int, offset of code table frame, 0 if chunk is coded with header codes
+        :param checksum: int, CRC32 of chunk before encoding
+        :param raw_size: int, byte length of chunk before encoding, size if none
+        :return: None
+        """
+        self.checksum = combine_checksums(self.checksum, checksum, size if raw_size is None else raw_size)
+        self.index.append(IndexEntry(self.position, len(data), size, lines, table, checksum))
+        self.write(FRAME.pack(FRAME_CHUNK, len(data), size))
+        self.write(data)
+
+    def write_footer(self) -> None:
+        """
+        Writes end frame with checksum of whole content and index of all chunks
+
+        :return: None
+        """
+        self.write(FRAME.pack(FRAME_END, CHECKSUM.size, 0))
+        self.write(CHECKSUM.pack(self.checksum))
+        index_offset = self.position
+        self.write(INDEX.pack(len(self.index), INDEX_ENTRY.size))
+        self.write(b''.join(INDEX_ENTRY.pack(*entry) for entry in self.index))
+        self.write(FOOTER.pack(index_offset, MAGIC))
+
+
+class ArchiveReader:
+    """
+    Reads versioned archive written by ArchiveWriter
+
+    Properties
+    ----------
+    data_stream : BufferedReader
+        input stream
+    version : int
+        archive format version
+    flags : int
+        archive flags
+    sections : dict
+        header section payloads by section type
+    table : bytes
+        payload of the last code table frame read by read_chunks
+    checksum : int
+        CRC32 of whole content read from end frame by read_chunks, none until end frame is read
+    """
+    def __init__(self, data_stream):
+        """
+        ArchiveReader constructor
+
+        :param data_stream: BufferedReader
+        """
+        self.data_stream = data_stream
+        self.version = 0
+        self.flags = 0
+        self.sections = {}
+        self.table = None
+        self.checksum = None
+
+    def read_header(self) -> dict:
+        """
+        Reads archive header and verifies its checksum, leaves stream at the first frame
+
+        :return: dict
+        """
+        header = self.data_stream.read(HEADER.size)
+        if len(header) < HEADER.size:
+            raise ValueError('Not an archive')
+        magic, self.version, self.flags, size = HEADER.unpack(header)
+        if magic != MAGIC:
+            raise ValueError('Not an archive')
+        if self.version != VERSION:
+            raise ValueError('Unsupported archive version: {}'.format(self.version))
+
+        body = self.data_stream.read(size)
+        if len(body) < size:
+            raise ValueError('Archive is truncated')
+        self.sections = unpack_sections(body)
+        if SECTION_HEADER_CHECKSUM not in self.sections:
+            raise ValueError('Header checksum not found')
+        payload = self.sections.pop(SECTION_HEADER_CHECKSUM)
+        checksum = get_checksum(MAGIC + bytes((self.version, self.flags)) + body[:-SECTION.size - CHECKSUM.size])
+        if payload != CHECKSUM.pack(checksum):
+            raise ValueError('Header checksum mismatch')
+
+        return self.sections
+
+    def read_chunks(self, index=None):
+        """
+        Reads encoded chunks one by one until end frame, code table frames only replace table. Frames are
+        checked against index if it is given, index entries which do not describe their frame are refused
+
+        :param index: list of IndexEntry read by read_index, none if stream cannot seek
+        :return: Generator of (encoded chunk, uncompressed size) tuples
+        """
+        position = self.data_stream.tell() if index is not None else None
+        table_offset = 0
+        count = 0
+        while True:
+            header = self.data_stream.read(FRAME.size)
+            if len(header) < FRAME.size:
+                raise ValueError('Archive is truncated')
+            frame, data_size, size = FRAME.unpack(header)
+            if frame == FRAME_END:
+                if data_size != CHECKSUM.size:
+                    raise ValueError('Archive end frame is corrupted')
+                checksum = self.data_stream.read(data_size)
+                if len(checksum) < data_size:
+                    raise ValueError('Archive is truncated')
+                self.checksum, = CHECKSUM.unpack(checksum)
+                if index is not None and count != len(index):
+                    raise ValueError('Archive index holds {} chunks, archive holds {}'.format(len(index), count))
+                return
+            data = self.data_stream.read(data_size)
+            if len(data) < data_size:
+                raise ValueError('Archive is truncated')
+            if frame == FRAME_TABLE:
+                self.table = data
+                if position is not None:
+                    table_offset = position
+                    position += FRAME.size + data_size
+                continue
+            if index is not None:
+                if count >= len(index) or not is_entry_of_frame(index[count], position, data_size, size, table_offset):
+                    raise ValueError('Archive index does not match chunk at offset {}'.format(position))
+                position += FRAME.size + data_size
+                count += 1
+            yield data, size
+
+    def read_index(self) -> list:
+        """
+        Reads footer index of all chunks, stream position is kept
+
+        :return: list of IndexEntry
+        """
+        position = self.data_stream.tell()
+        self.data_stream.seek(-FOOTER.size, os.SEEK_END)
+        index_offset, magic = FOOTER.unpack(self.data_stream.read(FOOTER.size))
+        if magic != MAGIC:
+            raise ValueError('Archive index not found')
+
+        self.data_stream.seek(index_offset)
+        count, entry_size = INDEX.unpack(self.data_stream.read(INDEX.size))
+        if entry_size != INDEX_ENTRY.size:
+            raise ValueError('Archive index entries of {} bytes are not supported'.format(entry_size))
+        data = self.data_stream.read(count * entry_size)
+        self.data_stream.seek(position)
+        if len(data) < count * entry_size:
+            raise ValueError('Archive index is truncated')
+
+        return [IndexEntry(*entry) for entry in INDEX_ENTRY.iter_unpack(data)]
+
+    def read_chunk(self, entry) -> bytes:
+        """
+        Reads one encoded chunk described by index entry
+
+        :param entry: IndexEntry
+        :return: bytes
+        """
+        self.data_stream.seek(entry.offset + FRAME.size)
+
+        return self.data_stream.read(entry.data_size)
+
+    def read_table(self, offset) -> bytes:
+        """
+        Reads code table frame at given offset
+
+        :param offset: int
+        :return: bytes
+        """
+        self.data_stream.seek(offset)
+        frame, data_size, _ = FRAME.unpack(self.data_stream.read(FRAME.size))
+        if frame != FRAME_TABLE:
+            raise ValueError('Code table not found at offset {}'.format(offset))
+
+        return self.data_stream.read(data_size)
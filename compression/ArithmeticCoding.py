@@ -1,132 +1,359 @@
 #!/usr/bin/python3
 
-import fractions
-import re
-import progressbar
+import math
+import struct
 
+from HuffmanCoder import BYTE_ESCAPE, BYTE_ESCAPE_BITS, ESCAPE, ESCAPE_BITS
 
-def calc_numerator(message) -> str:
-    return re.sub(r'10*', '', message, 1)
+# Frequencies of one model sum up to 2 ** FREQUENCY_BITS, decoding looks a symbol up in table of that size
+FREQUENCY_BITS = 16
+# Range is kept above 2 ** TOP_BITS, one byte is shifted out whenever it falls below
+TOP_BITS = 24
+RANGE_MASK = 0xffffffff
+# Count of symbols in chunk which precedes coded data
+SYMBOL_COUNT = struct.Struct('<I')
 
 
-def calc_denominator(message) -> str:
-    output = '0b1'
-    bits = len(message) - 2
-    for bit in range(bits - 1):
-        output += '0'
+def quantize_frequencies(frequencies, bits=FREQUENCY_BITS, escape=None) -> dict:
+    """
+    Scales frequencies to sum up to 2 ** bits, every symbol keeps frequency of at least 1. If there are
+    more symbols than the total, the rarest are folded into escape so that at most half of the total
+    is taken by frequencies of 1
 
-    return output
+    :param frequencies: dict
+    :param bits: int
+    :param escape: str or int, escape symbol, none if symbols cannot be escaped
+    :return: dict
+    """
+    target = 1 << bits
+    if len(frequencies) > target:
+        if escape is None:
+            raise ValueError('Model of {} bits cannot hold {} symbols'.format(bits, len(frequencies)))
+        by_count = sorted((symbol for symbol in frequencies if symbol != escape),
+                          key=lambda symbol: (-frequencies[symbol], symbol))
+        kept = by_count[:target // 2 - 1]
+        folded = frequencies.get(escape, 0) + sum(frequencies[symbol] for symbol in by_count[len(kept):])
+        frequencies = {symbol: frequencies[symbol] for symbol in kept}
+        frequencies[escape] = folded
+    total = sum(frequencies.values())
+    if not total:
+        return {}
+
+    quantized = {symbol: max(count * target // total, 1) for symbol, count in frequencies.items()}
+    # rounding error is spread over the most frequent symbols, they lose the least by it
+    by_count = sorted(quantized, key=lambda symbol: (-frequencies[symbol], symbol))
+    difference = target - sum(quantized.values())
+    while difference:
+        for symbol in by_count:
+            if difference > 0:
+                quantized[symbol] += 1
+                difference -= 1
+            elif quantized[symbol] > 1:
+                quantized[symbol] -= 1
+                difference += 1
+            if not difference:
+                break
+
+    return quantized
 
 
-def get_letter_dictionary(text) -> dict:
-    letters = list(text)
-    dictionary = {}
+def get_model_cost(model, frequencies, escape, escape_bits) -> float:
+    """
+    Get bits of coding symbols counted in frequencies with static model, symbols missing in model are escaped,
+    infinite if model has no escape
 
-    while letters:
-        letter = letters[0]
-        letter_count = letters.count(letter)
-        letters = list(filter(lambda x: x != letter, letters))
-        dictionary[letter] = letter_count
+    :param model: dict of frequencies by symbol
+    :param frequencies: dict of counted symbols
+    :param escape: str or int, escape symbol
+    :param escape_bits: int, bits of raw symbol following escape
+    :return: float
+    """
+    total = sum(model.values())
+    bits = 0.0
+    for symbol, count in frequencies.items():
+        if symbol in model:
+            bits += count * math.log2(total / model[symbol])
+        elif escape in model:
+            bits += count * (math.log2(total / model[escape]) + escape_bits)
+        else:
+            return math.inf
 
-    return dictionary
+    return bits
 
 
-class ArithmeticCoding:
+class RangeEncoder:
+    """
+    Integer range encoder, carry is propagated through the last byte and the run of 0xff bytes held back
 
+    Properties
+    ----------
+    low : int
+        start of range, 33 bits wide while carry is pending
+    range : int
+        width of range, 32 bits
+    cache : int
+        last byte not yet written, it may still receive carry
+    cache_size : int
+        count of held back bytes, cache and 0xff bytes following it
+    output : bytearray
+        written bytes
+    """
     def __init__(self):
-        self.interval_start = {}
-        self.width = {}
-
-    def calc_intervals(self, symbol_counts, message_length) -> None:
-        start_interval = fractions.Fraction(0, message_length)
-
-        for letter in symbol_counts:
-            self.interval_start[letter] = start_interval
-            self.width[letter] = fractions.Fraction(symbol_counts[letter], message_length)
-            start_interval = start_interval + self.width[letter]
-
-    def encode(self, message, message_length) -> str:
-        print('Encoding message')
-        bar = progressbar.ProgressBar(
-            maxval=100,
-            widgets=[progressbar.Bar('=', '[', ']'), ' ', progressbar.Percentage()]
-        )
-        bar.start()
-        bar_counter = 0
-        bar_increment = 100 / message_length
-
-        start = fractions.Fraction(0, message_length)
-        width = fractions.Fraction(message_length, message_length)
-
-        for letter in message:
-            bar_counter += bar_increment
-            bar.update(bar_counter)
-            start += self.interval_start[letter] * width
-            width *= self.width[letter]
-
-        bar.finish()
-        end = start + width
-
-        fraction = fractions.Fraction()
-        denominator = 1
-        while True:
-            if start <= fraction < end:
-                break
+        """
+        RangeEncoder constructor
+        """
+        self.low = 0
+        self.range = RANGE_MASK
+        self.cache = 0
+        self.cache_size = 1
+        self.output = bytearray()
 
-            numerator = ((start.numerator * denominator) // start.denominator) + 1
-            fraction = fractions.Fraction(numerator, denominator)
-
-            denominator *= 2
-
-        fraction_xor = fraction.numerator ^ fraction.denominator
-        numerator_binary = bin(fraction_xor)
-        return numerator_binary
-
-    def decode(self, message, message_length) -> str:
-        print('Decoding message')
-        bar = progressbar.ProgressBar(
-            maxval=100,
-            widgets=[progressbar.Bar('=', '[', ']'), ' ', progressbar.Percentage()]
-        )
-        bar.start()
-        bar_counter = 0
-        bar_increment = 100 / message_length
-
-        numerator_adjusted = calc_numerator(message)
-        denominator_adjusted = calc_denominator(message)
-        numerator = int(numerator_adjusted, 2)
-        denominator = int(denominator_adjusted, 2)
-        input_fraction = fractions.Fraction(numerator, denominator)
-        output = ''
-
-        while len(output) < message_length:
-            bar_counter += bar_increment
-            bar.update(bar_counter)
-            for letter in self.interval_start:
-                if 0 <= input_fraction - self.interval_start[letter] < self.width[letter]:
-                    input_fraction = (input_fraction - self.interval_start[letter]) / self.width[letter]
-                    output += letter
-
-        bar.finish()
-        return output
-
-
-def main():
-    with open('extracted.txt', 'r') as rf:
-        while True:
-            text = rf.read(300)
-            if not text:
-                break
-            dictionary = get_letter_dictionary(text)
-            total_symbols = len(text)
-            coding = ArithmeticCoding()
-            coding.calc_intervals(dictionary, total_symbols)
-            encoded_message = coding.encode(text, total_symbols)
-            print(encoded_message)
-            print('average character size encoded: {} bits'.format(len(encoded_message) / total_symbols))
-            decoded_message = coding.decode(encoded_message, total_symbols)
-            print(decoded_message)
-
-
-if __name__ == "__main__":
-    main()
+    def shift_low(self) -> None:
+        """
+        Moves the top byte of low out, bytes are held back while a carry could still change them
+
+        :return: None
+        """
+        low = self.low
+        if low < 0xff000000 or low > RANGE_MASK:
+            carry = low >> 32
+            self.output.append((self.cache + carry) & 0xff)
+            self.output += bytes(((0xff + carry) & 0xff,)) * (self.cache_size - 1)
+            self.cache_size = 0
+            self.cache = (low >> 24) & 0xff
+        self.cache_size += 1
+        self.low = (low & 0x00ffffff) << 8
+
+    def encode(self, start, size, bits) -> None:
+        """
+        Narrows range to interval of a symbol, frequencies of model sum up to 2 ** bits
+
+        :param start: int, cumulative frequency of symbols before the symbol
+        :param size: int, frequency of the symbol
+        :param bits: int
+        :return: None
+        """
+        step = self.range >> bits
+        self.low += step * start
+        self.range = step * size
+        while self.range < 1 << TOP_BITS:
+            self.range <<= 8
+            self.shift_low()
+
+    def encode_frequency(self, start, size, total) -> None:
+        """
+        Narrows range to interval of a symbol, frequencies of model sum up to any total below 2 ** TOP_BITS
+
+        :param start: int, cumulative frequency of symbols before the symbol
+        :param size: int, frequency of the symbol
+        :param total: int
+        :return: None
+        """
+        step = self.range // total
+        self.low += step * start
+        self.range = step * size
+        while self.range < 1 << TOP_BITS:
+            self.range <<= 8
+            self.shift_low()
+
+    def finish(self) -> bytes:
+        """
+        Writes all bytes of low needed to identify final range
+
+        :return: bytes
+        """
+        for _ in range(5):
+            self.shift_low()
+
+        return bytes(self.output)
+
+
+class RangeDecoder:
+    """
+    Integer range decoder of data written by RangeEncoder
+
+    Properties
+    ----------
+    data : bytes
+        encoded data
+    position : int
+        position of the next byte read from data, bytes past the end are read as 0
+    code : int
+        encoded value relative to start of range
+    range : int
+        width of range, 32 bits
+    step : int
+        width of unit interval computed by the last get_value call
+    """
+    def __init__(self, data):
+        """
+        RangeDecoder constructor
+
+        :param data: bytes
+        """
+        self.data = data
+        # the first byte is cache written before any carry could happen, it is always 0
+        self.code = int.from_bytes(data[1:5].ljust(4, b'\x00'), 'big')
+        self.position = 5
+        self.range = RANGE_MASK
+        self.step = 0
+
+    def get_value(self, bits) -> int:
+        """
+        Get cumulative frequency which points at the next symbol, frequencies sum up to 2 ** bits
+
+        :param bits: int
+        :return: int
+        """
+        self.step = self.range >> bits
+
+        return min(self.code // self.step, (1 << bits) - 1)
+
+    def get_frequency(self, total) -> int:
+        """
+        Get cumulative frequency which points at the next symbol, frequencies sum up to total
+
+        :param total: int
+        :return: int
+        """
+        self.step = self.range // total
+
+        return min(self.code // self.step, total - 1)
+
+    def remove(self, start, size) -> None:
+        """
+        Narrows range to interval of decoded symbol the same way encoder did
+
+        :param start: int
+        :param size: int
+        :return: None
+        """
+        self.code -= self.step * start
+        self.range = self.step * size
+        while self.range < 1 << TOP_BITS:
+            byte = self.data[self.position] if self.position < len(self.data) else 0
+            self.code = ((self.code << 8) | byte) & RANGE_MASK
+            self.range <<= 8
+            self.position += 1
+
+
+class ArithmeticCoder:
+    """
+    Static model arithmetic coding of chunks with integer range coder
+
+    Model quantized to 2 ** FREQUENCY_BITS is shared by all chunks, every encoded chunk is its symbol count
+    followed by range coded data. Decoding finds symbol of every cumulative frequency in a single table lookup.
+    Frequencies estimated from a sample may hold escape symbol, symbols missing in model are encoded as escape
+    followed by raw code point or byte value.
+
+    Properties
+    ----------
+    frequencies : dict
+        quantized frequency by symbol
+    binary : bool
+        notes if chunks are bytes instead of str
+    intervals : dict
+        (start, size) by symbol, list indexed by byte value in byte mode
+    escape : tuple
+        (start, size) of escape symbol, none if model has no escape
+    escape_bits : int
+        bits of raw symbol following escape
+    lookup : list
+        (symbol, start, size) for every cumulative frequency, symbol is none for escape
+    """
+    def __init__(self, frequencies, binary=False):
+        """
+        ArithmeticCoder constructor
+
+        :param frequencies: dict of quantized frequencies
+        :param binary: bool
+        """
+        self.frequencies = frequencies
+        self.binary = binary
+        escape = BYTE_ESCAPE if binary else ESCAPE
+        self.escape = None
+        self.escape_bits = BYTE_ESCAPE_BITS if binary else ESCAPE_BITS
+        self.intervals = [None] * BYTE_ESCAPE if binary else {}
+        self.lookup = []
+
+        start = 0
+        for symbol in sorted(frequencies):
+            size = frequencies[symbol]
+            if symbol == escape:
+                self.escape = (start, size)
+                self.lookup += [(None, start, size)] * size
+            else:
+                self.intervals[symbol] = (start, size)
+                self.lookup += [(chr(symbol) if binary else symbol, start, size)] * size
+            start += size
+
+    def get_cost(self, frequencies) -> float:
+        """
+        Get bits of coding symbols counted in frequencies
+
+        :param frequencies: dict
+        :return: float
+        """
+        escape = BYTE_ESCAPE if self.binary else ESCAPE
+
+        return get_model_cost(self.frequencies, frequencies, escape, self.escape_bits)
+
+    def encode(self, chunk) -> bytes:
+        """
+        Encodes one chunk
+
+        :param chunk: str or bytes
+        :return: bytes
+        """
+        encoder = RangeEncoder()
+        encode = encoder.encode
+        intervals = self.intervals
+
+        for symbol in chunk:
+            interval = intervals[symbol] if self.binary else intervals.get(symbol)
+            if interval:
+                encode(interval[0], interval[1], FREQUENCY_BITS)
+                continue
+            if not self.escape:
+                raise KeyError(symbol)
+            # raw value is split in two parts, each coded as uniform value
+            value = symbol if self.binary else ord(symbol)
+            high_bits = self.escape_bits // 2
+            low_bits = self.escape_bits - high_bits
+            encode(self.escape[0], self.escape[1], FREQUENCY_BITS)
+            encode(value >> low_bits, 1, high_bits)
+            encode(value & ((1 << low_bits) - 1), 1, low_bits)
+
+        return SYMBOL_COUNT.pack(len(chunk)) + encoder.finish()
+
+    def decode(self, chunk) -> str:
+        """
+        Decodes one chunk
+
+        :param chunk: bytes
+        :return: str or bytes
+        """
+        count, = SYMBOL_COUNT.unpack_from(chunk)
+        decoder = RangeDecoder(chunk[SYMBOL_COUNT.size:])
+        get_value = decoder.get_value
+        remove = decoder.remove
+        lookup = self.lookup
+        high_bits = self.escape_bits // 2
+        low_bits = self.escape_bits - high_bits
+        output = []
+        append = output.append
+
+        for _ in range(count):
+            symbol, start, size = lookup[get_value(FREQUENCY_BITS)]
+            remove(start, size)
+            if symbol is None:
+                high = get_value(high_bits)
+                remove(high, 1)
+                low = get_value(low_bits)
+                remove(low, 1)
+                symbol = chr((high << low_bits) | low)
+            append(symbol)
+
+        if self.binary:
+            return ''.join(output).encode('latin-1')
+        return ''.join(output)
@@ -0,0 +1,492 @@
+#!/usr/bin/python3
+
+import argparse
+import bz2
+import importlib.util
+import json
+import lzma
+import multiprocessing
+import os
+import platform
+import sys
+import tempfile
+import time
+import zlib
+from collections import namedtuple
+from contextlib import redirect_stdout
+
+try:
+    import resource
+except ImportError:
+    # peak memory is not measured where resource module is missing
+    resource = None
+
+from Codecs import CODEC_ARITHMETIC, CODEC_HUFFMAN, CODEC_NAMES, CODEC_STORED
+from Huffman import Huffman
+from HuffmanPartial import CODER_ARITHMETIC, HuffmanPartial
+
+# corpus generator lives next to its words
+GENERATOR_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir, 'file_manipulation')
+
+
+def load_generator():
+    """
+    Loads HugeFileGenerator module from its file without adding its directory to import path,
+    module is registered under its name so pool workers find its functions
+
+    :return: module
+    """
+    spec = importlib.util.spec_from_file_location(
+        'HugeFileGenerator', os.path.join(GENERATOR_PATH, 'HugeFileGenerator.py')
+    )
+    module = sys.modules[spec.name] = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+
+    return module
+
+
+generator = load_generator()
+DISTRIBUTIONS = generator.DISTRIBUTIONS
+HugeFileGenerator = generator.HugeFileGenerator
+
+# Text extracted from Neris.pdf, benchmarked next to generated corpora
+EXTRACTED_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'extracted.txt')
+WORDS_PATH = os.path.join(GENERATOR_PATH, 'words.csv')
+
+CODER_HUFFMAN = 'huffman'
+CODER_PARTIAL = 'partial'
+# stdlib compressors are run once per corpus in a single process as reference points, their compressor and
+# decompressor objects stream file to file in READ_SIZE blocks like coders of this repository do
+REFERENCES = {
+    'zlib': (zlib.compressobj, zlib.decompressobj),
+    'bz2': (bz2.BZ2Compressor, bz2.BZ2Decompressor),
+    'lzma': (lzma.LZMACompressor, lzma.LZMADecompressor),
+}
+CODERS = (CODER_HUFFMAN, CODER_PARTIAL, CODER_ARITHMETIC) + tuple(REFERENCES)
+
+# Defaults of benchmark matrix, sizes of generated corpora are in megabytes
+SIZES = (1.0, 4.0)
+CHUNK_SIZES = (262144, 1048576)
+SEED = 1
+# Relative loss of throughput or growth of peak memory flagged as regression
+TOLERANCE = 0.1
+# Relative loss of compression ratio flagged as regression, ratio does not depend on machine load
+RATIO_TOLERANCE = 0.001
+# Bytes in a megabyte of throughput
+MEGABYTE = 1000000
+# Bytes read at once while verifying decoded file and while streaming reference compressors
+READ_SIZE = 1048576
+
+# generated corpus, seed and distribution make its content the same on every run
+Corpus = namedtuple('Corpus', ['name', 'path', 'distribution', 'size', 'seed'])
+
+
+def get_peak_rss() -> int:
+    """
+    Get peak resident memory of this process and of its finished child processes, whichever is larger
+
+    :return: int, bytes, none if it cannot be measured
+    """
+    if resource is None:
+        return None
+    # linux counts kilobytes, macOS bytes
+    unit = 1 if sys.platform == 'darwin' else 1024
+
+    return max(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss,
+               resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss) * unit
+
+
+def get_file_checksum(file_path) -> int:
+    """
+    Get CRC32 of file read in blocks
+
+    :param file_path: str
+    :return: int
+    """
+    checksum = 0
+    with open(file_path, 'rb') as rf:
+        for block in iter(lambda: rf.read(READ_SIZE), b''):
+            checksum = zlib.crc32(block, checksum)
+
+    return checksum
+
+
+def prepare_corpora(work_path, sizes, distributions, seed) -> list:
+    """
+    Generates corpus of every size and distribution unless it was generated before, corpora of one run
+    get consecutive seeds
+
+    :param work_path: str
+    :param sizes: list of float, megabytes
+    :param distributions: list of str
+    :param seed: int, seed of the first corpus
+    :return: list of Corpus, extracted text goes last
+    """
+    corpora = []
+    for distribution in distributions:
+        for size in sizes:
+            name = '{}-{:g}mb-{}'.format(distribution, size, seed + len(corpora))
+            path = os.path.join(work_path, name + '.txt')
+            if not os.path.exists(path):
+                print('Generating {}...'.format(name), file=sys.stderr)
+                with redirect_stdout(sys.stderr):
+                    HugeFileGenerator(WORDS_PATH, distribution, seed + len(corpora)).generate_file(path, size)
+            corpora.append(Corpus(name, path, distribution, size, seed + len(corpora)))
+    corpora.append(Corpus('extracted', EXTRACTED_PATH, None, None, None))
+
+    return corpora
+
+
+def check_codecs(codec_counts, codec) -> None:
+    """
+    Raises error unless chunks were coded by benchmarked codec, chunks stored as they are are allowed
+
+    :param codec_counts: Counter of written chunks by codec id
+    :param codec: int, id of benchmarked codec
+    :return: None
+    """
+    others = sorted(CODEC_NAMES[used] for used in codec_counts if used not in (codec, CODEC_STORED))
+    if others or (codec_counts and not codec_counts[codec]):
+        raise ValueError('Chunks are coded by {} instead of {}'.format(
+            ', '.join(others) or CODEC_NAMES[CODEC_STORED], CODEC_NAMES[codec]
+        ))
+
+
+def encode_case(coder, file_path, output_path, chunk_size, processes) -> tuple:
+    """
+    Encodes file with given coder, fails if chunks are not coded by it
+
+    :param coder: str
+    :param file_path: str
+    :param output_path: str, directory
+    :param chunk_size: int
+    :param processes: int
+    :return: path of encoded file, seconds by stage name
+    """
+    if coder in REFERENCES:
+        encoded_path = os.path.join(output_path, '{}.{}'.format(os.path.basename(file_path), coder))
+        compressor = REFERENCES[coder][0]()
+        with open(file_path, 'rb') as rf, open(encoded_path, 'wb') as wf:
+            for block in iter(lambda: rf.read(READ_SIZE), b''):
+                wf.write(compressor.compress(block))
+            wf.write(compressor.flush())
+        return encoded_path, {}
+
+    if coder == CODER_HUFFMAN:
+        Huffman(processes, chunk_size).encode(file_path, output_path)
+        stages = {}
+    else:
+        encoder = HuffmanPartial(processes, chunk_size, coder=CODER_ARITHMETIC if coder == CODER_ARITHMETIC else None)
+        encoder.encode(file_path, output_path)
+        # chunks coded by another codec or all stored would not measure the benchmarked coder
+        check_codecs(encoder.codec_counts, CODEC_ARITHMETIC if coder == CODER_ARITHMETIC else CODEC_HUFFMAN)
+        stages = encoder.timings
+    file_name_wo_ext = os.path.basename(file_path).split('.', 1)[0]
+
+    return os.path.join(output_path, file_name_wo_ext + '.gm'), stages
+
+
+def decode_case(coder, encoded_path, output_path, chunk_size, processes) -> tuple:
+    """
+    Decodes file encoded by encode_case
+
+    :param coder: str
+    :param encoded_path: str
+    :param output_path: str, directory
+    :param chunk_size: int
+    :param processes: int
+    :return: path of decoded file, seconds by stage name
+    """
+    if coder in REFERENCES:
+        decoded_path = os.path.join(output_path, os.path.basename(encoded_path).rsplit('.', 1)[0])
+        decompressor = REFERENCES[coder][1]()
+        with open(encoded_path, 'rb') as rf, open(decoded_path, 'wb') as wf:
+            for block in iter(lambda: rf.read(READ_SIZE), b''):
+                wf.write(decompressor.decompress(block))
+            # only zlib keeps output back until flush
+            if hasattr(decompressor, 'flush'):
+                wf.write(decompressor.flush())
+        return decoded_path, {}
+
+    decoder = (Huffman if coder == CODER_HUFFMAN else HuffmanPartial)(processes, chunk_size)
+    decoder.decode(encoded_path, output_path)
+    with open(encoded_path, 'rb') as rf:
+        if coder == CODER_HUFFMAN:
+            file_name = Huffman.read_properties(rf).strip()
+        else:
+            file_name = decoder.read_decoder(rf)['f_name']
+
+    return os.path.join(output_path, file_name), getattr(decoder, 'timings', {})
+
+
+def call_isolated(sender, function, args) -> None:
+    """
+    Calls function in spawned process with output silenced, sends its result, seconds it took and peak memory
+
+    :param sender: Connection
+    :param function: callable
+    :param args: tuple
+    :return: None
+    """
+    sys.stdout = open(os.devnull, 'w')
+    try:
+        start_time = time.perf_counter()
+        result = function(*args)
+        sender.send((result, time.perf_counter() - start_time, get_peak_rss(), None))
+    except Exception as error:
+        sender.send((None, None, None, '{}: {}'.format(type(error).__name__, error)))
+
+
+def run_isolated(function, *args) -> tuple:
+    """
+    Runs function in fresh interpreter, so peak memory of every run is measured apart, pool workers included
+
+    :param function: module level callable
+    :param args: arguments of function
+    :return: result, seconds, peak resident memory in bytes, error message or none
+    """
+    context = multiprocessing.get_context('spawn')
+    receiver, sender = context.Pipe(duplex=False)
+    process = context.Process(target=call_isolated, args=(sender, function, args))
+    process.start()
+    sender.close()
+    try:
+        result = receiver.recv()
+    except EOFError:
+        # process died without sending its result
+        process.join()
+        return None, None, None, 'Process exited with code {}'.format(process.exitcode)
+    process.join()
+
+    return result
+
+
+def get_throughput(size, seconds) -> float:
+    """
+    Get megabytes per second
+
+    :param size: int, bytes
+    :param seconds: float
+    :return: float
+    """
+    return size / MEGABYTE / seconds if seconds else None
+
+
+def run_case(corpus, coder, chunk_size, processes, work_path) -> dict:
+    """
+    Encodes and decodes corpus with one coder, chunk size and process count and verifies decoded file
+
+    :param corpus: Corpus
+    :param coder: str
+    :param chunk_size: int, none for reference compressors
+    :param processes: int
+    :param work_path: str
+    :return: dict
+    """
+    case_path = os.path.join(work_path, '{}-{}-{}-{}'.format(corpus.name, coder, chunk_size, processes))
+    decoded_path = os.path.join(case_path, 'decoded')
+    os.makedirs(decoded_path, exist_ok=True)
+    size = os.path.getsize(corpus.path)
+    result = {'corpus': corpus.name, 'coder': coder, 'chunk_size': chunk_size, 'processes': processes, 'size': size}
+
+    encoded, encode_seconds, encode_rss, error = run_isolated(
+        encode_case, coder, corpus.path, case_path, chunk_size, processes
+    )
+    if error:
+        result['error'] = 'encode: {}'.format(error)
+        return result
+    encoded_path, encode_stages = encoded
+
+    decoded, decode_seconds, decode_rss, error = run_isolated(
+        decode_case, coder, encoded_path, decoded_path, chunk_size, processes
+    )
+    if error:
+        result['error'] = 'decode: {}'.format(error)
+        return result
+    output_path, decode_stages = decoded
+
+    encoded_size = os.path.getsize(encoded_path)
+    result.update({
+        'encoded_size': encoded_size,
+        'ratio': size / encoded_size if encoded_size else None,
+        'encode_seconds': encode_seconds,
+        'decode_seconds': decode_seconds,
+        'encode_mbps': get_throughput(size, encode_seconds),
+        'decode_mbps': get_throughput(size, decode_seconds),
+        'encode_peak_rss': encode_rss,
+        'decode_peak_rss': decode_rss,
+        'stages': {'encode': encode_stages, 'decode': decode_stages},
+        'verified': get_file_checksum(output_path) == get_file_checksum(corpus.path),
+    })
+
+    return result
+
+
+def run_benchmark(corpora, coders, chunk_sizes, process_counts, work_path) -> dict:
+    """
+    Runs every coder with every chunk size and process count on every corpus, reference compressors
+    run once per corpus
+
+    :param corpora: list of Corpus
+    :param coders: list of str
+    :param chunk_sizes: list of int
+    :param process_counts: list of int
+    :param work_path: str
+    :return: dict
+    """
+    report = {
+        'environment': {
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'cpu_count': multiprocessing.cpu_count(),
+        },
+        'corpora': [
+            {
+                'name': corpus.name,
+                'distribution': corpus.distribution,
+                'seed': corpus.seed,
+                'size': os.path.getsize(corpus.path),
+                'checksum': get_file_checksum(corpus.path),
+            } for corpus in corpora
+        ],
+        'results': [],
+    }
+
+    for corpus in corpora:
+        for coder in coders:
+            matrix = [(None, 1)] if coder in REFERENCES else [
+                (chunk_size, processes) for chunk_size in chunk_sizes for processes in process_counts
+            ]
+            for chunk_size, processes in matrix:
+                print('{} {} chunk {} processes {}'.format(corpus.name, coder, chunk_size, processes), file=sys.stderr)
+                report['results'].append(run_case(corpus, coder, chunk_size, processes, work_path))
+
+    return report
+
+
+def get_case_key(result) -> tuple:
+    """
+    Get key matching result to result of the same case in another report
+
+    :param result: dict
+    :return: tuple
+    """
+    return result['corpus'], result['coder'], result['chunk_size'], result['processes']
+
+
+def compare_reports(report, baseline, tolerance=TOLERANCE) -> list:
+    """
+    Compares results of report with results of the same cases in baseline, throughput and peak memory may
+    change by tolerance and compression ratio by RATIO_TOLERANCE before change is flagged
+
+    :param report: dict
+    :param baseline: dict
+    :param tolerance: float
+    :return: list of str, one per regression
+    """
+    baseline_results = {get_case_key(result): result for result in baseline['results']}
+    regressions = []
+
+    for result in report['results']:
+        case = ' '.join(str(part) for part in get_case_key(result))
+        base = baseline_results.get(get_case_key(result))
+        if base is None or base.get('error'):
+            continue
+        if result.get('error'):
+            regressions.append('{}: {}'.format(case, result['error']))
+            continue
+        if not result['verified']:
+            regressions.append('{}: decoded file differs from corpus'.format(case))
+        checks = [('ratio', RATIO_TOLERANCE, -1), ('encode_mbps', tolerance, -1), ('decode_mbps', tolerance, -1),
+                  ('encode_peak_rss', tolerance, 1), ('decode_peak_rss', tolerance, 1)]
+        for metric, allowed, direction in checks:
+            value, base_value = result.get(metric), base.get(metric)
+            if not value or not base_value:
+                continue
+            change = value / base_value - 1
+            if change * direction > allowed:
+                regressions.append('{}: {} {:.4g} against baseline {:.4g} ({:+.1%})'.format(
+                    case, metric, value, base_value, change
+                ))
+
+    return regressions
+
+
+def read_args() -> None:
+    """
+    This function handles command line interface
+
+    :return:
+    """
+    parser = argparse.ArgumentParser(
+        description='Benchmark encoding and decoding throughput, compression ratio and peak memory of coders '
+                    'on deterministic corpora, as JSON'
+    )
+    parser.add_argument('-o', type=str, metavar='<file path>', help='Path to JSON report, printed if omitted')
+    parser.add_argument(
+        '-b',
+        type=str,
+        metavar='<file path>',
+        help='Baseline JSON report, cases slower, larger or using more memory than baseline are flagged'
+    )
+    parser.add_argument(
+        '-t',
+        type=float,
+        default=TOLERANCE,
+        help='Relative change of throughput and peak memory tolerated against baseline'
+    )
+    parser.add_argument(
+        '-w',
+        type=str,
+        metavar='<directory>',
+        default=os.path.join(tempfile.gettempdir(), 'compression-benchmark'),
+        help='Directory of generated corpora and encoded files, corpora are reused by later runs'
+    )
+    parser.add_argument('-s', type=float, nargs='+', default=SIZES, metavar='<megabytes>', help='Corpus sizes')
+    parser.add_argument('-m', choices=DISTRIBUTIONS, nargs='+', default=DISTRIBUTIONS, help='Word distributions')
+    parser.add_argument('-r', type=int, default=SEED, metavar='<seed>', help='Seed of the first generated corpus')
+    parser.add_argument('-u', choices=CODERS, nargs='+', default=CODERS, help='Coders to benchmark')
+    parser.add_argument('-c', type=int, nargs='+', default=CHUNK_SIZES, help='Chunk sizes')
+    parser.add_argument(
+        '-p',
+        type=int,
+        nargs='+',
+        help='Pool process counts, 1 and count of processors by default'
+    )
+    args = parser.parse_args()
+
+    if any(size <= 0 for size in args.s) or any(chunk_size < 1 for chunk_size in args.c):
+        parser.error('Corpus sizes and chunk sizes must be positive: -s -c')
+
+    if args.p and any(processes < 1 for processes in args.p):
+        parser.error('Process counts must be positive: -p')
+
+    if args.b and not os.path.exists(args.b):
+        parser.error('File not found: {}'.format(args.b))
+
+    os.makedirs(args.w, exist_ok=True)
+    process_counts = args.p or sorted({1, multiprocessing.cpu_count()})
+    corpora = prepare_corpora(args.w, args.s, args.m, args.r)
+    report = run_benchmark(corpora, args.u, args.c, process_counts, args.w)
+
+    regressions = []
+    if args.b:
+        with open(args.b, 'r') as rf:
+            regressions = compare_reports(report, json.load(rf), args.t)
+        report['regressions'] = regressions
+
+    if args.o:
+        with open(args.o, 'w') as wf:
+            json.dump(report, wf, indent=2)
+    else:
+        json.dump(report, sys.stdout, indent=2)
+        print()
+
+    for regression in regressions:
+        print('Regression: {}'.format(regression), file=sys.stderr)
+    if regressions:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    read_args()
@@ -0,0 +1,175 @@
+#!/usr/bin/python3
+
+import math
+from collections import Counter
+
+from Archive import pack_byte_code_lengths, pack_code_lengths, unpack_byte_code_lengths, unpack_code_lengths
+from HuffmanCoder import BYTE_ESCAPE, BYTE_ESCAPE_BITS, ESCAPE, ESCAPE_BITS
+from HuffmanTree import sort_canonical
+from Sampling import get_code_lengths, get_cost
+
+
+def get_entropy_cost(frequencies) -> float:
+    """
+    Get bits needed to code given frequencies with ideal codes of their own
+
+    :param frequencies: dict
+    :return: float
+    """
+    total = sum(frequencies.values())
+
+    return sum(count * math.log2(total / count) for count in frequencies.values() if count)
+
+
+def get_table_cost(frequencies, binary=False) -> int:
+    """
+    Get approximate bits of stored code table for symbols in given frequencies
+
+    :param frequencies: dict
+    :param binary: bool
+    :return: int
+    """
+    if binary:
+        return 256 * 8
+
+    # code length byte and UTF-8 bytes of every symbol
+    return 8 * sum(1 + len(symbol.encode()) for symbol in frequencies)
+
+
+def get_escape_length(code_lengths, binary=False) -> int:
+    """
+    Get bits of escape code and raw symbol, zero if code lengths have no escape
+
+    :param code_lengths: dict
+    :param binary: bool
+    :return: int
+    """
+    escape = BYTE_ESCAPE if binary else ESCAPE
+    if escape not in code_lengths:
+        return 0
+
+    return code_lengths[escape] + (BYTE_ESCAPE_BITS if binary else ESCAPE_BITS)
+
+
+def get_length_limit_loss(frequencies, code_lengths, binary=False) -> int:
+    """
+    Get bits lost by coding frequencies with given code lengths instead of unlimited huffman codes,
+    symbols missing in code lengths are escaped
+
+    :param frequencies: dict
+    :param code_lengths: dict
+    :param binary: bool
+    :return: int
+    """
+    free_lengths = get_code_lengths(frequencies)
+    escape_length = get_escape_length(code_lengths, binary)
+
+    return sum(count * (code_lengths.get(symbol, escape_length) - free_lengths[symbol])
+               for symbol, count in frequencies.items())
+
+
+def pack_table(code_lengths, binary=False) -> bytes:
+    """
+    Packs code table of one block the same way as code lengths header section, code length of escape
+    follows if the table has escape
+
+    :param code_lengths: dict
+    :param binary: bool
+    :return: bytes
+    """
+    escape = BYTE_ESCAPE if binary else ESCAPE
+    symbol_lengths = sort_canonical({symbol: length for symbol, length in code_lengths.items() if symbol != escape})
+    table = pack_byte_code_lengths(symbol_lengths) if binary else pack_code_lengths(symbol_lengths)
+    if escape in code_lengths:
+        table += bytes((code_lengths[escape],))
+
+    return table
+
+
+def unpack_table(table, binary=False) -> list:
+    """
+    Unpacks code table packed by pack_table
+
+    :param table: bytes
+    :param binary: bool
+    :return: list of (symbol, length) tuples in canonical order
+    """
+    if binary:
+        code_lengths, size = unpack_byte_code_lengths(table[:256]), 256
+    else:
+        code_lengths = unpack_code_lengths(table)
+        # symbol count and UTF-8 size of symbols, then code length per symbol and symbols
+        size = 8 + len(code_lengths) + len(''.join(symbol for symbol, _ in code_lengths).encode())
+    if len(table) > size:
+        code_lengths = sort_canonical({**dict(code_lengths), BYTE_ESCAPE if binary else ESCAPE: table[size]})
+
+    return code_lengths
+
+
+def split_blocks(segments, max_block_size, binary=False) -> list:
+    """
+    Joins consecutive segments into blocks while one code table for both is cheaper than two
+
+    :param segments: list of (start, end, Counter) tuples
+    :param max_block_size: int, bytes
+    :param binary: bool
+    :return: list of (start, end, Counter) tuples
+    """
+    blocks = []
+    block_cost = 0.0
+
+    for start, end, frequencies in segments:
+        if blocks:
+            block_start, block_end, block_frequencies = blocks[-1]
+            joined = block_frequencies + frequencies
+            joined_cost = get_entropy_cost(joined)
+            split_cost = block_cost + get_entropy_cost(frequencies) + get_table_cost(frequencies, binary)
+            if end - block_start <= max_block_size and joined_cost <= split_cost:
+                blocks[-1] = (block_start, end, joined)
+                block_cost = joined_cost
+                continue
+
+        blocks.append((start, end, Counter(frequencies)))
+        block_cost = get_entropy_cost(frequencies)
+
+    return blocks
+
+
+def plan_tables(blocks, binary=False, max_length=None) -> tuple:
+    """
+    Gives every block its own code table unless table of previous block codes it at no higher total cost.
+    If codes of max_length bits cannot hold all symbols of a block, the rarest are coded through escape
+
+    :param blocks: list of (start, end, Counter) tuples
+    :param binary: bool
+    :param max_length: int, maximum code length
+    :return: list of (start, end, packed table) tuples where reused tables are the same bytes object,
+        bits lost by limiting code lengths
+    """
+    plan = []
+    previous_lengths = None
+    previous_table = None
+    lost_bits = 0
+
+    escape = BYTE_ESCAPE if binary else ESCAPE
+
+    for start, end, frequencies in blocks:
+        code_lengths = get_code_lengths(frequencies, max_length, escape)
+        if max_length:
+            lost_bits += get_length_limit_loss(frequencies, code_lengths, binary)
+        reusable = previous_lengths and (escape in previous_lengths or all(symbol in previous_lengths
+                                                                         for symbol in frequencies))
+        if reusable:
+            own_cost = get_cost(code_lengths, frequencies, get_escape_length(code_lengths, binary)) \
+                * sum(frequencies.values()) + get_table_cost(frequencies, binary)
+            reused_cost = get_cost(previous_lengths, frequencies, get_escape_length(previous_lengths, binary)) \
+                * sum(frequencies.values())
+            if reused_cost <= own_cost:
+                plan.append((start, end, previous_table))
+                continue
+
+        previous_lengths = code_lengths
+        previous_table = pack_table(code_lengths, binary)
+        plan.append((start, end, previous_table))
+
+    return plan, lost_bits
@@ -0,0 +1,217 @@
+#!/usr/bin/python3
+
+from collections import Counter
+from itertools import chain
+
+from AnsCoder import AnsCoder
+from ArithmeticCoding import ArithmeticCoder
+from ContextModel import ContextModel
+from HuffmanCoder import HuffmanCoder
+from Matches import MatchFinder, decode_matches
+
+# Codec id is the first byte of every chunk of archives with FLAG_CODECS
+CODEC_STORED = 0
+CODEC_HUFFMAN = 1
+CODEC_ARITHMETIC = 2
+CODEC_CONTEXT = 3
+CODEC_ANS = 4
+CODEC_MATCHES = 5
+
+# Codec ids by name, names are used by command line
+CODECS = {
+    'stored': CODEC_STORED,
+    'huffman': CODEC_HUFFMAN,
+    'arithmetic': CODEC_ARITHMETIC,
+    'context': CODEC_CONTEXT,
+    'ans': CODEC_ANS,
+    'matches': CODEC_MATCHES,
+}
+CODEC_NAMES = {codec: name for name, codec in CODECS.items()}
+# Codec ids by coder class
+CODER_CODECS = {
+    HuffmanCoder: CODEC_HUFFMAN,
+    ArithmeticCoder: CODEC_ARITHMETIC,
+    ContextModel: CODEC_CONTEXT,
+    AnsCoder: CODEC_ANS,
+    MatchFinder: CODEC_MATCHES,
+}
+
+# Chunks larger than this are estimated from SAMPLE_PIECES pieces spread over the chunk
+SAMPLE_SIZE = 65536
+SAMPLE_PIECES = 16
+
+
+class StoredCodec:
+    """
+    Keeps chunk as it is, text chunks are stored as UTF-8
+
+    Properties
+    ----------
+    binary : bool
+        notes if chunks are bytes instead of str
+    """
+    def __init__(self, binary=False):
+        """
+        StoredCodec constructor
+
+        :param binary: bool
+        """
+        self.binary = binary
+
+    def encode(self, chunk) -> bytes:
+        """
+        Encodes one chunk
+
+        :param chunk: str or bytes
+        :return: bytes
+        """
+        return chunk if self.binary else chunk.encode('utf8')
+
+    def decode(self, chunk):
+        """
+        Decodes one chunk
+
+        :param chunk: bytes
+        :return: str or bytes
+        """
+        return chunk if self.binary else chunk.decode('utf8')
+
+    def get_cost(self, frequencies) -> float:
+        """
+        Get bits of stored symbols
+
+        :param frequencies: dict
+        :return: float
+        """
+        if self.binary:
+            return 8.0 * sum(frequencies.values())
+
+        return 8.0 * sum(count * len(symbol.encode('utf8')) for symbol, count in frequencies.items())
+
+
+def get_codec(coder) -> int:
+    """
+    Get codec id of coder
+
+    :param coder: object
+    :return: int
+    """
+    if isinstance(coder, StoredCodec):
+        return CODEC_STORED
+
+    return CODER_CODECS[type(coder)]
+
+
+def get_sample(symbols):
+    """
+    Get symbols of pieces spread evenly over symbols, short symbol sequences are taken whole
+
+    :param symbols: str, bytes or list of tokens
+    :return: str, bytes or list of tokens
+    """
+    if len(symbols) <= SAMPLE_SIZE:
+        return symbols
+
+    piece_size = SAMPLE_SIZE // SAMPLE_PIECES
+    step = len(symbols) // SAMPLE_PIECES
+    pieces = [symbols[start:start + piece_size] for start in range(0, step * SAMPLE_PIECES, step)]
+    if isinstance(symbols, list):
+        return list(chain.from_iterable(pieces))
+
+    return symbols[:0].join(pieces)
+
+
+def get_sample_cost(coder, symbols) -> tuple:
+    """
+    Get estimated bits of coding symbols, coders with a fixed model estimate them from symbol counts of a sample,
+    adaptive coders have no such estimate and encode the sample. Cost of sample is scaled to all symbols
+
+    :param coder: object
+    :param symbols: str, bytes or list of tokens
+    :return: float, encoded symbols if the sample was all of them and it was encoded, otherwise none
+    """
+    if not len(symbols):
+        return 0.0, None
+    sample = get_sample(symbols)
+    if hasattr(coder, 'get_cost'):
+        return coder.get_cost(Counter(sample)) * len(symbols) / len(sample), None
+    encoded = coder.encode(sample)
+
+    return 8.0 * len(encoded) * len(symbols) / len(sample), encoded if len(sample) == len(symbols) else None
+
+
+def select_codec(candidates) -> tuple:
+    """
+    Get candidate which codes its symbols in the fewest bits, the first candidate wins ties
+
+    :param candidates: list of (coder, symbols) tuples, symbols are what coder encodes
+    :return: coder, symbols, encoded symbols if they were encoded while estimating their cost
+    """
+    best = None
+    for coder, symbols in candidates:
+        bits, encoded = get_sample_cost(coder, symbols)
+        if best is None or bits < best[0]:
+            best = bits, coder, symbols, encoded
+
+    return best[1:]
+
+
+def get_candidates(coder, chunk, symbols, binary=False) -> list:
+    """
+    Get codecs chunk may be coded with: coder described by archive header, chosen by user, and storing chunk
+    as it is
+
+    :param coder: object
+    :param chunk: str or bytes
+    :param symbols: symbols of chunk coded by coder
+    :param binary: bool
+    :return: list of (coder, symbols) tuples
+    """
+    if isinstance(coder, StoredCodec):
+        return [(coder, chunk)]
+
+    return [(StoredCodec(binary), chunk), (coder, symbols)]
+
+
+def encode_chunk(coder, chunk, symbols=None, binary=False) -> bytes:
+    """
+    Encodes chunk with the codec estimated to code it in the fewest bits, codec id goes first. Chunks which
+    would not shrink are stored
+
+    :param coder: object
+    :param chunk: str or bytes
+    :param symbols: symbols of chunk coded by coder, chunk itself if none
+    :param binary: bool
+    :return: bytes
+    """
+    if symbols is None:
+        symbols = chunk
+    coder, symbols, encoded = select_codec(get_candidates(coder, chunk, symbols, binary))
+    if encoded is None:
+        encoded = coder.encode(symbols)
+
+    return bytes((get_codec(coder),)) + encoded
+
+
+def decode_chunk(coder, chunk, binary=False, size=None):
+    """
+    Decodes chunk encoded by encode_chunk
+
+    :param coder: object
+    :param chunk: bytes
+    :param binary: bool
+    :param size: int, decoded length of chunk recorded by archive, none if unknown
+    :return: str or bytes
+    """
+    codec = chunk[0]
+    if codec == CODEC_STORED:
+        return StoredCodec(binary).decode(chunk[1:])
+    if coder is None or codec != get_codec(coder):
+        raise ValueError('Chunk is coded with codec {} not described by archive header'.format(codec))
+    if codec == CODEC_MATCHES:
+        # text chunks are matched as UTF-8, a character takes at most 4 bytes
+        limit = None if size is None else size if binary else 4 * size
+        data = decode_matches(chunk[1:], limit)
+        return data if binary else data.decode('utf8')
+
+    return coder.decode(chunk[1:])
@@ -0,0 +1,209 @@
+#!/usr/bin/python3
+
+from collections import namedtuple
+
+from ArithmeticCoding import SYMBOL_COUNT, RangeDecoder, RangeEncoder
+from HuffmanCoder import BYTE_ESCAPE_BITS, ESCAPE_BITS
+
+# Counts of one context are halved once their total with escape count exceeds it
+MAX_TOTAL = 65536
+
+# order is count of preceding symbols in the longest context,
+# max_contexts is count of contexts kept before rarely seen contexts are pruned
+Preset = namedtuple('Preset', ['order', 'max_contexts'])
+PRESETS = {
+    'fast': Preset(2, 65536),
+    'normal': Preset(3, 262144),
+    'max': Preset(4, 1048576),
+}
+DEFAULT_PRESET = 'normal'
+
+
+class ContextModel:
+    """
+    Adaptive PPM model of order-k contexts driving a range coder, model is built anew for every chunk
+
+    Symbol is coded in the longest seen context holding it, every seen context without it codes an escape
+    first. Escape count of context is count of its distinct symbols, symbols unseen even in order 0 are coded
+    as raw code point or byte value. Only the context which coded the symbol and longer ones are updated.
+    Once there are more than max_contexts contexts, contexts seen least often are pruned.
+
+    Properties
+    ----------
+    order : int
+        count of preceding symbols in the longest context
+    max_contexts : int
+        count of contexts kept before pruning
+    binary : bool
+        notes if chunks are bytes instead of str, bytes are modeled as latin-1 characters
+    escape_bits : int
+        bits of raw symbol
+    tables : list
+        [total count, counts by symbol] by context, one dict per order
+    contexts : int
+        count of contexts in all tables
+    """
+    def __init__(self, order, max_contexts, binary=False):
+        """
+        ContextModel constructor
+
+        :param order: int
+        :param max_contexts: int
+        :param binary: bool
+        """
+        if order < 1:
+            raise ValueError('Context order must be positive')
+        self.order = order
+        self.max_contexts = max_contexts
+        self.binary = binary
+        self.escape_bits = BYTE_ESCAPE_BITS if binary else ESCAPE_BITS
+        self.tables = []
+        self.contexts = 0
+
+    def reset(self) -> None:
+        """
+        Empties tables of all orders
+
+        :return: None
+        """
+        self.tables = [{} for _ in range(self.order + 1)]
+        self.contexts = 0
+
+    def update(self, contexts, symbol) -> None:
+        """
+        Counts symbol in given contexts, contexts are pruned if there are too many of them
+
+        :param contexts: list of (table, context) tuples
+        :param symbol: str
+        :return: None
+        """
+        for table, context in contexts:
+            stats = table.get(context)
+            if stats is None:
+                table[context] = [1, {symbol: 1}]
+                self.contexts += 1
+                continue
+            counts = stats[1]
+            counts[symbol] = counts.get(symbol, 0) + 1
+            stats[0] += 1
+            if stats[0] + len(counts) > MAX_TOTAL:
+                for counted in counts:
+                    counts[counted] = (counts[counted] + 1) // 2
+                stats[0] = sum(counts.values())
+
+        if self.contexts > self.max_contexts:
+            self.prune()
+
+    def prune(self) -> None:
+        """
+        Drops contexts of order 1 and above seen at most threshold times, threshold doubles until
+        at most half of max_contexts are left
+
+        :return: None
+        """
+        threshold = 1
+        while self.contexts > self.max_contexts // 2:
+            for table in self.tables[1:]:
+                for context in [context for context, stats in table.items() if stats[0] <= threshold]:
+                    del table[context]
+                    self.contexts -= 1
+            threshold *= 2
+
+    def encode(self, chunk) -> bytes:
+        """
+        Encodes one chunk with model built from the chunk itself
+
+        :param chunk: str or bytes
+        :return: bytes
+        """
+        text = chunk.decode('latin-1') if self.binary else chunk
+        encoder = RangeEncoder()
+        encode_frequency = encoder.encode_frequency
+        high_bits = self.escape_bits // 2
+        low_bits = self.escape_bits - high_bits
+        self.reset()
+        tables = self.tables
+        history = ''
+
+        for symbol in text:
+            # longest context first, contexts seen so far are escaped until one holds the symbol
+            contexts = [(tables[order], history[len(history) - order:]) for order in range(len(history), -1, -1)]
+            used = 0
+            for table, context in contexts:
+                used += 1
+                stats = table.get(context)
+                if stats is None:
+                    continue
+                total, counts = stats
+                if symbol in counts:
+                    start = 0
+                    for counted, count in counts.items():
+                        if counted == symbol:
+                            break
+                        start += count
+                    encode_frequency(start, counts[symbol], total + len(counts))
+                    break
+                encode_frequency(total, len(counts), total + len(counts))
+            else:
+                value = ord(symbol)
+                encoder.encode(value >> low_bits, 1, high_bits)
+                encoder.encode(value & ((1 << low_bits) - 1), 1, low_bits)
+
+            self.update(contexts[:used], symbol)
+            history = (history + symbol)[-self.order:]
+
+        return SYMBOL_COUNT.pack(len(text)) + encoder.finish()
+
+    def decode(self, chunk) -> str:
+        """
+        Decodes one chunk, model is rebuilt the same way encoder built it
+
+        :param chunk: bytes
+        :return: str or bytes
+        """
+        symbol_count, = SYMBOL_COUNT.unpack_from(chunk)
+        decoder = RangeDecoder(chunk[SYMBOL_COUNT.size:])
+        get_frequency = decoder.get_frequency
+        remove = decoder.remove
+        high_bits = self.escape_bits // 2
+        low_bits = self.escape_bits - high_bits
+        self.reset()
+        tables = self.tables
+        history = ''
+        output = []
+        append = output.append
+
+        for _ in range(symbol_count):
+            contexts = [(tables[order], history[len(history) - order:]) for order in range(len(history), -1, -1)]
+            used = 0
+            for table, context in contexts:
+                used += 1
+                stats = table.get(context)
+                if stats is None:
+                    continue
+                total, counts = stats
+                value = get_frequency(total + len(counts))
+                if value >= total:
+                    remove(total, len(counts))
+                    continue
+                start = 0
+                for symbol, count in counts.items():
+                    if value < start + count:
+                        break
+                    start += count
+                remove(start, count)
+                break
+            else:
+                high = decoder.get_value(high_bits)
+                remove(high, 1)
+                low = decoder.get_value(low_bits)
+                remove(low, 1)
+                symbol = chr((high << low_bits) | low)
+
+            append(symbol)
+            self.update(contexts[:used], symbol)
+            history = (history + symbol)[-self.order:]
+
+        if self.binary:
+            return ''.join(output).encode('latin-1')
+        return ''.join(output)
@@ -0,0 +1,259 @@
+#!/usr/bin/python3
+
+import argparse
+import glob
+import multiprocessing
+import os
+from collections import Counter, namedtuple
+from multiprocessing import Pool
+
+from Archive import DICTIONARY_ID, DICTIONARY_MAGIC, FLAG_BYTES, HEADER, SECTION_BYTE_CODE_LENGTHS, \
+    SECTION_CODE_LENGTHS, SECTION_DICTIONARY, SECTION_ESCAPE, VERSION, get_checksum, pack_byte_code_lengths, \
+    pack_code_lengths, pack_sections, unpack_byte_code_lengths, unpack_code_lengths, unpack_sections
+from Histogram import RANGE_SIZE, get_ranges
+from HuffmanCoder import BYTE_ESCAPE, ESCAPE, HuffmanCoder
+from HuffmanTree import get_canonical_codes, sort_canonical
+from Members import COUNT_BATCH_SIZE, count_pieces, find_members, get_member_path, is_directory, is_multiple_input
+from Sampling import Sampler, get_code_lengths
+
+# Extension of dictionary files, decoder looks for dictionary of archive among such files of a directory
+DICTIONARY_EXTENSION = '.gmd'
+
+# code table trained on a corpus, code lengths in canonical order hold escape of symbols missing in corpus,
+# id is CRC32 of packed code table so equal tables share id
+Dictionary = namedtuple('Dictionary', ['id', 'binary', 'code_lengths'])
+
+# Dictionaries loaded by this process by absolute path, with modification time of file they were loaded from
+loaded_dictionaries = {}
+# Coders of dictionaries by dictionary id, built once per process
+dictionary_coders = {}
+
+
+def pack_code_table(code_lengths, binary=False) -> dict:
+    """
+    Packs code lengths into header sections, escape goes into section of its own
+
+    :param code_lengths: list of (symbol, length) tuples in canonical order
+    :param binary: bool
+    :return: dict of section payloads by section type
+    """
+    escape = BYTE_ESCAPE if binary else ESCAPE
+    symbol_lengths = [(symbol, length) for symbol, length in code_lengths if symbol != escape]
+    if binary:
+        sections = {SECTION_BYTE_CODE_LENGTHS: pack_byte_code_lengths(symbol_lengths)}
+    else:
+        sections = {SECTION_CODE_LENGTHS: pack_code_lengths(symbol_lengths)}
+    escape_lengths = [length for symbol, length in code_lengths if symbol == escape]
+    if escape_lengths:
+        sections[SECTION_ESCAPE] = bytes(escape_lengths)
+
+    return sections
+
+
+def unpack_code_table(sections, binary=False) -> list:
+    """
+    Unpacks code lengths packed by pack_code_table
+
+    :param sections: dict of section payloads by section type
+    :param binary: bool
+    :return: list of (symbol, length) tuples in canonical order
+    """
+    if binary:
+        code_lengths = dict(unpack_byte_code_lengths(sections[SECTION_BYTE_CODE_LENGTHS]))
+    else:
+        code_lengths = dict(unpack_code_lengths(sections[SECTION_CODE_LENGTHS]))
+    if SECTION_ESCAPE in sections:
+        code_lengths[BYTE_ESCAPE if binary else ESCAPE] = sections[SECTION_ESCAPE][0]
+
+    return sort_canonical(code_lengths)
+
+
+def get_dictionary_id(code_lengths, binary=False) -> int:
+    """
+    Get id of code table, CRC32 of coding mode and packed code lengths
+
+    :param code_lengths: list of (symbol, length) tuples in canonical order
+    :param binary: bool
+    :return: int
+    """
+    return get_checksum(bytes((binary,)) + pack_sections(pack_code_table(code_lengths, binary)))
+
+
+def count_corpus(path, processes, binary=False) -> dict:
+    """
+    Counts all symbols of a file, or of all files of directory or glob pattern, in parallel
+
+    :param path: str
+    :param processes: int
+    :param binary: bool
+    :return: dict of frequencies by symbol
+    """
+    if is_multiple_input(path):
+        base_path, members = find_members(path)
+        paths = [get_member_path(base_path, member) for member in members if not is_directory(member)]
+    else:
+        paths = [path]
+    pieces = [
+        (file_path, start, end, binary)
+        for file_path in paths for start, end in get_ranges(file_path, RANGE_SIZE, binary)
+    ]
+    batches = [pieces[start:start + COUNT_BATCH_SIZE] for start in range(0, len(pieces), COUNT_BATCH_SIZE)]
+    frequencies = Counter()
+
+    with Pool(processes) as pool:
+        for partial_frequencies, _ in pool.imap(count_pieces, batches):
+            frequencies.update(partial_frequencies)
+
+    return dict(frequencies)
+
+
+def train(path, processes, binary=False, max_length=None) -> Dictionary:
+    """
+    Builds dictionary of huffman codes from sample corpus, escape is counted as often as symbols seen once,
+    so files holding symbols missing in corpus are still coded
+
+    :param path: str, file, directory or glob pattern of files
+    :param processes: int
+    :param binary: bool
+    :param max_length: int, maximum code length, none for unlimited codes
+    :return: Dictionary
+    """
+    escape = BYTE_ESCAPE if binary else ESCAPE
+    frequencies = Sampler.with_escape(count_corpus(path, processes, binary), escape)
+    code_lengths = sort_canonical(get_code_lengths(frequencies, max_length, escape))
+
+    return Dictionary(get_dictionary_id(code_lengths, binary), binary, code_lengths)
+
+
+def write_dictionary(file_path, dictionary) -> None:
+    """
+    Writes dictionary file, header of archive layout with dictionary id and code table sections
+
+    :param file_path: str
+    :param dictionary: Dictionary
+    :return: None
+    """
+    sections = {SECTION_DICTIONARY: DICTIONARY_ID.pack(dictionary.id)}
+    sections.update(pack_code_table(dictionary.code_lengths, dictionary.binary))
+    body = pack_sections(sections)
+
+    with open(file_path, 'wb') as wf:
+        wf.write(HEADER.pack(DICTIONARY_MAGIC, VERSION, FLAG_BYTES if dictionary.binary else 0, len(body)))
+        wf.write(body)
+
+
+def read_dictionary(file_path) -> Dictionary:
+    """
+    Reads dictionary file written by write_dictionary
+
+    :param file_path: str
+    :return: Dictionary
+    """
+    with open(file_path, 'rb') as rf:
+        magic, version, flags, size = HEADER.unpack(rf.read(HEADER.size))
+        if magic != DICTIONARY_MAGIC:
+            raise ValueError('Not a dictionary: {}'.format(file_path))
+        if version > VERSION:
+            raise ValueError('Unsupported dictionary version: {}'.format(version))
+        sections = unpack_sections(rf.read(size))
+
+    binary = bool(flags & FLAG_BYTES)
+    dictionary_id, = DICTIONARY_ID.unpack(sections[SECTION_DICTIONARY])
+
+    return Dictionary(dictionary_id, binary, unpack_code_table(sections, binary))
+
+
+def load_dictionary(file_path) -> Dictionary:
+    """
+    Gets dictionary of file, every file is read once per process unless it changes
+
+    :param file_path: str
+    :return: Dictionary
+    """
+    key = os.path.abspath(file_path)
+    modified = os.path.getmtime(key)
+    loaded = loaded_dictionaries.get(key)
+    if loaded is None or loaded[0] != modified:
+        loaded = loaded_dictionaries[key] = modified, read_dictionary(key)
+
+    return loaded[1]
+
+
+def find_dictionary(path, dictionary_id) -> Dictionary:
+    """
+    Finds dictionary of given id, path is a dictionary file or directory of dictionary files
+
+    :param path: str
+    :param dictionary_id: int
+    :return: Dictionary
+    """
+    if os.path.isdir(path):
+        paths = sorted(glob.glob(os.path.join(glob.escape(path), '*' + DICTIONARY_EXTENSION)))
+    else:
+        paths = [path]
+
+    for file_path in paths:
+        dictionary = load_dictionary(file_path)
+        if dictionary.id == dictionary_id:
+            return dictionary
+
+    raise ValueError('Dictionary {:08x} not found in {}'.format(dictionary_id, path))
+
+
+def get_dictionary_coder(dictionary) -> HuffmanCoder:
+    """
+    Gets coder of dictionary, coder is built once per process
+
+    :param dictionary: Dictionary
+    :return: HuffmanCoder
+    """
+    coder = dictionary_coders.get(dictionary.id)
+    if coder is None:
+        coder = dictionary_coders[dictionary.id] = HuffmanCoder(
+            get_canonical_codes(dictionary.code_lengths), dictionary.binary
+        )
+
+    return coder
+
+
+def read_args() -> None:
+    """
+    This function handles command line interface
+
+    :return:
+    """
+    parser = argparse.ArgumentParser(
+        description='Train huffman code table dictionary on sample corpus, archives encoded with it store only its id'
+    )
+    parser.add_argument(
+        '-f',
+        type=str,
+        metavar='<file path>',
+        required=True,
+        help='Path to sample corpus, file, directory or glob pattern of files'
+    )
+    parser.add_argument(
+        '-o',
+        type=str,
+        metavar='<file path>',
+        required=True,
+        help='Path to dictionary file, {} by convention'.format(DICTIONARY_EXTENSION)
+    )
+    parser.add_argument('-b', action='store_true', help='Train on raw bytes instead of UTF-8 characters')
+    parser.add_argument('-n', type=int, metavar='<bits>', help='Maximum code length')
+    parser.add_argument('-p', type=int, help='Pool processes this tool is going to use.')
+    args = parser.parse_args()
+
+    if not (os.path.exists(args.f) or is_multiple_input(args.f) and glob.glob(args.f, recursive=True)):
+        parser.error('File not found: {}'.format(args.f))
+
+    if args.n is not None and args.n < 1:
+        parser.error('Maximum code length must be positive: -n')
+
+    dictionary = train(args.f, args.p or multiprocessing.cpu_count(), args.b, args.n)
+    write_dictionary(args.o, dictionary)
+    print('Dictionary {:08x}, {} symbols'.format(dictionary.id, len(dictionary.code_lengths)))
+
+
+if __name__ == "__main__":
+    read_args()
@@ -1,7 +1,27 @@
 #!/usr/bin/python3
 
+import argparse
+import json
 import math
+import multiprocessing
 import operator
+import sys
+from collections import Counter
+from multiprocessing import Pool
+
+from Histogram import get_ranges, read_range
+
+# Highest order of conditional entropy reported by default, order k predicts symbol from k preceding symbols
+DEFAULT_ORDER = 3
+# Size of file ranges analyzed by one pool task
+CHUNK_SIZE = 4194304
+# Symbols counted before counters are checked against MAX_CONTEXTS
+COUNT_BLOCK_SIZE = 262144
+# Distinct n-grams kept per order and chunk, n-grams seen once are dropped past this count
+MAX_CONTEXTS = 1048576
+# Order is reliable if its n-grams are seen at least this many times on average, below that plug-in entropy
+# falls far under what any coder reaches as most n-grams are seen once
+RELIABLE_COUNT = 4
 
 
 class Entropy:
@@ -30,15 +50,7 @@ class Entropy:
 
     @staticmethod
     def get_letter_dictionary(data):
-        letters = list(data)
-        dictionary = {}
-
-        while letters:
-            letter = letters[0]
-            letter_count = letters.count(letter)
-            letters = list(filter(lambda x: x != letter, letters))
-            dictionary[letter] = letter_count
-
+        dictionary = dict(Counter(data))
         alphabet = list(dictionary.keys())
 
         return dictionary, alphabet
@@ -65,18 +77,249 @@ class Entropy:
         return h
 
 
-def main():
-    with open('extracted.txt', 'r') as rf:
-        text = rf.read()
+def count_ngrams(text, length, max_contexts=MAX_CONTEXTS) -> tuple:
+    """
+    Counts n-grams of given length in blocks of COUNT_BLOCK_SIZE positions, once there are more than
+    max_contexts distinct n-grams, n-grams seen once are dropped and only their count is kept
+
+    :param text: str or bytes
+    :param length: int
+    :param max_contexts: int
+    :return: Counter of kept n-grams, count of dropped n-grams seen once
+    """
+    counts = Counter()
+    dropped = 0
+    positions = len(text) - length + 1
+    for block_start in range(0, max(positions, 0), COUNT_BLOCK_SIZE):
+        block_end = min(block_start + COUNT_BLOCK_SIZE, positions)
+        counts.update(text[position:position + length] for position in range(block_start, block_end))
+        if len(counts) > max_contexts:
+            singletons = [ngram for ngram, count in counts.items() if count == 1]
+            for ngram in singletons:
+                del counts[ngram]
+            dropped += len(singletons)
+
+    return counts, dropped
+
+
+def get_ngram_entropy(counts, dropped=0) -> float:
+    """
+    Get entropy of n-gram distribution in bits, dropped n-grams are counted as distinct n-grams seen once
+
+    :param counts: dict
+    :param dropped: int
+    :return: float
+    """
+    total = sum(counts.values()) + dropped
+    if not total:
+        return 0.0
+
+    # dropped n-grams add log2(total) bits each, as count * log2(count) of count 1 is 0
+    return math.log2(total) - sum(count * math.log2(count) for count in counts.values() if count > 1) / total
+
+
+def get_adaptive_cost(counts, dropped, alphabet) -> float:
+    """
+    Get bits of coding n-grams by their last symbol with adaptive Krichevsky-Trofimov estimator of every context,
+    which is preceding symbols of n-gram. Unlike plug-in entropy this includes cost of learning every context,
+    so sparse contexts cost more than they save. Dropped n-grams are counted as contexts seen once
+
+    :param counts: dict of counts by n-gram
+    :param dropped: int
+    :param alphabet: int, count of symbols which may follow any context
+    :return: float
+    """
+    totals = Counter()
+    nats = 0.0
+    for ngram, count in counts.items():
+        totals[ngram[:-1]] += count
+        nats -= math.lgamma(count + 0.5) - math.lgamma(0.5)
+    half = alphabet / 2
+    for total in totals.values():
+        nats += math.lgamma(total + half) - math.lgamma(half)
+
+    return nats / math.log(2) + dropped * math.log2(alphabet)
+
+
+def get_order_statistics(text, order, max_contexts=MAX_CONTEXTS) -> tuple:
+    """
+    Get statistics of symbol given 0 to order preceding symbols. Plug-in conditional entropy of order k is
+    entropy of (k + 1)-grams minus entropy of k-grams, it is underestimated once most of its n-grams are seen
+    only a few times in text, such orders are not reliable. Adaptive cost is bits per symbol of coding
+    symbols with counts of their context learned while coding
+
+    :param text: str or bytes
+    :param order: int
+    :param max_contexts: int
+    :return: list of entropies, list of adaptive costs, list of reliable flags
+    """
+    entropies = []
+    costs = []
+    reliable = []
+    previous = 0.0
+    alphabet = 256 if isinstance(text, bytes) else max(len(set(text)), 1)
+    for length in range(1, order + 2):
+        positions = len(text) - length + 1
+        if positions < 1:
+            entropies.append(0.0)
+            costs.append(0.0)
+            reliable.append(False)
+            continue
+        counts, dropped = count_ngrams(text, length, max_contexts)
+        current = get_ngram_entropy(counts, dropped)
+        entropies.append(max(current - previous, 0.0))
+        costs.append(get_adaptive_cost(counts, dropped, alphabet) / positions)
+        reliable.append((len(counts) + dropped) * RELIABLE_COUNT <= positions)
+        previous = current
+
+    return entropies, costs, reliable
+
+
+def analyze_range(file_path, start, end, binary=False, order=DEFAULT_ORDER, max_contexts=MAX_CONTEXTS) -> dict:
+    """
+    Analyzes one range of file in pool worker process
+
+    :param file_path: str
+    :param start: int
+    :param end: int
+    :param binary: bool
+    :param order: int
+    :param max_contexts: int
+    :return: dict with range bounds, symbol count, conditional entropies, adaptive costs, reliable orders
+        and counted symbols
+    """
+    text = read_range(file_path, start, end, binary)
+    entropies, costs, reliable = get_order_statistics(text, order, max_contexts)
+
+    return {
+        'start': start,
+        'end': end,
+        'symbols': len(text),
+        'entropy': entropies,
+        'adaptive': costs,
+        'reliable': reliable,
+        'frequencies': Counter(text),
+    }
+
+
+def analyze(file_path, processes, order=DEFAULT_ORDER, chunk_size=CHUNK_SIZE, binary=False,
+            max_contexts=MAX_CONTEXTS) -> dict:
+    """
+    Analyzes file in parallel ranges, only ranges being analyzed are held in memory. Overall order 0 entropy
+    is exact, higher orders and adaptive costs are averaged over chunks weighted by their symbol count, like
+    a coder adapting to every chunk would see them. Order is reliable only if it is reliable in every chunk
+
+    :param file_path: str
+    :param processes: int
+    :param order: int
+    :param chunk_size: int
+    :param binary: bool
+    :param max_contexts: int
+    :return: dict
+    """
+    frequencies = Counter()
+    weighted = [0.0] * (order + 1)
+    weighted_costs = [0.0] * (order + 1)
+    reliable = [True] * (order + 1)
+    symbols = 0
+    size = 0
+    chunks = []
+    tasks = [(file_path, start, end, binary, order, max_contexts)
+             for start, end in get_ranges(file_path, chunk_size, binary)]
+
+    with Pool(processes) as pool:
+        for chunk in pool.imap(analyze_star, tasks):
+            frequencies.update(chunk.pop('frequencies'))
+            symbols += chunk['symbols']
+            size += chunk['end'] - chunk['start']
+            for index, entropy in enumerate(chunk['entropy']):
+                weighted[index] += entropy * chunk['symbols']
+                weighted_costs[index] += chunk['adaptive'][index] * chunk['symbols']
+                reliable[index] = reliable[index] and chunk['reliable'][index]
+            chunk['bits_per_byte'] = [
+                entropy * chunk['symbols'] / (chunk['end'] - chunk['start']) for entropy in chunk['entropy']
+            ]
+            chunk['adaptive_bits_per_byte'] = [
+                cost * chunk['symbols'] / (chunk['end'] - chunk['start']) for cost in chunk['adaptive']
+            ]
+            chunks.append(chunk)
+
+    entropy = [total / symbols if symbols else 0.0 for total in weighted]
+    costs = [total / symbols if symbols else 0.0 for total in weighted_costs]
+    if symbols:
+        entropy[0] = Entropy.calculate_entropy({symbol: count / symbols for symbol, count in frequencies.items()})
+
+    return {
+        'file': file_path,
+        'size': size,
+        'binary': binary,
+        'symbols': symbols,
+        'alphabet': len(frequencies),
+        'order': order,
+        'chunk_size': chunk_size,
+        'entropy': entropy,
+        'bits_per_byte': [value * symbols / size if size else 0.0 for value in entropy],
+        'adaptive': costs,
+        'adaptive_bits_per_byte': [value * symbols / size if size else 0.0 for value in costs],
+        'reliable': reliable if symbols else [False] * (order + 1),
+        'chunks': chunks,
+    }
+
+
+def analyze_star(task) -> dict:
+    """
+    Unpacks analyze_range arguments for Pool.imap
+
+    :param task: tuple
+    :return: dict
+    """
+    return analyze_range(*task)
+
+
+def read_args() -> None:
+    """
+    This function handles command line interface
+
+    :return:
+    """
+    parser = argparse.ArgumentParser(
+        description='Order 0 to order k conditional entropy of a file, overall and per chunk, as JSON'
+    )
+    parser.add_argument('-f', type=str, metavar='<file path>', required=True, help='Path to target file')
+    parser.add_argument('-o', type=str, metavar='<file path>', help='Path to JSON report, printed if omitted')
+    parser.add_argument(
+        '-k',
+        type=int,
+        default=DEFAULT_ORDER,
+        metavar='<order>',
+        help='Highest order, count of preceding symbols predicting a symbol'
+    )
+    parser.add_argument('-b', action='store_true', help='Analyze raw bytes instead of UTF-8 characters')
+    parser.add_argument('-c', type=int, default=CHUNK_SIZE, help='Chunk size')
+    parser.add_argument(
+        '-m',
+        type=int,
+        default=MAX_CONTEXTS,
+        metavar='<count>',
+        help='Distinct n-grams kept per order and chunk, bounds memory used by higher orders'
+    )
+    parser.add_argument('-p', type=int, help='Pool processes this tool is going to use.')
+    args = parser.parse_args()
+
+    if args.k < 0:
+        parser.error('Order must not be negative: -k')
+
+    if args.c < 1 or args.m < 1:
+        parser.error('Chunk size and context count must be positive: -c -m')
 
-    entropy = Entropy(text)
-    probabilities = entropy.get_probabilities()
-    sorted_probabilities = entropy.get_probabilities_sorted()
-    for probability in sorted_probabilities:
-        print('{}&{}'.format(probability[0], round(probability[1] * 100, 4)))
-    print('Entropy with probability distribution: {}'.format(entropy.calculate_entropy(probabilities)))
-    print('Entropy without probability distribution: {}'.format(math.log(len(entropy.alphabet), 2)))
+    report = analyze(args.f, args.p or multiprocessing.cpu_count(), args.k, args.c, args.b, args.m)
+    if args.o:
+        with open(args.o, 'w') as wf:
+            json.dump(report, wf, indent=2)
+    else:
+        json.dump(report, sys.stdout, indent=2)
+        print()
 
 
 if __name__ == "__main__":
-    main()
+    read_args()
@@ -0,0 +1,149 @@
+#!/usr/bin/python3
+
+import mmap
+import os
+from collections import Counter
+from multiprocessing import Pool
+
+# Bytes of input counted by one task, bounds memory of decoded text per worker
+RANGE_SIZE = 16777216
+# Bytes of input between candidate block boundaries
+SEGMENT_SIZE = 262144
+
+
+def is_continuation_byte(byte) -> bool:
+    """
+    Returns true if byte continues multi-byte UTF-8 sequence
+
+    :param byte: int
+    :return: bool
+    """
+    return byte & 0xc0 == 0x80
+
+
+def get_complete_end(data) -> int:
+    """
+    Get end of the last complete UTF-8 sequence in data, bytes after it start a sequence cut short
+
+    :param data: bytes
+    :return: int
+    """
+    start = len(data) - 1
+    while start > max(len(data) - 4, 0) and is_continuation_byte(data[start]):
+        start -= 1
+    if start < 0 or data[start] < 0xc0:
+        return len(data)
+    # count of leading one bits of lead byte is length of sequence
+    length = 2 if data[start] < 0xe0 else 3 if data[start] < 0xf0 else 4
+
+    return len(data) if start + length <= len(data) else start
+
+
+def split_ranges(data, range_size, binary=False) -> list:
+    """
+    Splits data into ranges of about range_size bytes, unless binary no range starts inside UTF-8 sequence
+
+    :param data: mmap
+    :param range_size: int
+    :param binary: bool
+    :return: list of (start, end) tuples
+    """
+    ranges = []
+    start = 0
+
+    while start < len(data):
+        end = min(start + range_size, len(data))
+        while not binary and end < len(data) and is_continuation_byte(data[end]):
+            end += 1
+        ranges.append((start, end))
+        start = end
+
+    return ranges
+
+
+def get_ranges(file_path, range_size, binary=False) -> list:
+    """
+    Splits memory mapped file into ranges of about range_size bytes
+
+    :param file_path: str
+    :param range_size: int
+    :param binary: bool
+    :return: list of (start, end) tuples
+    """
+    if not os.path.getsize(file_path):
+        return []
+
+    with open(file_path, 'rb') as rf, mmap.mmap(rf.fileno(), 0, access=mmap.ACCESS_READ) as data:
+        return split_ranges(data, range_size, binary)
+
+
+def read_range(file_path, start, end, binary=False):
+    """
+    Reads one range of memory mapped file, range is decoded from UTF-8 unless binary
+
+    :param file_path: str
+    :param start: int
+    :param end: int
+    :param binary: bool
+    :return: str or bytes
+    """
+    with open(file_path, 'rb') as rf, mmap.mmap(rf.fileno(), 0, access=mmap.ACCESS_READ) as data:
+        text = data[start:end]
+
+    return text if binary else text.decode('utf8')
+
+
+def count_range(file_path, start, end, binary=False) -> tuple:
+    """
+    Counts symbols of one range of memory mapped file, symbols are byte values if binary
+
+    :param file_path: str
+    :param start: int
+    :param end: int
+    :param binary: bool
+    :return: Counter, count of symbols in range
+    """
+    text = read_range(file_path, start, end, binary)
+
+    return Counter(text), len(text)
+
+
+def count_symbols(file_path, processes, binary=False, range_size=RANGE_SIZE) -> tuple:
+    """
+    Counts all symbols of UTF-8 file or all bytes of any file if binary in parallel,
+    each worker counts a few ranges of memory mapped file
+
+    :param file_path: str
+    :param processes: int
+    :param binary: bool
+    :param range_size: int
+    :return: dict of frequencies by symbol, total count of symbols
+    """
+    frequencies = Counter()
+    total = 0
+    ranges = get_ranges(file_path, range_size, binary)
+
+    with Pool(processes) as pool:
+        for partial_frequencies, length in pool.starmap(count_range, [(file_path, *r, binary) for r in ranges]):
+            frequencies.update(partial_frequencies)
+            total += length
+
+    return dict(frequencies), total
+
+
+def count_segments(file_path, processes, binary=False, segment_size=SEGMENT_SIZE) -> list:
+    """
+    Counts symbols of every segment of file in parallel, segments never split UTF-8 sequence unless binary
+
+    :param file_path: str
+    :param processes: int
+    :param binary: bool
+    :param segment_size: int
+    :return: list of (start, end, Counter) tuples, start and end are byte offsets
+    """
+    ranges = get_ranges(file_path, segment_size, binary)
+
+    with Pool(processes) as pool:
+        counts = pool.starmap(count_range, [(file_path, *r, binary) for r in ranges])
+
+    return [(start, end, frequencies) for (start, end), (frequencies, _) in zip(ranges, counts)]
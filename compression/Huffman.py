@@ -9,6 +9,9 @@ import gc
 import multiprocessing
 from multiprocessing import Pool
 
+from Histogram import count_symbols
+from HuffmanTree import HuffmanTree
+
 WORDS_SEPARATOR = '2'
 CHUNK_SEPARATOR = b'\xff\xff'
 
@@ -46,16 +49,6 @@ def read_args():
         decoder.decode(args.f, args.o)
 
 
-class Node:
-    def __init__(self, created, probability, has_parent, letter=None, parent='', is_left=None):
-        self.letter = letter
-        self.is_left = is_left
-        self.probability = probability
-        self.has_parent = has_parent
-        self.created = created
-        self.parent = parent
-
-
 class Huffman:
     def __init__(self, processing_cores, chunk_size):
         self.codes = None
@@ -63,8 +56,7 @@ class Huffman:
         self.frequencies = None
         self.text_len = 0
         self.words = None
-        self.graph = []
-        self.creation_time = 0
+        self.tree = HuffmanTree([])
         self.processing_cores = multiprocessing.cpu_count()
         if processing_cores:
             self.processing_cores = processing_cores
@@ -72,69 +64,16 @@ class Huffman:
         if chunk_size:
             self.chunk_size = chunk_size
 
-    def create_node(self, probability, has_parent, letter=None, parent=None, is_left=None) -> Node:
-        self.creation_time += 1
-
-        return Node(self.creation_time, probability, has_parent, letter, parent, is_left)
-
-    def is_graph_joined(self) -> bool:
-        nodes_without_parents = 0
-
-        for node in self.graph:
-            if not node.parent:
-                nodes_without_parents += 1
-
-        return nodes_without_parents == 1
-
-    def sort_nodes(self) -> None:
-        self.graph.sort(key=operator.attrgetter('has_parent', 'probability', 'created'))
-
     def connect_all_nodes(self) -> None:
         print('Connecting graph nodes')
         start_time = time.time()
-        while not self.is_graph_joined():
-            node1, node2 = self.graph[0], self.graph[1]
-            parent_probability = node1.probability + node2.probability
-            parent_node = self.create_node(parent_probability, False)
-            self.graph.append(parent_node)
-
-            node1.parent, node2.parent = parent_node, parent_node
-            node1.has_parent, node2.has_parent = True, True
-
-            if node1.probability > node2.probability:
-                node1.is_left, node2.is_left = True, False
-            else:
-                node1.is_left, node2.is_left = False, True
-
-            self.sort_nodes()
+        self.tree.build()
         print(time.time() - start_time)
 
-    def get_code(self, node, code='') -> str:
-        if node.parent:
-            if node.is_left:
-                code += '1'
-            else:
-                code += '0'
-
-            return self.get_code(node.parent, code)
-
-        return code
-
-    def get_letter_code(self, letter) -> str:
-        for node in self.graph:
-            if node.letter == letter:
-                return self.get_code(node)[::-1]
-
     def get_all_codes(self) -> dict:
-        codes = {}
+        codes = self.tree.get_codes()
 
-        for word in self.words:
-            code = self.get_letter_code(word)
-            if not code:
-                code = '0'
-            codes[word] = code
-
-        return codes
+        return {word: codes[word] for word in self.words}
 
     def get_probabilities(self, total_letters) -> dict:
         probabilities = {}
@@ -162,36 +101,16 @@ class Huffman:
         if not frequencies or not words:
             start_time = time.time()
             print('Getting letter dictionary')
-            self.frequencies = {}
-
-            with open(file_path, 'r', encoding='utf8') as rf:
-                while True:
-                    chunk = rf.read(self.chunk_size)
-                    self.text_len += len(chunk)
-                    for letter in set(chunk):
-                        if letter in self.frequencies:
-                            self.frequencies[letter] += chunk.count(letter)
-                        else:
-                            self.frequencies[letter] = chunk.count(letter)
-                    if not chunk:
-                        break
-
+            self.frequencies, self.text_len = count_symbols(file_path, self.processing_cores)
             self.words = list(self.frequencies.keys())
 
             print(time.time() - start_time)
-        self.graph = []
-
-        self.creation_time = 0
 
         probabilities = self.get_probabilities_sorted()
 
         print('Creating initial graph')
         start_time = time.time()
-        for word in probabilities:
-            letter = word[0]
-            probability = word[1]
-            node = Node(0, probability, False, letter)
-            self.graph.append(node)
+        self.tree = HuffmanTree(probabilities)
 
         print(time.time() - start_time)
         self.connect_all_nodes()
@@ -227,7 +146,7 @@ class Huffman:
 
         print('Writing encoded data...')
         start_time = time.time()
-        with open(file_path, 'r', encoding='utf8') as rf:
+        with open(file_path, 'r', encoding='utf8', newline='') as rf:
             for _ in range(0, self.text_len, self.chunk_size):
                 bits = '1'
                 chunk = rf.read(self.chunk_size)
@@ -316,7 +235,7 @@ class Huffman:
         pool = Pool(self.processing_cores)
         data += ''.join(pool.map(self.decode_chunk, chunks))
 
-        with open(output_file, 'w', encoding='utf8') as wf:
+        with open(output_file, 'w', encoding='utf8', newline='') as wf:
             wf.write(data)
         os.utime(output_file, (properties['f_created'], properties['f_modified']))
 
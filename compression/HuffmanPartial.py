@@ -4,92 +4,58 @@ import operator
 import os
 import time
 import argparse
-import gc
+import bisect
+import glob
+import sys
+from collections import Counter
+from itertools import repeat
 
 import multiprocessing
 from multiprocessing import Pool
 
+from Archive import ArchiveReader, ArchiveWriter, CONTEXT_MODEL, DICTIONARY_ID, FLAG_ANS, FLAG_ARITHMETIC, \
+    FLAG_BLOCKS, FLAG_BYTES, FLAG_CODECS, FLAG_CONTEXT, FLAG_MATCHES, FLAG_STORED, SECTION_BYTE_CODE_LENGTHS, \
+    SECTION_CODE_LENGTHS, SECTION_CONTEXT_MODEL, SECTION_DICTIONARY, SECTION_ESCAPE, SECTION_FREQUENCIES, \
+    SECTION_MEMBERS, SECTION_PROPERTIES, SECTION_VOCABULARY, Member, combine_checksums, is_archive, \
+    pack_byte_code_lengths, pack_code_lengths, pack_frequencies, pack_members, pack_properties, pack_vocabulary, \
+    unpack_byte_code_lengths, unpack_code_lengths, unpack_frequencies, unpack_members, unpack_properties, \
+    unpack_vocabulary
+from AnsCoder import ANS_BITS, AnsCoder
+from ArithmeticCoding import FREQUENCY_BITS, ArithmeticCoder, quantize_frequencies
+from Blocks import plan_tables, split_blocks
+from Codecs import CODEC_NAMES, StoredCodec, decode_chunk
+from ContextModel import DEFAULT_PRESET, PRESETS, ContextModel
+from Dictionary import DICTIONARY_EXTENSION, find_dictionary, get_dictionary_coder, load_dictionary
+from Histogram import count_segments, count_symbols, get_complete_end
+from HuffmanCoder import BYTE_ESCAPE, BYTE_ESCAPE_BITS, ESCAPE, ESCAPE_BITS, TABLE_BITS, HuffmanCoder
+from HuffmanTree import HuffmanTree, get_canonical_codes, limit_code_lengths, sort_canonical
+from Matches import LEVELS, WINDOW_SIZE, MatchFinder
+from Members import MemberWriter, count_members, find_member, find_members, is_directory, is_multiple_input, \
+    read_members, write_member
+from Sampling import SAMPLE_BUDGET, SAMPLING_MODES, SAMPLING_STRATIFIED, Sampler, fold_rare_symbols
+from Pipeline import END, Pipeline
+from Tokenizer import TOKENIZER_MODES, VOCABULARY_SIZE, build_tokenizer
+from Workers import check_worker_chunk, decode_worker_block, decode_worker_chunk, encode_worker_block, \
+    encode_worker_chunk, encode_worker_stream, get_data_checksum, get_table_coder, init_worker
+
+# Separators below are used only by version 1 files
 WORDS_SEPARATOR = '2'
 CHUNK_SEPARATOR = b'\xff\xff'
-# Optimal size for one chunk, this value brings best results
-PARTIAL_CHUNK_SIZE = 9000
-
-
-def read_args() -> None:
-    """
-    This function handles command line interface
-
-    :return:
-    """
-    parser = argparse.ArgumentParser(description='Custom text compressor writen by Gerardas Martynovas')
-    parser.add_argument('-f', type=str, metavar='<file path>', required=True, help='Path to target file')
-    parser.add_argument('-o', type=str, metavar='<file path>', required=True, help='Path to output file directory')
-    parser.add_argument('-e', action='store_true', help='Encode file')
-    parser.add_argument('-d', action='store_true', help='Decode file')
-    parser.add_argument('-c', type=int, help='Chunk size')
-    parser.add_argument(
-        '-p',
-        type=int,
-        help='Pool processes this tool is going to use.'
-    )
-    args = parser.parse_args()
-
-    if not os.path.exists(args.f):
-        parser.error('File not found: {}'.format(args.f))
-
-    if not (args.e or args.d):
-        parser.error('Undefined action, one of following actions is required: -e -d')
-
-    if args.e and args.d:
-        parser.error('Both actions cannot be simultaneously processed: -e -d')
-
-    if args.e:
-        encoder = HuffmanPartial(args.p, args.c)
-        encoder.encode(args.f, args.o)
-        return
-
-    if args.d:
-        decoder = HuffmanPartial(args.p, args.c)
-        decoder.decode(args.f, args.o)
-        return
-
-
-class Node:
-    """
-    Node object represents a single node in either binary graph or disjoint graph context
-
-    Properties
-    ----------
-    letter : str, optional
-        represents a single symbol
-    is_left : bool, optional
-        if node is connected to parent, notes if it is left or right children to that parent
-    probability : float
-        has probability for leafs and accumulated probability for all other nodes
-    has_parent : bool
-        notes if node is connected to parent node
-    created : int
-        some point in time node was created represented by integer
-    parent : Node, optional
-        parent node object
-    """
-    def __init__(self, created, probability, has_parent, letter=None, parent='', is_left=None):
-        """
-        Node constructor
-
-        :param created: int
-        :param probability: float
-        :param has_parent: bool
-        :param letter: str
-        :param parent: Node
-        :param is_left: bool
-        """
-        self.letter = letter
-        self.is_left = is_left
-        self.probability = probability
-        self.has_parent = has_parent
-        self.created = created
-        self.parent = parent
+# Chunks processed or waiting for processing per pool process, bounds memory used by coding
+CHUNKS_PER_PROCESS = 2
+# Buffer of output file, encoded chunks are written in large blocks
+WRITE_BUFFER_SIZE = 4194304
+# Path of standard input or output
+STANDARD_STREAM = '-'
+# File name stored in archives of standard input
+STANDARD_STREAM_NAME = 'stdin'
+
+CODER_HUFFMAN = 'huffman'
+CODER_ARITHMETIC = 'arithmetic'
+CODER_CONTEXT = 'context'
+CODER_ANS = 'ans'
+CODER_STORED = 'stored'
+CODERS = (CODER_HUFFMAN, CODER_ARITHMETIC, CODER_CONTEXT, CODER_ANS, CODER_STORED)
 
 
 class HuffmanPartial:
@@ -98,39 +64,119 @@ class HuffmanPartial:
 
     Properties
     ----------
+    binary : bool
+        notes if symbols are raw bytes instead of UTF-8 characters
     codes : dict
         has values of calculated huffman codes by symbol
     decoder : dict
         has values of decoded symbols by huffman code
+    coder : HuffmanCoder
+        lookup tables for encoding and decoding, ArithmeticCoder if arithmetic, ContextModel if context,
+        AnsCoder if ans, MatchFinder if decoded archive holds matches, StoredCodec if stored
     frequencies : dict
         has values of symbol frequencies by symbol
     text_len : int
-        total raw input file length
+        total raw input file length, 0 if codes were estimated from samples
     words : list
         list of unique symbols in raw input
-    graph : Node[]
-        all node objects in one array
-    creation_time : int
-        holds last used time point of node creation
+    tree : HuffmanTree
+        huffman tree built from symbol probabilities
     processing_cores : int
         count of processors used in parallel code execution
     chunk_size : int
         size of one chunk being processed at a time
+    sample_budget : int
+        bytes read while estimating codes, smaller files are counted whole
+    sampling : str
+        sampling mode, stratified or random
+    adaptive : bool
+        notes if file is split into blocks with own code tables
+    max_length : int
+        maximum code length in bits, none for unlimited codes
+    tokens : str
+        tokenizer mode, none if symbols are single characters
+    vocabulary_size : int
+        maximum count of multi character tokens
+    tokenizer : Tokenizer
+        tokenizer of encoded file
+    matcher : MatchFinder
+        match finder of encoded file, none unless chunks are coded as literals and matches
+    matches : bool
+        notes if decoded archive chunks are coded as literals and matches
+    arithmetic : bool
+        notes if symbols are arithmetic coded instead of huffman coded
+    ans : bool
+        notes if symbols are coded with asymmetric numeral systems instead of huffman coded
+    model : dict
+        quantized frequencies of arithmetic or asymmetric numeral systems coder by symbol
+    context : bool
+        notes if symbols are arithmetic coded with context model
+    preset : str
+        speed and memory preset of context model
+    stored : bool
+        notes if chunks are stored without any coding
+    codecs : bool
+        notes if decoded archive chunks start with codec id
+    codec_counts : Counter
+        count of written chunks by codec id
+    checksum : int
+        CRC32 of content decoded so far
+    checked_size : int
+        bytes of content decoded so far
+    members : list
+        Member of every file of multiple file archive, none for single file archives
+    base_path : str
+        directory member names of encoded multiple file archive are relative to
+    dictionary_path : str
+        dictionary file to encode with, or dictionary file or directory where dictionary of decoded archive is found
+    dictionary : Dictionary
+        dictionary of encoded file, none unless codes come from trained dictionary
+    streaming : bool
+        notes if encoded input or output is a standard stream, written chunks are flushed at once
+    lost_bits : int
+        bits of encoded symbols lost by limiting code lengths
+    timings : dict
+        seconds spent by stage name in the last encoding, decoding or test, busy seconds of pipeline stages are
+        named after stage and pipeline stage, such as encode_process
+    table : bytes
+        packed code table of the last written block
+    table_offset : int
+        offset of the last written code table frame
+    table_coders : dict
+        coders of block code tables used by extraction by table frame offset
+    archive : ArchiveReader
+        reader of decoded archive, none for version 1 files
     """
-    def __init__(self, processes, chunk_size):
+    def __init__(self, processes, chunk_size, binary=False, sample_budget=None, sampling=None, adaptive=False,
+                 max_length=None, tokens=None, vocabulary_size=None, level=None, window=None,
+                 coder=None, preset=None, dictionary=None):
         """
         HuffmanPartial constructor
 
         :param processes: int
         :param chunk_size: int
+        :param binary: bool
+        :param sample_budget: int
+        :param sampling: str
+        :param adaptive: bool
+        :param max_length: int
+        :param tokens: str
+        :param vocabulary_size: int
+        :param level: int, match level, none to code symbols without matches
+        :param window: int
+        :param coder: str, entropy coder, huffman by default
+        :param preset: str, preset of context coder
+        :param dictionary: str, path of dictionary file or directory of dictionary files
         """
+        # matches are found in raw bytes
+        self.binary = binary or bool(level)
         self.codes = None
         self.decoder = None
+        self.coder = None
         self.frequencies = None
         self.text_len = 0
         self.words = None
-        self.graph = []
-        self.creation_time = 0
+        self.tree = HuffmanTree([])
         # default processors used in program equals to cpu cores available in system
         self.processes = multiprocessing.cpu_count()
         if processes:
@@ -139,46 +185,81 @@ class HuffmanPartial:
         self.chunk_size = 10485760
         if chunk_size:
             self.chunk_size = chunk_size
-
-    def create_node(self, probability, has_parent, letter=None, parent=None, is_left=None) -> Node:
+        self.sample_budget = SAMPLE_BUDGET
+        if sample_budget:
+            self.sample_budget = sample_budget
+        self.sampling = sampling or SAMPLING_STRATIFIED
+        self.adaptive = adaptive
+        self.max_length = max_length
+        self.lost_bits = 0
+        self.timings = {}
+        self.tokens = tokens
+        self.vocabulary_size = VOCABULARY_SIZE
+        if vocabulary_size:
+            self.vocabulary_size = vocabulary_size
+        self.tokenizer = None
+        self.matcher = MatchFinder(level, window or WINDOW_SIZE) if level else None
+        self.matches = False
+        self.arithmetic = coder == CODER_ARITHMETIC
+        self.ans = coder == CODER_ANS
+        self.model = None
+        self.context = coder == CODER_CONTEXT
+        self.preset = preset or DEFAULT_PRESET
+        self.stored = coder == CODER_STORED
+        self.codecs = False
+        self.codec_counts = Counter()
+        self.checksum = 0
+        self.checked_size = 0
+        self.members = None
+        self.base_path = None
+        self.dictionary_path = dictionary
+        self.dictionary = None
+        self.streaming = False
+        self.table = None
+        self.table_offset = 0
+        self.table_coders = {}
+        self.archive = None
+
+    def open_input(self, file_path):
         """
-        Creates and returns Node object
+        Opens raw input file in binary or text mode, newlines are never translated
 
-        :param probability: float
-        :param has_parent: bool
-        :param letter: str
-        :param parent: Node
-        :param is_left: bool
-        :return: Node
+        :param file_path: str
+        :return: BufferedReader or TextIOWrapper
         """
-        self.creation_time += 1
-
-        return Node(self.creation_time, probability, has_parent, letter, parent, is_left)
+        if file_path == STANDARD_STREAM:
+            file_path = sys.stdin.fileno()
+        if self.binary:
+            return open(file_path, 'rb', closefd=not isinstance(file_path, int))
+        return open(file_path, 'r', encoding='utf8', newline='', closefd=not isinstance(file_path, int))
 
-    def is_graph_joined(self) -> bool:
+    @staticmethod
+    def open_encoded(file_path):
         """
-        Returns true if graph is joint, false if disjoint
+        Opens encoded file or standard input
 
-        :return: bool
+        :param file_path: str
+        :return: BufferedReader
         """
-        nodes_without_parents = 0
-
-        for node in self.graph:
-            if not node.parent:
-                nodes_without_parents += 1
+        if file_path == STANDARD_STREAM:
+            return open(sys.stdin.fileno(), 'rb', closefd=False)
+        return open(file_path, 'rb')
 
-        return nodes_without_parents == 1
-
-    def sort_nodes(self) -> None:
+    def open_output(self, file_path, buffering=-1):
         """
-        Sorts all nodes in graph by following order:
-            - node has parent
-            - probability of node
-            - crated time point
+        Opens decoded output file in binary or text mode, newlines are never translated
 
-        :return: None
+        :param file_path: str
+        :param buffering: int
+        :return: BufferedWriter or TextIOWrapper
         """
-        self.graph.sort(key=operator.attrgetter('has_parent', 'probability', 'created'))
+        if file_path == STANDARD_STREAM:
+            # messages may be redirected from sys.stdout, data always goes to the original standard output
+            file_path = sys.__stdout__.fileno()
+        if self.binary:
+            return open(file_path, 'wb', buffering=buffering, closefd=not isinstance(file_path, int))
+        return open(file_path, 'w', encoding='utf8', newline='', buffering=buffering,
+                    closefd=not isinstance(file_path, int))
 
     def connect_all_nodes(self) -> None:
         """
@@ -186,66 +267,50 @@ class HuffmanPartial:
 
         :return: None
         """
-        while not self.is_graph_joined():
-            node1, node2 = self.graph[0], self.graph[1]
-            parent_probability = node1.probability + node2.probability
-            parent_node = self.create_node(parent_probability, False)
-            self.graph.append(parent_node)
-
-            node1.parent, node2.parent = parent_node, parent_node
-            node1.has_parent, node2.has_parent = True, True
-
-            if node1.probability > node2.probability:
-                node1.is_left, node2.is_left = True, False
-            else:
-                node1.is_left, node2.is_left = False, True
-
-            self.sort_nodes()
+        self.tree.build()
 
-    def get_code(self, node, code='') -> str:
+    def get_all_codes(self) -> dict:
         """
-        Recursively get huffman code for a single symbol
+        Get huffman codes for all known symbols
 
-        :param node: Node
-        :param code: str
-        :return: str
+        :return: dict
         """
-        if node.parent:
-            if node.is_left:
-                code += '1'
-            else:
-                code += '0'
-
-            return self.get_code(node.parent, code)
+        codes = self.tree.get_codes()
 
-        return code
+        return {word: codes[word] for word in self.words}
 
-    def get_letter_code(self, symbol) -> str:
+    def get_canonical_code_lengths(self) -> list:
         """
-        Get huffman code for given symbol
+        Get code lengths of all known symbols in canonical order, lengths are limited to max_length if set.
+        If codes of max_length bits cannot hold all symbols, the rarest are coded as escape and raw symbol
 
-        :param symbol: str
-        :return: str
+        :return: list
         """
-        for node in self.graph:
-            if node.letter == symbol:
-                return self.get_code(node)[::-1]
-
-    def get_all_codes(self) -> dict:
+        code_lengths = self.tree.get_code_lengths()
+        if self.max_length and max(code_lengths.values(), default=0) > self.max_length:
+            escape = BYTE_ESCAPE if self.binary else ESCAPE
+            escape_bits = BYTE_ESCAPE_BITS if self.binary else ESCAPE_BITS
+            limited = limit_code_lengths(fold_rare_symbols(self.frequencies, self.max_length, escape), self.max_length)
+            self.lost_bits = sum(
+                count * (limited[symbol] if symbol in limited else limited[escape] + escape_bits)
+                - count * code_lengths[symbol] for symbol, count in self.frequencies.items()
+            )
+            code_lengths = limited
+
+        return sort_canonical(code_lengths)
+
+    def report_length_limit(self) -> None:
         """
-        Get huffman codes for all known symbols
+        Prints ratio lost by limiting code lengths, based on counted or sampled frequencies
 
-        :return: dict
+        :return: None
         """
-        codes = {}
-
-        for word in self.words:
-            code = self.get_letter_code(word)
-            if not code:
-                code = '0'
-            codes[word] = code
-
-        return codes
+        if not (self.max_length and self.frequencies):
+            return
+        total_symbols = sum(self.frequencies.values())
+        print('Codes limited to {} bits, {:.4f} bits per symbol lost'.format(
+            self.max_length, self.lost_bits / total_symbols if total_symbols else 0.0
+        ))
 
     def get_probabilities(self, total_letters) -> dict:
         """
@@ -275,158 +340,336 @@ class HuffmanPartial:
 
         return sorted(probabilities.items(), key=operator.itemgetter(1))
 
-    def encode_one_symbol(self, symbol) -> str:
+    def prepare_graph(self, file_path) -> None:
         """
-        Returns huffman code for a single symbol
+        Calculates huffman codes for given file
 
-        :param symbol: str
-        :return: str
+        :param file_path: str
+        :return: None
         """
-        return self.codes[symbol]
+        print('Preparing huffman codes...')
+        start_time = time.time()
+        self.text_len = 0
+
+        if self.tokens:
+            # vocabulary and token counts need the whole file
+            self.tokenizer, self.frequencies, self.text_len = build_tokenizer(
+                file_path, self.processes, self.tokens, self.vocabulary_size
+            )
+            print('{} tokens in vocabulary'.format(len(self.tokenizer.vocabulary)))
+        elif self.members is not None:
+            # all files share one code table
+            self.frequencies, self.text_len = count_members(
+                self.base_path, self.members, self.processes, self.sample_budget
+            )
+        elif os.path.getsize(file_path) <= self.sample_budget:
+            # whole file fits into budget, count it exactly in a single parallel pass
+            self.frequencies, self.text_len = count_symbols(file_path, self.processes, self.binary)
+        else:
+            sampler = Sampler(file_path, self.sample_budget, self.sampling, self.binary)
+            self.frequencies = sampler.estimate_frequencies()
+            print('Sampled {} bytes, loss {} bits per symbol'.format(
+                sampler.sampled, 'unknown' if sampler.loss is None else round(sampler.loss, 4)
+            ))
+        self.words = list(self.frequencies)
+
+        self.tree = HuffmanTree(self.get_probabilities_sorted())
+        self.connect_all_nodes()
+        self.record_stage('prepare', start_time)
 
-    def all_symbols_used(self, all_codes) -> bool:
+    def prepare_blocks(self, file_path) -> list:
         """
-        Returns true if given codes contains all symbols known from raw input file
+        Splits file into blocks where symbol statistics change and calculates code table of every block
 
-        :param all_codes: dict
-        :return: bool
+        :param file_path: str
+        :return: list of (start, end, packed code table) tuples, start and end are byte offsets
         """
-        for letter in self.words:
-            if letter not in all_codes.keys():
-                return False
-        return True
+        print('Splitting blocks...')
+        start_time = time.time()
+        blocks = split_blocks(count_segments(file_path, self.processes, self.binary), self.chunk_size, self.binary)
+        plan, self.lost_bits = plan_tables(blocks, self.binary, self.max_length)
+        self.frequencies = sum((frequencies for _, _, frequencies in blocks), Counter())
+
+        tables = sum(1 for block, (_, _, table) in enumerate(plan) if not block or table is not plan[block - 1][2])
+        print('{} blocks, {} code tables'.format(len(plan), tables))
+        self.record_stage('prepare', start_time)
+
+        return plan
 
     @staticmethod
-    def compare_codes(compare_to, compare) -> bool:
+    def read_blocks(data_stream, plan):
         """
-        Returns true if every symbol in compare_to and compare match in length, returns false otherwise
+        Reads raw blocks one by one from input file data stream
 
-        :param compare_to: dict
-        :param compare: dict
-        :return: bool
+        :param data_stream: BufferedReader
+        :param plan: list of (start, end, packed code table) tuples
+        :return: Generator of (raw block, packed code table) tuples
         """
-        for symbol in compare:
-            c_len = len(compare[symbol])
-            ct_len = len(compare_to[symbol])
+        for start, end, table in plan:
+            yield data_stream.read(end - start), table
 
-            if c_len != ct_len:
-                return False
-        return True
+    def record_stage(self, stage, start_time, pipeline=None) -> None:
+        """
+        Records and prints seconds spent by stage since start time and busy seconds of its pipeline stages
 
-    def prepare_graph(self, file_path) -> None:
+        :param stage: str
+        :param start_time: float
+        :param pipeline: Pipeline
+        :return: None
         """
-        Calculates huffman codes for given file
+        self.timings[stage] = time.time() - start_time
+        print(self.timings[stage])
+        if pipeline is None:
+            return
+        for name, busy in pipeline.busy.items():
+            self.timings['{}_{}'.format(stage, name)] = busy
+        print(pipeline.report())
+
+    def write_block(self, archive, encoded) -> None:
+        """
+        Writes one encoded block, its code table is written before it unless previous block used it too
 
-        :param file_path: str
+        :param archive: ArchiveWriter
+        :param encoded: tuple of encoded block, block length, newline count in block, checksum and byte length
+            of block and packed code table
         :return: None
         """
-        self.text_len = 0
-        print('Preparing huffman codes...')
-        start_time = time.time()
-        self.frequencies = {}
-        words = set()
-        current_codes = None
+        table = encoded[-1]
+        if table != self.table:
+            self.table = table
+            self.table_offset = archive.write_table(table)
+        self.write_chunk(archive, encoded[:-1], self.table_offset)
 
-        # get all unique symbols
-        with open(file_path, 'r', encoding='utf8') as rf:
-            while True:
-                chunk = rf.read(self.chunk_size)
-                if not chunk:
-                    break
-                self.text_len += len(chunk)
-                words = words.union(set(chunk))
-            self.words = list(words)
+    def write_chunk(self, archive, encoded, table=0) -> None:
+        """
+        Writes one encoded chunk and counts its codec
+
+        :param archive: ArchiveWriter
+        :param encoded: tuple of encoded chunk, chunk length, newline count in chunk, checksum and byte length
+            of chunk
+        :param table: int, offset of code table frame, 0 if chunk is coded with header codes
+        :return: None
+        """
+        data, size, lines, checksum, raw_size = encoded
+        self.codec_counts[data[0]] += 1
+        archive.write_chunk(data, size, lines, table, checksum, raw_size)
+        if self.streaming:
+            archive.data_stream.flush()
+
+    def report_codecs(self) -> None:
+        """
+        Prints count of written chunks by codec
+
+        :return: None
+        """
+        if not self.codec_counts:
+            return
+        print('Chunks by codec: {}'.format(', '.join(
+            '{} {}'.format(CODEC_NAMES[codec], count) for codec, count in sorted(self.codec_counts.items())
+        )))
+
+    def read_stream(self, raw=False):
+        """
+        Reads standard input in chunks as it comes, text chunks never end inside UTF-8 sequence
+
+        :param raw: bool, notes if text chunks are kept as UTF-8 bytes
+        :return: Generator of str or bytes
+        """
+        data_stream = sys.stdin.buffer
+        rest = b''
+        while True:
+            block = data_stream.read(self.chunk_size)
+            data = rest + block
+            if not data:
+                return
+            # at end of input, incomplete sequence is left for decoding to refuse
+            end = len(data) if self.binary or not block else get_complete_end(data)
+            rest = data[end:]
+            if end:
+                yield data[:end] if self.binary or raw else data[:end].decode('utf8')
+
+    def read_source(self, file_path, raw=False):
+        """
+        Reads raw input in chunks, files of multiple file archive follow each other
+
+        :param file_path: str
+        :param raw: bool, notes if text chunks of standard input are kept as UTF-8 bytes
+        :return: Generator of str or bytes
+        """
+        if self.members is not None:
+            yield from read_members(self.base_path, self.members, self.chunk_size)
+            return
 
-        # calculate codes for whole file
-        with open(file_path, 'r', encoding='utf8') as rf:
+        if file_path == STANDARD_STREAM:
+            yield from self.read_stream(raw)
+            return
+
+        with self.open_input(file_path) as rf:
             while True:
-                self.graph = []
-                self.creation_time = 0
-                # read one chunk
-                chunk = rf.read(PARTIAL_CHUNK_SIZE)
+                chunk = rf.read(self.chunk_size)
                 if not chunk:
-                    break
-                for letter in set(chunk):
-                    if letter in self.frequencies:
-                        self.frequencies[letter] += chunk.count(letter)
-                    else:
-                        self.frequencies[letter] = chunk.count(letter)
-
-                # calculate codes for one chunk
-                try:
-                    probabilities = self.get_probabilities_sorted()
-                except KeyError:
-                    continue
-                for word in probabilities:
-                    letter = word[0]
-                    probability = word[1]
-                    node = Node(0, probability, False, letter)
-                    self.graph.append(node)
-
-                # check if code lengths differ
-                self.connect_all_nodes()
-                codes = self.get_all_codes()
-                if current_codes:
-                    are_similar = self.compare_codes(current_codes, codes)
-                    if are_similar:
-                        print(time.time() - start_time)
-                        return
-
-                current_codes = codes
-
-        self.connect_all_nodes()
-        print(time.time() - start_time)
+                    return
+                yield chunk
 
     def encode(self, file_path, output_file_path) -> None:
         """
-        Encodes given input file with huffman codes and writes it to given output
+        Encodes given input file, or all files of given directory or glob pattern, and writes it to given output.
+        Standard input is read once, unless another coder is set its chunks are huffman coded with code tables
+        of their own written in between chunks
 
         :param file_path: str
         :param output_file_path: str
         :return: None
         """
-        self.prepare_graph(file_path)
+        self.timings = {}
+        stream_input = file_path == STANDARD_STREAM
+        self.streaming = stream_input or output_file_path == STANDARD_STREAM
+        if stream_input and (self.adaptive or self.tokens or self.arithmetic or self.ans):
+            raise ValueError('Standard input is coded in one pass with code tables of every chunk')
+        self.dictionary = load_dictionary(self.dictionary_path) if self.dictionary_path else None
+        # code tables of standard input are built by workers for every chunk
+        in_band = stream_input and not (self.matcher or self.context or self.stored or self.dictionary)
+        self.members = None
+        if is_multiple_input(file_path):
+            if self.adaptive or self.tokens:
+                raise ValueError('Multiple files are encoded as raw bytes with single code table')
+            self.base_path, self.members = find_members(file_path)
+            # files may be of any kind, they are archived byte for byte
+            self.binary = True
+            print('{} files, {} bytes, coded as raw bytes with one code table shared by all files'.format(
+                len(self.members), sum(member.size for member in self.members)
+            ))
+        if self.dictionary and self.dictionary.binary != self.binary:
+            raise ValueError('Dictionary of {} cannot code {}'.format(
+                *(('bytes', 'text') if self.dictionary.binary else ('text', 'bytes'))
+            ))
+        if self.adaptive:
+            plan = self.prepare_blocks(file_path)
+        elif not (self.matcher or self.context or self.stored or self.dictionary or stream_input):
+            self.prepare_graph(file_path)
         print('Encoding...')
         start_time = time.time()
         dir_split = '/'
         if os.sys.platform == 'win32':
             dir_split = "\\"
-        file_name = file_path.split(dir_split)[-1]
+        # multiple file archive is named after directory of its files
+        source_path = file_path if self.members is None else os.path.abspath(self.base_path)
+        file_name = STANDARD_STREAM_NAME if stream_input else source_path.split(dir_split)[-1]
         file_name_wo_ext = file_name.split('.', 1)[0]
         file_name_output = '{}{}{}.gm'.format(output_file_path, dir_split, file_name_wo_ext)
-
-        c_time = os.path.getctime(file_path)
-        m_time = os.path.getmtime(file_path)
-
-        properties = '{} {} {} '.format(file_name, c_time, m_time)
-
-        # write document data into file
-        with open(file_name_output, 'wb') as wf:
-            wf.write(properties.encode())
-
-        # write decoder into file
-        self.codes = self.get_all_codes()
-        with open(file_name_output, 'ab') as wf:
-            for letter in self.codes:
-                wf.write(letter.encode())
-                wf.write(self.codes[letter].encode())
-                wf.write(WORDS_SEPARATOR.encode())
-            wf.write(CHUNK_SEPARATOR)
-
-        # write encoded data into file
-        with open(file_path, 'r', encoding='utf8') as rf:
-            for _ in range(0, self.text_len, self.chunk_size):
-                bits = '1'
-                chunk = rf.read(self.chunk_size)
-
-                pool = Pool(self.processes)
-                bits += ''.join(pool.map(self.encode_one_symbol, chunk))
-
-                with open(file_name_output, 'ab') as wf:
-                    wf.write(int(bits, 2).to_bytes(len(bits) // 8 + 1, 'little'))
-                    wf.write(CHUNK_SEPARATOR)
-                gc.collect()
-        print(time.time() - start_time)
+        if output_file_path == STANDARD_STREAM:
+            file_name_output = sys.__stdout__.fileno()
+
+        c_time = time.time() if stream_input else os.path.getctime(source_path)
+        m_time = time.time() if stream_input else os.path.getmtime(source_path)
+
+        sections = {SECTION_PROPERTIES: pack_properties(file_name, c_time, m_time)}
+        if self.members is not None:
+            sections[SECTION_MEMBERS] = pack_members(self.members)
+        flags = FLAG_CODECS | (FLAG_BYTES if self.binary else 0)
+        self.codec_counts = Counter()
+        if self.adaptive or in_band:
+            flags |= FLAG_BLOCKS
+            self.codes = None
+            self.table = None
+        elif self.matcher:
+            # every chunk holds code tables of its own streams
+            flags |= FLAG_MATCHES
+            self.codes = None
+        elif self.context:
+            # model learns symbols while coding, there is nothing to store but its parameters
+            flags |= FLAG_CONTEXT
+            self.codes = None
+            order, max_contexts = PRESETS[self.preset]
+            self.coder = ContextModel(order, max_contexts, self.binary)
+            sections[SECTION_CONTEXT_MODEL] = CONTEXT_MODEL.pack(order, max_contexts)
+        elif self.stored:
+            flags |= FLAG_STORED
+            self.codes = None
+            self.coder = StoredCodec(self.binary)
+        elif self.arithmetic or self.ans:
+            flags |= FLAG_ANS if self.ans else FLAG_ARITHMETIC
+            self.codes = None
+            escape = BYTE_ESCAPE if self.binary else ESCAPE
+            self.model = quantize_frequencies(self.frequencies, ANS_BITS if self.ans else FREQUENCY_BITS, escape)
+            if self.ans:
+                self.coder = AnsCoder(self.model, self.binary)
+            sections[SECTION_FREQUENCIES] = pack_frequencies(
+                sorted((symbol, frequency) for symbol, frequency in self.model.items() if symbol != escape),
+                self.model.get(escape, 0),
+                self.binary
+            )
+        elif self.dictionary:
+            # codes are known to decoder which has the dictionary
+            self.codes = get_dictionary_coder(self.dictionary).codes
+            sections[SECTION_DICTIONARY] = DICTIONARY_ID.pack(self.dictionary.id)
+        else:
+            code_lengths = self.get_canonical_code_lengths()
+            self.codes = get_canonical_codes(code_lengths)
+            escape = BYTE_ESCAPE if self.binary else ESCAPE
+            symbol_lengths = [(symbol, length) for symbol, length in code_lengths if symbol != escape]
+            if self.tokenizer:
+                sections[SECTION_VOCABULARY] = pack_vocabulary(
+                    [(token, length) for token, length in symbol_lengths if len(token) > 1]
+                )
+                symbol_lengths = [(symbol, length) for symbol, length in symbol_lengths if len(symbol) == 1]
+            if self.binary:
+                sections[SECTION_BYTE_CODE_LENGTHS] = pack_byte_code_lengths(symbol_lengths)
+            else:
+                sections[SECTION_CODE_LENGTHS] = pack_code_lengths(symbol_lengths)
+            if escape in self.codes:
+                sections[SECTION_ESCAPE] = bytes((len(self.codes[escape]),))
+
+        with open(file_name_output, 'wb', buffering=WRITE_BUFFER_SIZE,
+                  closefd=not isinstance(file_name_output, int)) as wf:
+            archive = ArchiveWriter(wf)
+            archive.write_header(sections, flags)
+
+            # write encoded data into file, reading, encoding by one long living pool and writing overlap
+            with Pool(
+                self.processes,
+                initializer=init_worker,
+                initargs=(
+                    self.codes,
+                    self.binary,
+                    self.tokenizer,
+                    self.matcher,
+                    self.model if self.arithmetic else None,
+                    self.coder if self.context or self.ans or self.stored else None,
+                    True,
+                    self.max_length
+                )
+            ) as pool:
+                pipeline = Pipeline(pool, self.processes, self.processes * CHUNKS_PER_PROCESS)
+                if self.adaptive:
+                    with open(file_path, 'rb') as rf:
+                        blocks = self.read_blocks(rf, plan)
+                        pipeline.run(
+                            lambda: next(blocks, END),
+                            encode_worker_block,
+                            lambda encoded: self.write_block(archive, encoded)
+                        )
+                elif in_band:
+                    chunks = self.read_source(file_path, raw=True)
+                    pipeline.run(
+                        lambda: next(chunks, END),
+                        encode_worker_stream,
+                        lambda encoded: self.write_block(archive, encoded)
+                    )
+                else:
+                    chunks = self.read_source(file_path)
+                    pipeline.run(
+                        lambda: next(chunks, END),
+                        encode_worker_chunk,
+                        lambda encoded: self.write_chunk(archive, encoded)
+                    )
+                pool.close()
+                pool.join()
+
+            archive.write_footer()
+        self.record_stage('encode', start_time, pipeline)
+        self.report_codecs()
+        self.report_length_limit()
 
     @staticmethod
     def read_properties(data_stream) -> str:
@@ -441,54 +684,162 @@ class HuffmanPartial:
             f_bytes += data_stream.read(1)
         return f_bytes.decode()
 
-    def read_decoder(self, file_path):
+    def read_code_decoder(self, data_stream) -> None:
         """
-        Reads decoder and encoded data chunks from given file
+        Reads decoder stored as symbol and code pairs byte by byte from encoded file data stream
 
-        :param file_path: str
-        :return: dict, ByteArray
+        :param data_stream: BufferedReader
+        :return: None
+        """
+        # lc stands for letter and code
+        lc = []
+        code = ''
+
+        while True:
+            byte = data_stream.read(1)
+
+            try:
+                decoded_byte = byte.decode()
+            except UnicodeDecodeError:
+                second_byte = data_stream.read(1)
+                if second_byte == b'\xff':
+                    break
+                decoded_byte = (byte + second_byte).decode()
+
+            if not lc:
+                lc.append(decoded_byte)
+            elif decoded_byte != WORDS_SEPARATOR:
+                code += decoded_byte
+            else:
+                lc.append(code)
+                code = ''
+
+            if len(lc) == 2:
+                self.decoder[lc[1]] = lc[0]
+                lc.clear()
+
+    def read_chunks(self, data_stream, index=None):
+        """
+        Reads encoded data chunks one by one from encoded file data stream, with their decoded length
+        if archive records it
+
+        :param data_stream: BufferedReader
+        :param index: list of IndexEntry chunk frames are checked against, none if archive index is not read
+        :return: Generator of (encoded chunk, decoded length or none) tuples
+        """
+        if self.archive and self.adaptive:
+            for chunk, size in self.archive.read_chunks(index):
+                yield (chunk, self.archive.table), size
+            return
+
+        if self.archive:
+            yield from self.archive.read_chunks(index)
+            return
+
+        data = b''
+        while True:
+            block = data_stream.read(self.chunk_size)
+            if not block:
+                break
+            chunks = (data + block).split(CHUNK_SEPARATOR)
+            data = chunks.pop()
+            yield from ((chunk, None) for chunk in chunks)
+        yield data, None
+
+    def read_decoder(self, data_stream) -> dict:
         """
+        Reads document properties and decoder from encoded file data stream, accepts version 1 files too
+
+        :param data_stream: BufferedReader
+        :return: dict
+        """
+        if is_archive(data_stream):
+            self.archive = ArchiveReader(data_stream)
+            sections = self.archive.read_header()
+            self.binary = bool(self.archive.flags & FLAG_BYTES)
+            self.adaptive = bool(self.archive.flags & FLAG_BLOCKS)
+            self.matches = bool(self.archive.flags & FLAG_MATCHES)
+            self.arithmetic = bool(self.archive.flags & FLAG_ARITHMETIC)
+            self.context = bool(self.archive.flags & FLAG_CONTEXT)
+            self.ans = bool(self.archive.flags & FLAG_ANS)
+            self.stored = bool(self.archive.flags & FLAG_STORED)
+            self.codecs = bool(self.archive.flags & FLAG_CODECS)
+            self.members = unpack_members(sections[SECTION_MEMBERS]) if SECTION_MEMBERS in sections else None
+            self.table_coders = {}
+            if self.adaptive:
+                self.coder = None
+                return unpack_properties(sections[SECTION_PROPERTIES])
+            if self.matches:
+                self.coder = MatchFinder()
+                return unpack_properties(sections[SECTION_PROPERTIES])
+            if self.stored:
+                self.coder = StoredCodec(self.binary)
+                return unpack_properties(sections[SECTION_PROPERTIES])
+            if self.context:
+                self.coder = ContextModel(*CONTEXT_MODEL.unpack(sections[SECTION_CONTEXT_MODEL]), self.binary)
+                return unpack_properties(sections[SECTION_PROPERTIES])
+            if SECTION_DICTIONARY in sections:
+                self.coder = get_dictionary_coder(self.find_dictionary(sections[SECTION_DICTIONARY]))
+                return unpack_properties(sections[SECTION_PROPERTIES])
+            if self.arithmetic or self.ans:
+                frequencies, escape_frequency = unpack_frequencies(sections[SECTION_FREQUENCIES], self.binary)
+                self.model = dict(frequencies)
+                if escape_frequency:
+                    self.model[BYTE_ESCAPE if self.binary else ESCAPE] = escape_frequency
+                self.coder = (AnsCoder if self.ans else ArithmeticCoder)(self.model, self.binary)
+                return unpack_properties(sections[SECTION_PROPERTIES])
+            if self.binary:
+                code_lengths = unpack_byte_code_lengths(sections[SECTION_BYTE_CODE_LENGTHS])
+            else:
+                code_lengths = unpack_code_lengths(sections[SECTION_CODE_LENGTHS])
+            if SECTION_VOCABULARY in sections:
+                code_lengths = sort_canonical(dict(code_lengths + unpack_vocabulary(sections[SECTION_VOCABULARY])))
+            if SECTION_ESCAPE in sections:
+                escape = BYTE_ESCAPE if self.binary else ESCAPE
+                code_lengths = sort_canonical({**dict(code_lengths), escape: sections[SECTION_ESCAPE][0]})
+            self.coder = HuffmanCoder(get_canonical_codes(code_lengths), self.binary)
+            return unpack_properties(sections[SECTION_PROPERTIES])
+
+        self.archive = None
+        self.binary = False
+        self.adaptive = False
+        self.matches = False
+        self.arithmetic = False
+        self.context = False
+        self.ans = False
+        self.stored = False
+        self.codecs = False
+        self.members = None
         self.decoder = {}
-        properties = {}
+        properties = {
+            'f_name': self.read_properties(data_stream).strip(),
+            'f_created': float(self.read_properties(data_stream)),
+            'f_modified': float(self.read_properties(data_stream)),
+        }
 
-        with open(file_path, 'rb') as rf:
-            properties['f_name'] = self.read_properties(rf).strip()
-            properties['f_created'] = float(self.read_properties(rf))
-            properties['f_modified'] = float(self.read_properties(rf))
+        self.read_code_decoder(data_stream)
 
-            # lc stands for letter and code
-            lc = []
-            code = ''
+        self.coder = HuffmanCoder({symbol: code for code, symbol in self.decoder.items()})
 
-            # Read encoded document byte by byte and read decoder
-            while True:
-                byte = rf.read(1)
-
-                try:
-                    decoded_byte = byte.decode()
-                except UnicodeDecodeError:
-                    second_byte = rf.read(1)
-                    if second_byte == b'\xff':
-                        break
-                    decoded_byte = (byte + second_byte).decode()
-
-                if not lc:
-                    lc.append(decoded_byte)
-                elif decoded_byte != WORDS_SEPARATOR:
-                    code += decoded_byte
-                else:
-                    lc.append(code)
-                    code = ''
+        return properties
 
-                if len(lc) == 2:
-                    self.decoder[lc[1]] = lc[0]
-                    lc.clear()
+    def find_dictionary(self, section):
+        """
+        Finds dictionary of decoded archive in dictionary file or directory
 
-            # Read encoded data
-            data_in_bytes = rf.read()
-            data_chunks = data_in_bytes.split(b'\xff\xff')
+        :param section: bytes, payload of dictionary section
+        :return: Dictionary
+        """
+        dictionary_id, = DICTIONARY_ID.unpack(section)
+        if not self.dictionary_path:
+            raise ValueError('Archive is coded with dictionary {:08x}, path of dictionary is required'.format(
+                dictionary_id
+            ))
+        dictionary = find_dictionary(self.dictionary_path, dictionary_id)
+        if dictionary.binary != self.binary:
+            raise ValueError('Dictionary {:08x} does not match coding mode of archive'.format(dictionary_id))
 
-            return properties, data_chunks
+        return dictionary
 
     def decode_chunk(self, chunk) -> str:
         """
@@ -497,17 +848,63 @@ class HuffmanPartial:
         :param chunk: ByteArray
         :return: str
         """
-        bits = format(int.from_bytes(chunk, 'little'), 'b')[1:]
+        return self.coder.decode(chunk)
 
-        data = ''
-        coded_symbol = ''
-        for bit in bits:
-            coded_symbol += bit
-            if coded_symbol in self.decoder:
-                data += self.decoder[coded_symbol]
-                coded_symbol = ''
+    def decode_chunks(self, data_stream, output_stream=None) -> Pipeline:
+        """
+        Decodes all chunks following decoder in encoded file data stream in parallel and verifies checksums
+        of chunks and of whole content, decoded data is only checked if there is no output stream
 
-        return data
+        :param data_stream: BufferedReader
+        :param output_stream: BufferedWriter or TextIOWrapper
+        :return: Pipeline
+        """
+        codes = self.coder.codes if isinstance(self.coder, HuffmanCoder) else None
+        model = self.model if self.arithmetic else None
+        coder = self.coder if codes is None and model is None else None
+        # index of piped archive cannot be read first, only checksum of whole content is verified then
+        index = self.archive.read_index() if self.archive and data_stream.seekable() else None
+        self.checksum = 0
+        self.checked_size = 0
+        with Pool(
+            self.processes,
+            initializer=init_worker,
+            initargs=(codes, self.binary, None, None, model, coder, self.codecs)
+        ) as pool:
+            # chunks are written in order, only a few of them are held in memory at once
+            chunks = self.read_chunks(data_stream, index)
+            entries = repeat(None) if index is None else iter(index)
+            worker = decode_worker_block if self.adaptive else decode_worker_chunk
+            tasks = (
+                (worker, chunk, size, entry, output_stream is not None) for (chunk, size), entry in zip(chunks, entries)
+            )
+            pipeline = Pipeline(pool, self.processes, self.processes * CHUNKS_PER_PROCESS)
+            pipeline.run(
+                lambda: next(tasks, END),
+                check_worker_chunk,
+                lambda result: self.write_decoded(output_stream, result)
+            )
+            pool.close()
+            pool.join()
+
+        if self.archive and self.archive.checksum != self.checksum:
+            raise ValueError('Checksum mismatch of whole content')
+
+        return pipeline
+
+    def write_decoded(self, output_stream, result) -> None:
+        """
+        Writes one decoded chunk unless there is no output stream and adds it to checksum of whole content
+
+        :param output_stream: BufferedWriter or TextIOWrapper
+        :param result: tuple of decoded data, checksum and byte length of decoded data
+        :return: None
+        """
+        data, checksum, raw_size = result
+        if output_stream is not None:
+            output_stream.write(data)
+        self.checksum = combine_checksums(self.checksum, checksum, raw_size)
+        self.checked_size += raw_size
 
     def decode(self, file_path, output_file_path) -> None:
         """
@@ -517,21 +914,406 @@ class HuffmanPartial:
         :param output_file_path: str
         :return: None
         """
+        self.timings = {}
+        start_time = time.time()
+
+        with self.open_encoded(file_path) as rf:
+            properties = self.read_decoder(rf)
+            output_file = '{}/{}'.format(output_file_path, properties['f_name'])
+            if output_file_path == STANDARD_STREAM:
+                output_file = STANDARD_STREAM
+
+            print('Decoding...')
+            # files of multiple file archive are written into directory named after archive
+            if self.members is not None:
+                if output_file == STANDARD_STREAM:
+                    raise ValueError('Multiple file archive cannot be decoded to standard output')
+                output = MemberWriter(output_file, self.members)
+            else:
+                output = self.open_output(output_file, WRITE_BUFFER_SIZE)
+            with output as wf:
+                pipeline = self.decode_chunks(rf, wf)
+
+        if output_file != STANDARD_STREAM:
+            os.utime(output_file, (properties['f_created'], properties['f_modified']))
+
+        self.record_stage('decode', start_time, pipeline)
+
+    def test(self, file_path) -> None:
+        """
+        Decodes all chunks of given input file in memory and verifies their checksums, raises ValueError
+        if archive is corrupted
+
+        :param file_path: str
+        :return: None
+        """
+        self.timings = {}
         start_time = time.time()
-        data = ''
-        properties, chunks = self.read_decoder(file_path)
-        output_file = '{}/{}'.format(output_file_path, properties['f_name'])
 
-        print('Decoding...')
-        pool = Pool(self.processes)
-        data += ''.join(pool.map(self.decode_chunk, chunks))
+        with self.open_encoded(file_path) as rf:
+            self.read_decoder(rf)
+            print('Testing...')
+            pipeline = self.decode_chunks(rf)
+
+        if self.archive:
+            print('{} bytes verified, checksum {:08x}'.format(self.checked_size, self.checksum))
+        else:
+            print('{} bytes decoded, archive holds no checksums'.format(self.checked_size))
+        self.record_stage('test', start_time, pipeline)
+
+    def decode_entry(self, entry):
+        """
+        Reads and decodes one indexed chunk
+
+        :param entry: IndexEntry
+        :return: str or bytes
+        """
+        chunk = self.archive.read_chunk(entry)
+        if self.codecs:
+            data = decode_chunk(self.get_entry_coder(entry), chunk, self.binary, entry.size)
+        else:
+            data = self.get_entry_coder(entry).decode(chunk)
+        if get_data_checksum(data, self.binary)[0] != entry.checksum:
+            raise ValueError('Checksum mismatch of chunk at offset {}'.format(entry.offset))
+
+        return data
 
-        with open(output_file, 'w', encoding='utf8') as wf:
+    def get_entry_coder(self, entry) -> HuffmanCoder:
+        """
+        Gets coder of indexed chunk, block code tables are read once
+
+        :param entry: IndexEntry
+        :return: HuffmanCoder
+        """
+        if not entry.table:
+            return self.coder
+        if entry.table not in self.table_coders:
+            self.table_coders[entry.table] = get_table_coder(self.archive.read_table(entry.table), self.binary)
+
+        return self.table_coders[entry.table]
+
+    def extract(self, file_path, start, end=None, lines=False) -> str:
+        """
+        Decodes only chunks holding given range of characters or lines, range end is exclusive,
+        characters are bytes in byte mode archives
+
+        :param file_path: str
+        :param start: int
+        :param end: int
+        :param lines: bool
+        :return: str or bytes
+        """
+        with open(file_path, 'rb') as rf:
+            self.read_decoder(rf)
+            if not self.archive:
+                raise ValueError('Random access is supported only by versioned archives')
+            index = self.archive.read_index()
+
+            # position of first character or line of every chunk
+            positions = [0]
+            for entry in index:
+                positions.append(positions[-1] + (entry.lines if lines else entry.size))
+
+            if end is None or end > positions[-1]:
+                end = positions[-1] + 1 if lines else positions[-1]
+            empty = b'' if self.binary else ''
+            if start >= end:
+                return empty
+
+            # with lines, the chunk holding newline before the first line is needed too
+            first = max(bisect.bisect_right(positions, start - 1 if lines else start) - 1, 0)
+            last = min(bisect.bisect_left(positions, end), len(index))
+            data = empty.join(self.decode_entry(entry) for entry in index[first:last])
+
+        if not lines:
+            return data[start - positions[first]:end - positions[first]]
+
+        newline = b'\n' if self.binary else '\n'
+        data_start = 0
+        for _ in range(start - positions[first]):
+            data_start = data.find(newline, data_start) + 1
+        data_end = data_start
+        for _ in range(end - start):
+            data_end = data.find(newline, data_end) + 1
+            if not data_end:
+                return data[data_start:]
+
+        return data[data_start:data_end]
+
+    def list_members(self, file_path) -> list:
+        """
+        Get files of encoded file, single file archive holds one file of its decoded size
+
+        :param file_path: str
+        :return: list of Member
+        """
+        with open(file_path, 'rb') as rf:
+            properties = self.read_decoder(rf)
+            if self.members is not None:
+                return self.members
+            if not self.archive:
+                raise ValueError('Listing is supported only by versioned archives')
+            size = sum(entry.size for entry in self.archive.read_index())
+
+        return [Member(properties['f_name'], size, properties['f_created'], properties['f_modified'])]
+
+    def extract_member(self, file_path, output_file_path, name) -> None:
+        """
+        Extracts a single file of multiple file archive to given output directory, only chunks holding
+        the file are decoded
+
+        :param file_path: str
+        :param output_file_path: str
+        :param name: str, name of file as listed
+        :return: None
+        """
+        start_time = time.time()
+        with open(file_path, 'rb') as rf:
+            self.read_decoder(rf)
+        if self.members is None:
+            raise ValueError('Archive holds a single file, its range is extracted with -r')
+
+        member, start = find_member(self.members, name)
+        data = b'' if is_directory(member) else self.extract(file_path, start, start + member.size)
+        write_member(output_file_path, member, data)
+
+        print(time.time() - start_time)
+
+    def extract_to_file(self, file_path, output_file_path, start, end=None, lines=False) -> None:
+        """
+        Extracts range of characters or lines and writes it to given output directory
+
+        :param file_path: str
+        :param output_file_path: str
+        :param start: int
+        :param end: int
+        :param lines: bool
+        :return: None
+        """
+        start_time = time.time()
+        data = self.extract(file_path, start, end, lines)
+
+        file_name = os.path.basename(file_path)
+        output_file = '{}/{}.{}-{}'.format(output_file_path, file_name, start, '' if end is None else end)
+        with self.open_output(output_file) as wf:
             wf.write(data)
-        os.utime(output_file, (properties['f_created'], properties['f_modified']))
 
         print(time.time() - start_time)
 
 
+def read_args() -> None:
+    """
+    This function handles command line interface
+
+    :return:
+    """
+    parser = argparse.ArgumentParser(description='Custom text compressor writen by Gerardas Martynovas')
+    parser.add_argument(
+        '-f',
+        type=str,
+        metavar='<file path>',
+        required=True,
+        help='Path to target file, directory or glob pattern of files to encode into one archive, '
+             '- reads standard input'
+    )
+    parser.add_argument(
+        '-o',
+        type=str,
+        metavar='<file path>',
+        help='Path to output file directory, - writes archive or decoded file to standard output'
+    )
+    parser.add_argument('-e', action='store_true', help='Encode file')
+    parser.add_argument('-d', action='store_true', help='Decode file')
+    parser.add_argument(
+        '-t',
+        action='store_true',
+        help='Test encoded file, all chunks are decoded and their checksums verified in memory, nothing is written'
+    )
+    parser.add_argument(
+        '-x',
+        action='store_true',
+        help='Extract range of characters or lines or a single file from encoded file'
+    )
+    parser.add_argument('-g', type=str, metavar='<name>', help='Name of file to extract from multiple file archive')
+    parser.add_argument('-i', action='store_true', help='List files of encoded file')
+    parser.add_argument(
+        '-r',
+        type=str,
+        metavar='<start>:<end>',
+        help='Range to extract, end is exclusive and may be omitted'
+    )
+    parser.add_argument('-l', action='store_true', help='Extracted range is given in lines instead of characters')
+    parser.add_argument(
+        '-b',
+        action='store_true',
+        help='Encode raw bytes instead of UTF-8 characters, any file is preserved byte for byte'
+    )
+    parser.add_argument(
+        '-a',
+        action='store_true',
+        help='Split file into blocks with own code tables where symbol statistics change'
+    )
+    parser.add_argument(
+        '-w',
+        choices=TOKENIZER_MODES,
+        help='Code words, n-grams or digraphs of vocabulary as single symbols'
+    )
+    parser.add_argument('-v', type=int, metavar='<size>', help='Vocabulary size, count of multi character tokens')
+    parser.add_argument(
+        '-z',
+        type=int,
+        choices=sorted(LEVELS),
+        metavar='<level>',
+        help='Replace repeated byte sequences with matches before huffman coding, levels 1 to 9 trade speed for ratio'
+    )
+    parser.add_argument('-k', type=int, metavar='<bytes>', help='Window searched for matches')
+    parser.add_argument(
+        '-u',
+        choices=CODERS,
+        help='Entropy coder of symbols, huffman by default, context predicts symbols from preceding ones, '
+             'ans codes close to arithmetic coding ratio with table lookups, stored keeps chunks as they are. '
+             'Chunks estimated to gain nothing by coding are stored by any coder'
+    )
+    parser.add_argument('-q', choices=sorted(PRESETS), help='Speed and memory preset of context coder')
+    parser.add_argument('-c', type=int, help='Chunk size')
+    parser.add_argument(
+        '-n',
+        type=int,
+        metavar='<bits>',
+        help='Maximum code length, codes up to {} bits are decoded with a single table lookup'.format(TABLE_BITS)
+    )
+    parser.add_argument(
+        '-s',
+        type=int,
+        metavar='<bytes>',
+        help='Sample budget, bytes read while estimating codes of larger files'
+    )
+    parser.add_argument('-m', choices=SAMPLING_MODES, help='Sampling mode, stratified by default')
+    parser.add_argument(
+        '--dict',
+        type=str,
+        metavar='<path>',
+        help='Dictionary trained by Dictionary.py to encode with instead of counting symbols, only its id is '
+             'stored. Decoding looks for dictionary of archive in given file or directory of {} files'.format(
+                 DICTIONARY_EXTENSION
+             )
+    )
+    parser.add_argument(
+        '-p',
+        type=int,
+        help='Pool processes this tool is going to use.'
+    )
+    args = parser.parse_args()
+
+    if not (args.f == STANDARD_STREAM or os.path.exists(args.f)
+            or is_multiple_input(args.f) and glob.glob(args.f, recursive=True)):
+        parser.error('File not found: {}'.format(args.f))
+
+    if not (args.e or args.d or args.x or args.t or args.i):
+        parser.error('Undefined action, one of following actions is required: -e -d -x -t -i')
+
+    if args.e + args.d + args.x + args.t + args.i > 1:
+        parser.error('Multiple actions cannot be simultaneously processed: -e -d -x -t -i')
+
+    if not (args.o or args.t or args.i):
+        parser.error('Output path is required: -o')
+
+    if args.x and not (args.r or args.g):
+        parser.error('Range or file name is required for extraction: -r -g')
+
+    if args.r and args.g:
+        parser.error('Range cannot be extracted from a single file: -r -g')
+
+    if args.f == STANDARD_STREAM and (args.x or args.i):
+        parser.error('Standard input is read once, extraction and listing need to seek: -x -i')
+
+    if args.o == STANDARD_STREAM and not (args.e or args.d):
+        parser.error('Only encoded or decoded data is written to standard output: -o')
+
+    if args.f == STANDARD_STREAM and args.e and (args.a or args.w or args.u in (CODER_ARITHMETIC, CODER_ANS)):
+        parser.error('Standard input is coded in one pass with code tables of every chunk: -a -w -u')
+
+    if args.e and is_multiple_input(args.f) and (args.a or args.w):
+        parser.error('Multiple files are encoded as raw bytes with single code table: -a -w')
+
+    if args.e and is_multiple_input(args.f):
+        try:
+            find_members(args.f)
+        except ValueError as error:
+            parser.error(str(error))
+
+    if args.n is not None and args.n < 1:
+        parser.error('Maximum code length must be positive: -n')
+
+    if args.w and (args.b or args.a):
+        parser.error('Tokens are supported only by text mode with single code table: -w')
+
+    if args.z and (args.a or args.w):
+        parser.error('Matches are coded with code tables of their own chunk: -z')
+
+    if args.k is not None and args.k < 1:
+        parser.error('Match window must be positive: -k')
+
+    if args.u in (CODER_ARITHMETIC, CODER_CONTEXT, CODER_ANS) and (args.a or args.w or args.z or args.n):
+        parser.error('Arithmetic coding uses a single model of single symbols: -u')
+
+    if args.u == CODER_STORED and (args.a or args.w or args.z or args.n or args.q):
+        parser.error('Stored chunks are not coded: -u')
+
+    if args.dict and args.e and (args.a or args.w or args.z or args.u or args.n):
+        parser.error('Dictionary holds a single huffman code table of single symbols: --dict -a -w -z -u -n')
+
+    if args.dict and not os.path.exists(args.dict):
+        parser.error('Dictionary not found: {}'.format(args.dict))
+
+    if args.o == STANDARD_STREAM:
+        # data goes to standard output, messages to standard error
+        sys.stdout = sys.stderr
+
+    if args.e:
+        encoder = HuffmanPartial(
+            args.p, args.c, binary=args.b, sample_budget=args.s, sampling=args.m, adaptive=args.a, max_length=args.n,
+            tokens=args.w, vocabulary_size=args.v, level=args.z, window=args.k, coder=args.u, preset=args.q,
+            dictionary=args.dict
+        )
+        encoder.encode(args.f, args.o)
+        return
+
+    if args.d:
+        decoder = HuffmanPartial(args.p, args.c, dictionary=args.dict)
+        decoder.decode(args.f, args.o)
+        return
+
+    if args.x and args.g:
+        decoder = HuffmanPartial(args.p, args.c, dictionary=args.dict)
+        decoder.extract_member(args.f, args.o, args.g)
+        return
+
+    if args.x:
+        start, _, end = args.r.partition(':')
+        decoder = HuffmanPartial(args.p, args.c, dictionary=args.dict)
+        decoder.extract_to_file(args.f, args.o, int(start or 0), int(end) if end else None, args.l)
+        return
+
+    if args.t:
+        decoder = HuffmanPartial(args.p, args.c, dictionary=args.dict)
+        try:
+            decoder.test(args.f)
+        except Exception as error:
+            print('Test failed: {}'.format(error), file=sys.stderr)
+            sys.exit(1)
+        return
+
+    if args.i:
+        decoder = HuffmanPartial(args.p, args.c, dictionary=args.dict)
+        members = decoder.list_members(args.f)
+        for member in members:
+            print('{:>14} {} {}'.format(
+                member.size, time.strftime('%Y-%m-%d %H:%M:%S', time.localtime(member.modified)), member.name
+            ))
+        print('{} files, {} in total'.format(len(members), sum(member.size for member in members)))
+        return
+
+
 if __name__ == "__main__":
     read_args()
@@ -0,0 +1,181 @@
+#!/usr/bin/python3
+
+import heapq
+from array import array
+
+
+class HuffmanTree:
+    """
+    Huffman tree stored in flat arrays indexed by node id
+
+    Leaves get ids 0..n-1 in the order symbols were given, every merge appends one parent node.
+    Nodes with equal weight are merged in order of their ids, which matches the order
+    of (probability, created) sorting used by the previous node based implementation,
+    so produced codes stay the same.
+
+    Properties
+    ----------
+    symbols : list
+        leaf symbols, position in list is the node id of a leaf
+    weights : list
+        probability of every node by node id
+    zero : array
+        node id of child reached by bit 0, indexed by node id minus leaf count
+    one : array
+        node id of child reached by bit 1, indexed by node id minus leaf count
+    root : int
+        node id of the root, -1 for empty tree
+    """
+    def __init__(self, weighted_symbols):
+        """
+        HuffmanTree constructor
+
+        :param weighted_symbols: list of (symbol, probability) tuples sorted by probability
+        """
+        self.symbols = [symbol for symbol, _ in weighted_symbols]
+        self.weights = [weight for _, weight in weighted_symbols]
+        self.zero = array('l')
+        self.one = array('l')
+        self.root = -1
+
+    def build(self) -> None:
+        """
+        Connects all leaves into a single binary tree using priority queue
+
+        :return: None
+        """
+        leaves = len(self.symbols)
+        del self.weights[leaves:]
+        self.zero = array('l')
+        self.one = array('l')
+        self.root = -1
+
+        heap = [(weight, node) for node, weight in enumerate(self.weights)]
+        heapq.heapify(heap)
+
+        while len(heap) > 1:
+            weight1, node1 = heapq.heappop(heap)
+            weight2, node2 = heapq.heappop(heap)
+            parent = len(self.weights)
+            self.weights.append(weight1 + weight2)
+
+            # heavier child is always the left one and left child gets bit 1
+            if weight1 > weight2:
+                self.one.append(node1)
+                self.zero.append(node2)
+            else:
+                self.one.append(node2)
+                self.zero.append(node1)
+
+            heapq.heappush(heap, (self.weights[parent], parent))
+
+        if heap:
+            self.root = heap[0][1]
+
+    def get_codes(self) -> dict:
+        """
+        Get huffman codes for all leaves with a single top-down traversal
+
+        :return: dict
+        """
+        codes = {}
+        leaves = len(self.symbols)
+        if self.root < 0:
+            return codes
+
+        stack = [(self.root, '')]
+        while stack:
+            node, code = stack.pop()
+            if node < leaves:
+                # lonely symbol still needs at least one bit
+                codes[self.symbols[node]] = code or '0'
+                continue
+            stack.append((self.zero[node - leaves], code + '0'))
+            stack.append((self.one[node - leaves], code + '1'))
+
+        return codes
+
+    def get_code_lengths(self) -> dict:
+        """
+        Get huffman code length for all leaves
+
+        :return: dict
+        """
+        lengths = {}
+        leaves = len(self.symbols)
+        if self.root < 0:
+            return lengths
+
+        stack = [(self.root, 0)]
+        while stack:
+            node, depth = stack.pop()
+            if node < leaves:
+                lengths[self.symbols[node]] = depth or 1
+                continue
+            stack.append((self.zero[node - leaves], depth + 1))
+            stack.append((self.one[node - leaves], depth + 1))
+
+        return lengths
+
+
+def sort_canonical(code_lengths) -> list:
+    """
+    Orders symbols the way canonical codes are assigned: by code length, then by symbol
+
+    :param code_lengths: dict
+    :return: list
+    """
+    return sorted(code_lengths.items(), key=lambda item: (item[1], item[0]))
+
+
+def get_canonical_codes(code_lengths) -> dict:
+    """
+    Rebuilds canonical huffman codes from code lengths
+
+    :param code_lengths: list of (symbol, length) tuples in canonical order
+    :return: dict
+    """
+    codes = {}
+    code = 0
+    previous_length = 0
+
+    for symbol, length in code_lengths:
+        code <<= length - previous_length
+        codes[symbol] = format(code, '0{}b'.format(length))
+        code += 1
+        previous_length = length
+
+    return codes
+
+
+def limit_code_lengths(frequencies, max_length) -> dict:
+    """
+    Get optimal code lengths no longer than max_length bits with package-merge algorithm
+
+    :param frequencies: dict
+    :param max_length: int
+    :return: dict
+    """
+    symbols = sorted(frequencies, key=lambda symbol: frequencies[symbol])
+    if len(symbols) > 1 << max_length:
+        raise ValueError('{} symbols cannot be coded with codes of at most {} bits'.format(len(symbols), max_length))
+    if len(symbols) < 2:
+        return {symbol: 1 for symbol in symbols}
+
+    # every item is weight and indexes of leaves it holds, list of every level is sorted by weight
+    leaves = [(frequencies[symbol], [index]) for index, symbol in enumerate(symbols)]
+    items = leaves
+    for _ in range(max_length - 1):
+        packages = [
+            (first[0] + second[0], first[1] + second[1])
+            for first, second in zip(items[0::2], items[1::2])
+        ]
+        items = list(heapq.merge(leaves, packages, key=lambda item: item[0]))
+
+    # code length of a symbol is the count of chosen items holding its leaf
+    lengths = [0] * len(symbols)
+    for _, indexes in items[:2 * len(symbols) - 2]:
+        for index in indexes:
+            lengths[index] += 1
+
+    return dict(zip(symbols, lengths))
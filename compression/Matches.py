@@ -0,0 +1,293 @@
+#!/usr/bin/python3
+
+import struct
+from collections import Counter, namedtuple
+
+from Archive import pack_byte_code_lengths, unpack_byte_code_lengths
+from HuffmanCoder import HuffmanCoder
+from HuffmanTree import get_canonical_codes, sort_canonical
+from Sampling import get_code_lengths
+
+# Shortest match replacing literals, also count of bytes hashed to find match candidates
+MIN_MATCH = 4
+# Default bytes behind current position searched for matches
+WINDOW_SIZE = 1048576
+# Size of huffman coded stream which follows its code table
+STREAM_SIZE = struct.Struct('<I')
+# Longest code of stream code tables, longer codes are limited by encoder and refused by decoder
+MAX_STREAM_CODE_LENGTH = 24
+
+# chain is count of candidates checked per position, search stops at match of nice_length,
+# hash_matches notes if positions inside matches are hashed, every 2 ** skip_shift positions without
+# match make search step one byte longer
+Level = namedtuple('Level', ['chain', 'nice_length', 'hash_matches', 'skip_shift'])
+LEVELS = {
+    1: Level(1, 16, False, 4),
+    2: Level(2, 32, False, 5),
+    3: Level(4, 32, False, 6),
+    4: Level(4, 64, True, 64),
+    5: Level(8, 64, True, 64),
+    6: Level(16, 128, True, 64),
+    7: Level(32, 256, True, 64),
+    8: Level(128, 1024, True, 64),
+    9: Level(1024, 4096, True, 64),
+}
+DEFAULT_LEVEL = 5
+
+
+def write_varint(stream, value) -> None:
+    """
+    Appends value as 7 bits per byte, highest bit of byte notes that more bytes follow
+
+    :param stream: bytearray
+    :param value: int
+    :return: None
+    """
+    while value >= 0x80:
+        stream.append(value & 0x7f | 0x80)
+        value >>= 7
+    stream.append(value)
+
+
+def read_varints(data) -> list:
+    """
+    Reads all values written by write_varint
+
+    :param data: bytes
+    :return: list
+    """
+    values = []
+    value = shift = 0
+    for byte in data:
+        value |= (byte & 0x7f) << shift
+        if byte & 0x80:
+            shift += 7
+            continue
+        values.append(value)
+        value = shift = 0
+
+    return values
+
+
+def get_match_length(data, candidate, position, limit) -> int:
+    """
+    Get count of equal bytes at candidate and position, first MIN_MATCH bytes are known to be equal,
+    equal slices of doubling size are skipped at once and the first unequal slice is bisected
+
+    :param data: bytes
+    :param candidate: int
+    :param position: int
+    :param limit: int, maximum length
+    :return: int
+    """
+    length = step = MIN_MATCH
+    while length < limit:
+        step = min(step * 2, limit - length)
+        if data[candidate + length:candidate + length + step] != data[position + length:position + length + step]:
+            break
+        length += step
+    else:
+        return limit
+
+    # longest equal prefix of unequal slice
+    low, high = 0, step - 1
+    while low < high:
+        middle = (low + high + 1) // 2
+        if data[candidate + length:candidate + length + middle] == data[position + length:position + length + middle]:
+            low = middle
+        else:
+            high = middle - 1
+
+    return length + low
+
+
+def encode_stream(stream) -> bytes:
+    """
+    Huffman codes byte stream with codes of its own, packed code lengths and stream size go first
+
+    :param stream: bytes
+    :return: bytes
+    """
+    code_lengths = sort_canonical(get_code_lengths(Counter(stream), MAX_STREAM_CODE_LENGTH)) if stream else []
+    encoded = HuffmanCoder(get_canonical_codes(code_lengths), True).encode(stream)
+
+    return pack_byte_code_lengths(code_lengths) + STREAM_SIZE.pack(len(encoded)) + encoded
+
+
+def decode_stream(data, offset) -> tuple:
+    """
+    Decodes byte stream written by encode_stream, code tables which are not complete prefix codes and streams
+    reaching past data are refused
+
+    :param data: bytes
+    :param offset: int, offset of stream in data
+    :return: bytes, offset following stream
+    """
+    start = offset + 256 + STREAM_SIZE.size
+    if start > len(data):
+        raise ValueError('Match stream is truncated')
+    code_lengths = unpack_byte_code_lengths(data[offset:offset + 256])
+    lengths = [length for _, length in code_lengths]
+    if max(lengths, default=0) > MAX_STREAM_CODE_LENGTH or \
+            sum(1 << (MAX_STREAM_CODE_LENGTH - length) for length in lengths) > 1 << MAX_STREAM_CODE_LENGTH:
+        raise ValueError('Invalid code table of match stream')
+    size, = STREAM_SIZE.unpack_from(data, offset + 256)
+    if start + size > len(data):
+        raise ValueError('Match stream is truncated')
+    coder = HuffmanCoder(get_canonical_codes(code_lengths), True)
+
+    return coder.decode(data[start:start + size]), start + size
+
+
+def decode_matches(chunk, limit=None) -> bytes:
+    """
+    Decodes chunk encoded by MatchFinder, literals are copied in between matches. Matches pointing before
+    start of chunk and output longer than limit are refused
+
+    :param chunk: bytes
+    :param limit: int, most bytes chunk may decode to, none if unknown
+    :return: bytes
+    """
+    literals, offset = decode_stream(chunk, 0)
+    lengths, offset = decode_stream(chunk, offset)
+    distances, _ = decode_stream(chunk, offset)
+    lengths = read_varints(lengths)
+    distances = read_varints(distances)
+    if len(lengths) % 2 or len(lengths) // 2 != len(distances):
+        raise ValueError('Match lengths and distances do not pair up')
+    if limit is None:
+        limit = len(literals) + sum(lengths[1::2]) + MIN_MATCH * len(distances)
+
+    output = bytearray()
+    literal_start = 0
+    for run, length, distance in zip(lengths[0::2], lengths[1::2], distances):
+        length += MIN_MATCH
+        distance += 1
+        if literal_start + run > len(literals):
+            raise ValueError('Literal run is longer than literals')
+        output += literals[literal_start:literal_start + run]
+        literal_start += run
+        if distance > len(output):
+            raise ValueError('Match distance {} points before start of chunk'.format(distance))
+        if len(output) + length > limit:
+            raise ValueError('Matches decode to more than {} bytes'.format(limit))
+        start = len(output) - distance
+        if distance >= length:
+            output += output[start:start + length]
+        else:
+            # match overlaps itself, its bytes repeat every distance bytes
+            output += (output[start:] * (length // distance + 1))[:length]
+    if len(output) + len(literals) - literal_start > limit:
+        raise ValueError('Matches decode to more than {} bytes'.format(limit))
+    output += literals[literal_start:]
+
+    return bytes(output)
+
+
+class MatchFinder:
+    """
+    Replaces repeated byte sequences of a chunk with matches pointing back at their earlier copy
+
+    Candidates of every position are found through hash chains, all earlier positions starting with the same
+    MIN_MATCH bytes are linked together. Chunk is coded as three streams: literal bytes, varint literal run and
+    match lengths, varint match distances. Every stream is huffman coded with its own byte code table.
+
+    Properties
+    ----------
+    level : Level
+        bounds of match search effort
+    window : int
+        bytes behind current position searched for matches
+    """
+    def __init__(self, level=DEFAULT_LEVEL, window=WINDOW_SIZE):
+        """
+        MatchFinder constructor
+
+        :param level: int
+        :param window: int
+        """
+        if level not in LEVELS:
+            raise ValueError('Unknown match level: {}'.format(level))
+        self.level = LEVELS[level]
+        self.window = window
+
+    def find_matches(self, data) -> tuple:
+        """
+        Splits data into literals and matches
+
+        :param data: bytes
+        :return: literal bytes, varint literal run and match lengths, varint match distances
+        """
+        chain, nice_length, hash_matches, skip_shift = self.level
+        literals = bytearray()
+        lengths = bytearray()
+        distances = bytearray()
+        # latest position by hashed bytes and previous position with the same bytes by position in window
+        head = {}
+        ring = max(min(self.window, len(data)), 1)
+        previous = [-1] * ring
+
+        size = len(data)
+        last = size - MIN_MATCH
+        position = literal_start = misses = 0
+        while position <= last:
+            key = data[position:position + MIN_MATCH]
+            candidate = head.get(key, -1)
+            head[key] = position
+            previous[position % ring] = candidate
+
+            best_length = best_distance = 0
+            limit = size - position
+            lowest = max(position - self.window, -1)
+            checked = 0
+            while candidate > lowest and checked < chain:
+                # a longer match must at least match the byte after the best one
+                if data[candidate + best_length] == data[position + best_length]:
+                    length = get_match_length(data, candidate, position, limit)
+                    if length > best_length:
+                        best_length, best_distance = length, position - candidate
+                        if length >= nice_length or length == limit:
+                            break
+                candidate = previous[candidate % ring]
+                checked += 1
+
+            if not best_length:
+                misses += 1
+                position += 1 + (misses >> skip_shift)
+                continue
+
+            literals += data[literal_start:position]
+            write_varint(lengths, position - literal_start)
+            write_varint(lengths, best_length - MIN_MATCH)
+            write_varint(distances, best_distance - 1)
+            end = position + best_length
+            if hash_matches:
+                for inner in range(position + 1, min(end, last + 1)):
+                    key = data[inner:inner + MIN_MATCH]
+                    previous[inner % ring] = head.get(key, -1)
+                    head[key] = inner
+            position = literal_start = end
+            misses = 0
+        literals += data[literal_start:]
+
+        return bytes(literals), bytes(lengths), bytes(distances)
+
+    def encode(self, chunk) -> bytes:
+        """
+        Encodes one chunk as huffman coded literal, length and distance streams
+
+        :param chunk: bytes
+        :return: bytes
+        """
+        return b''.join(encode_stream(stream) for stream in self.find_matches(chunk))
+
+    @staticmethod
+    def decode(chunk, size=None) -> bytes:
+        """
+        Decodes one chunk
+
+        :param chunk: bytes
+        :param size: int, decoded size of chunk recorded by archive, none if unknown
+        :return: bytes
+        """
+        return decode_matches(chunk, size)
@@ -0,0 +1,336 @@
+#!/usr/bin/python3
+
+import bisect
+import glob
+import os
+from collections import Counter
+from multiprocessing import Pool
+
+from Archive import Member
+from Histogram import RANGE_SIZE, count_range
+from HuffmanCoder import BYTE_ESCAPE
+from Sampling import SAMPLE_BLOCK_SIZE, SAMPLE_BUDGET, Sampler
+
+# Characters which make input path a glob pattern
+GLOB_CHARACTERS = '*?['
+# Pieces of members counted by one pool task at once, small files are counted in batches
+COUNT_BATCH_SIZE = 64
+
+
+def is_multiple_input(path) -> bool:
+    """
+    Returns true if input path is a directory or glob pattern archived as multiple files, existing file
+    is never a pattern even if its name holds glob characters
+
+    :param path: str
+    :return: bool
+    """
+    if os.path.isfile(path):
+        return False
+
+    return os.path.isdir(path) or any(character in path for character in GLOB_CHARACTERS)
+
+
+def is_directory(member) -> bool:
+    """
+    Returns true if member is an empty directory, it holds no content
+
+    :param member: Member
+    :return: bool
+    """
+    return member.name.endswith('/')
+
+
+def find_members(path) -> tuple:
+    """
+    Finds regular files and empty directories of directory, recursively, or ones matching glob pattern,
+    ** matches any count of directories. Member names are relative to directory or to directory part of pattern
+
+    :param path: str
+    :return: base directory, list of Member sorted by name
+    """
+    if os.path.isdir(path):
+        base_path = path
+        paths = []
+        for root, directories, names in os.walk(base_path):
+            paths.extend(os.path.join(root, name) for name in names)
+            if root != base_path and not (directories or names):
+                paths.append(root)
+    else:
+        magic = min(path.index(character) for character in GLOB_CHARACTERS if character in path)
+        base_path = os.path.dirname(path[:magic]) or '.'
+        paths = glob.glob(path, recursive=True)
+
+    members = []
+    for file_path in paths:
+        name = os.path.relpath(file_path, base_path).replace(os.sep, '/')
+        if os.path.isfile(file_path):
+            size = os.path.getsize(file_path)
+        elif os.path.isdir(file_path) and name != '.' and not os.listdir(file_path):
+            name, size = name + '/', 0
+        else:
+            continue
+        members.append(Member(name, size, os.path.getctime(file_path), os.path.getmtime(file_path)))
+
+    if not members:
+        raise ValueError('No files match: {}'.format(path))
+
+    return base_path, sorted(members)
+
+
+def get_member_path(directory, member) -> str:
+    """
+    Get path of member inside directory, names leading out of directory are refused
+
+    :param directory: str
+    :param member: Member
+    :return: str
+    """
+    parts = (member.name[:-1] if is_directory(member) else member.name).split('/')
+    if member.name.startswith('/') or '..' in parts or '' in parts:
+        raise ValueError('Unsafe member name: {}'.format(member.name))
+
+    return os.path.join(directory, *parts)
+
+
+def find_member(members, name) -> tuple:
+    """
+    Finds member of given name and offset of its content, members follow each other in archived content
+
+    :param members: list of Member
+    :param name: str, name of member as listed
+    :return: Member, int
+    """
+    start = 0
+    for member in members:
+        if member.name == name:
+            return member, start
+        start += member.size
+
+    raise ValueError('File not found in archive: {}'.format(name))
+
+
+def write_member(directory, member, data=b'') -> str:
+    """
+    Writes single member into directory under the last part of its name and restores its times,
+    empty directory member is created
+
+    :param directory: str
+    :param member: Member
+    :param data: bytes, content of member
+    :return: str, path of written member
+    """
+    os.makedirs(directory, exist_ok=True)
+    path = os.path.join(directory, get_member_path(directory, member).split(os.sep)[-1])
+    if is_directory(member):
+        os.makedirs(path, exist_ok=True)
+    else:
+        with open(path, 'wb') as wf:
+            wf.write(data)
+    os.utime(path, (member.created, member.modified))
+
+    return path
+
+
+def read_members(base_path, members, chunk_size):
+    """
+    Reads content of all members one after another in chunks of chunk_size bytes, small members share chunks
+
+    :param base_path: str
+    :param members: list of Member
+    :param chunk_size: int
+    :return: Generator of bytes
+    """
+    chunk = bytearray()
+    for member in members:
+        if is_directory(member):
+            continue
+        remaining = member.size
+        with open(get_member_path(base_path, member), 'rb') as rf:
+            while remaining:
+                piece = rf.read(min(remaining, chunk_size - len(chunk)))
+                if not piece:
+                    raise ValueError('File changed while archiving: {}'.format(member.name))
+                chunk += piece
+                remaining -= len(piece)
+                if len(chunk) == chunk_size:
+                    yield bytes(chunk)
+                    chunk = bytearray()
+    if chunk:
+        yield bytes(chunk)
+
+
+def get_member_pieces(base_path, members, budget) -> tuple:
+    """
+    Get pieces covering content of all members, or SAMPLE_BLOCK_SIZE pieces spread evenly over
+    content if it is larger than budget
+
+    :param base_path: str
+    :param members: list of Member
+    :param budget: int
+    :return: list of (path, start, end, binary) tuples, notes if pieces are sampled
+    """
+    total = sum(member.size for member in members)
+    if total <= budget:
+        return [
+            (get_member_path(base_path, member), start, min(start + RANGE_SIZE, member.size), True)
+            for member in members for start in range(0, member.size, RANGE_SIZE)
+        ], False
+
+    # content offset of every member
+    starts = [0]
+    for member in members:
+        starts.append(starts[-1] + member.size)
+
+    pieces = []
+    count = max(budget // SAMPLE_BLOCK_SIZE, 1)
+    for piece in range(count):
+        offset = piece * total // count
+        index = bisect.bisect_right(starts, offset) - 1
+        member = members[index]
+        start = offset - starts[index]
+        pieces.append((get_member_path(base_path, member), start, min(start + SAMPLE_BLOCK_SIZE, member.size), True))
+
+    return pieces, True
+
+
+def count_pieces(pieces) -> tuple:
+    """
+    Counts bytes of a batch of member pieces in pool worker process
+
+    :param pieces: list of (path, start, end, binary) tuples
+    :return: Counter, count of bytes
+    """
+    frequencies = Counter()
+    total = 0
+    for piece in pieces:
+        partial_frequencies, length = count_range(*piece)
+        frequencies.update(partial_frequencies)
+        total += length
+
+    return frequencies, total
+
+
+def count_members(base_path, members, processes, budget=SAMPLE_BUDGET) -> tuple:
+    """
+    Counts bytes of all members in parallel, content larger than budget is sampled and escape is added
+
+    :param base_path: str
+    :param members: list of Member
+    :param processes: int
+    :param budget: int
+    :return: dict of frequencies by byte value, count of bytes or 0 if sampled
+    """
+    pieces, sampled = get_member_pieces(base_path, members, budget)
+    batches = [pieces[start:start + COUNT_BATCH_SIZE] for start in range(0, len(pieces), COUNT_BATCH_SIZE)]
+    frequencies = Counter()
+    total = 0
+
+    with Pool(processes) as pool:
+        for partial_frequencies, length in pool.imap(count_pieces, batches):
+            frequencies.update(partial_frequencies)
+            total += length
+
+    if sampled:
+        return Sampler.with_escape(frequencies, BYTE_ESCAPE), 0
+
+    return dict(frequencies), total
+
+
+class MemberWriter:
+    """
+    Writes decoded content of multiple file archive into member files, content is split at member sizes
+
+    Properties
+    ----------
+    directory : str
+        directory members are written to
+    members : list
+        Member of every archived file
+    index : int
+        index of the next member to open
+    member : Member
+        member being written, none if all members are written
+    output : BufferedWriter
+        file of member being written
+    remaining : int
+        bytes of member being written which are still to come
+    """
+    def __init__(self, directory, members):
+        """
+        MemberWriter constructor
+
+        :param directory: str
+        :param members: list of Member
+        """
+        self.directory = directory
+        self.members = members
+        self.index = 0
+        self.member = None
+        self.output = None
+        self.remaining = 0
+
+    def __enter__(self):
+        os.makedirs(self.directory, exist_ok=True)
+        self.next_member()
+
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close_member()
+        if exc_type is None and (self.remaining or self.index < len(self.members)):
+            raise ValueError('Decoded content is shorter than archived files')
+
+    def next_member(self) -> None:
+        """
+        Closes member being written and opens the next member which is not empty, empty members and
+        empty directories are created
+
+        :return: None
+        """
+        self.close_member()
+        while self.index < len(self.members):
+            self.member = self.members[self.index]
+            self.index += 1
+            path = get_member_path(self.directory, self.member)
+            if is_directory(self.member):
+                os.makedirs(path, exist_ok=True)
+                os.utime(path, (self.member.created, self.member.modified))
+                continue
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            self.output = open(path, 'wb')
+            self.remaining = self.member.size
+            if self.remaining:
+                return
+            self.close_member()
+
+    def close_member(self) -> None:
+        """
+        Closes member being written and restores its times
+
+        :return: None
+        """
+        if self.output is None:
+            return
+        self.output.close()
+        self.output = None
+        os.utime(get_member_path(self.directory, self.member), (self.member.created, self.member.modified))
+        self.member = None
+
+    def write(self, data) -> None:
+        """
+        Writes decoded content, member files are switched at member sizes
+
+        :param data: bytes
+        :return: None
+        """
+        position = 0
+        while position < len(data):
+            if self.output is None:
+                raise ValueError('Decoded content is longer than archived files')
+            piece = data[position:position + self.remaining]
+            self.output.write(piece)
+            position += len(piece)
+            self.remaining -= len(piece)
+            if not self.remaining:
+                self.next_member()
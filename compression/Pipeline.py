@@ -0,0 +1,189 @@
+#!/usr/bin/python3
+
+import queue
+import threading
+import time
+from collections import deque
+
+# Marks end of items in pipeline queues
+END = None
+
+
+def timed_call(function, item) -> tuple:
+    """
+    Calls function in pool worker process and measures how long it took
+
+    :param function: callable
+    :param item: object
+    :return: time spent, result
+    """
+    start_time = time.perf_counter()
+    result = function(item)
+
+    return time.perf_counter() - start_time, result
+
+
+class Pipeline:
+    """
+    Overlapped read, process and write stages connected by bounded queues
+
+    Reader thread fills input queue, main thread passes items to pool and puts results
+    into output queue in original order, writer thread empties output queue.
+
+    Properties
+    ----------
+    pool : Pool
+        pool of worker processes
+    processes : int
+        count of processes in pool
+    limit : int
+        maximum count of items held by each queue and by pool
+    busy : dict
+        seconds spent working by stage name
+    wall_time : float
+        seconds the whole pipeline was running
+    """
+    def __init__(self, pool, processes, limit):
+        """
+        Pipeline constructor
+
+        :param pool: Pool
+        :param processes: int
+        :param limit: int
+        """
+        self.pool = pool
+        self.processes = processes
+        self.limit = limit
+        self.busy = {'read': 0.0, 'process': 0.0, 'write': 0.0}
+        self.wall_time = 0.0
+
+    def read_stage(self, read, input_queue, errors) -> None:
+        """
+        Reads items until read returns END
+
+        :param read: callable
+        :param input_queue: Queue
+        :param errors: list
+        :return: None
+        """
+        try:
+            while True:
+                start_time = time.perf_counter()
+                item = read()
+                self.busy['read'] += time.perf_counter() - start_time
+                if item is END:
+                    break
+                input_queue.put(item)
+        except Exception as error:
+            errors.append(error)
+        finally:
+            input_queue.put(END)
+
+    def write_stage(self, write, output_queue, errors) -> None:
+        """
+        Writes results until end mark, after an error results are only drained
+
+        :param write: callable
+        :param output_queue: Queue
+        :param errors: list
+        :return: None
+        """
+        while True:
+            result = output_queue.get()
+            if result is END:
+                return
+            if errors:
+                continue
+            try:
+                start_time = time.perf_counter()
+                write(result)
+                self.busy['write'] += time.perf_counter() - start_time
+            except Exception as error:
+                errors.append(error)
+
+    def run(self, read, function, write) -> None:
+        """
+        Runs pipeline until read returns END
+
+        :param read: callable returning next item or END
+        :param function: module level callable applied to every item in pool
+        :param write: callable receiving every result in order of items
+        :return: None
+        """
+        start_time = time.perf_counter()
+        input_queue = queue.Queue(self.limit)
+        output_queue = queue.Queue(self.limit)
+        read_errors, write_errors = [], []
+        reader = threading.Thread(target=self.read_stage, args=(read, input_queue, read_errors))
+        writer = threading.Thread(target=self.write_stage, args=(write, output_queue, write_errors))
+        reader.start()
+        writer.start()
+
+        pending = deque()
+        try:
+            while True:
+                item = input_queue.get()
+                if item is END:
+                    break
+                pending.append(self.pool.apply_async(timed_call, (function, item)))
+                if len(pending) >= self.limit:
+                    self.put_result(pending.popleft(), output_queue)
+            while pending:
+                self.put_result(pending.popleft(), output_queue)
+        finally:
+            # pool is terminated after an error, worker killed while sending its result would hold result queue lock
+            for pending_result in pending:
+                pending_result.wait()
+            output_queue.put(END)
+            # let reader finish if processing failed while it waits for free queue slot
+            while reader.is_alive():
+                try:
+                    input_queue.get(timeout=0.1)
+                except queue.Empty:
+                    pass
+            reader.join()
+            writer.join()
+            self.wall_time = time.perf_counter() - start_time
+
+        for error in read_errors + write_errors:
+            raise error
+
+    def put_result(self, pending_result, output_queue) -> None:
+        """
+        Waits for result of one item and passes it to writer
+
+        :param pending_result: AsyncResult
+        :param output_queue: Queue
+        :return: None
+        """
+        elapsed, result = pending_result.get()
+        self.busy['process'] += elapsed
+        output_queue.put(result)
+
+    def get_utilization(self) -> dict:
+        """
+        Get share of wall time each stage was busy, process stage is divided by count of processes
+
+        :return: dict
+        """
+        if not self.wall_time:
+            return {stage: 0.0 for stage in self.busy}
+
+        return {
+            'read': self.busy['read'] / self.wall_time,
+            'process': self.busy['process'] / (self.wall_time * self.processes),
+            'write': self.busy['write'] / self.wall_time,
+        }
+
+    def report(self) -> str:
+        """
+        Describes stage utilization and which stage limits the pipeline
+
+        :return: str
+        """
+        utilization = self.get_utilization()
+        bound = 'CPU' if utilization['process'] >= max(utilization['read'], utilization['write']) else 'I/O'
+
+        return 'read {:.0%}, process {:.0%}, write {:.0%} busy; {} bound'.format(
+            utilization['read'], utilization['process'], utilization['write'], bound
+        )
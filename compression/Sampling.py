@@ -0,0 +1,226 @@
+#!/usr/bin/python3
+
+import os
+import random
+from collections import Counter
+
+from Histogram import is_continuation_byte
+from HuffmanCoder import BYTE_ESCAPE, BYTE_ESCAPE_BITS, ESCAPE, ESCAPE_BITS
+from HuffmanTree import HuffmanTree, limit_code_lengths
+
+# Bytes read by one seek, large enough to keep local symbol correlations of a block
+SAMPLE_BLOCK_SIZE = 65536
+# Default bytes of input read while estimating codes
+SAMPLE_BUDGET = 4194304
+# Sampling stops once codes estimated so far lose at most this many bits per symbol on unseen blocks
+MAX_SAMPLE_LOSS = 0.01
+
+SAMPLING_STRATIFIED = 'stratified'
+SAMPLING_RANDOM = 'random'
+SAMPLING_MODES = (SAMPLING_STRATIFIED, SAMPLING_RANDOM)
+
+
+def fold_rare_symbols(frequencies, max_length, escape) -> dict:
+    """
+    Get frequencies with the rarest symbols counted as escape, so that all symbols fit into codes of at most
+    max_length bits, frequencies are returned as they are if they fit
+
+    :param frequencies: dict
+    :param max_length: int
+    :param escape: str or int
+    :return: dict
+    """
+    if len(frequencies) <= 1 << max_length:
+        return frequencies
+
+    by_count = sorted((symbol for symbol in frequencies if symbol != escape),
+                      key=lambda symbol: (-frequencies[symbol], symbol))
+    kept = by_count[:(1 << max_length) - 1]
+    folded = {symbol: frequencies[symbol] for symbol in kept}
+    folded[escape] = frequencies.get(escape, 0) + sum(frequencies[symbol] for symbol in by_count[len(kept):])
+
+    return folded
+
+
+def get_code_lengths(frequencies, max_length=None, escape=None) -> dict:
+    """
+    Get huffman code lengths for given symbol frequencies, codes are limited to max_length bits if given.
+    If there are more symbols than such codes can hold, the rarest are coded through escape if it is given
+
+    :param frequencies: dict
+    :param max_length: int
+    :param escape: str or int, escape symbol, none if symbols cannot be escaped
+    :return: dict
+    """
+    tree = HuffmanTree(sorted(frequencies.items(), key=lambda item: item[1]))
+    tree.build()
+    code_lengths = tree.get_code_lengths()
+
+    if max_length and max(code_lengths.values(), default=0) > max_length:
+        if escape is not None:
+            frequencies = fold_rare_symbols(frequencies, max_length, escape)
+        return limit_code_lengths(frequencies, max_length)
+    return code_lengths
+
+
+def get_cost(code_lengths, frequencies, escape_length) -> float:
+    """
+    Get average bits per symbol of coding given frequencies, symbols missing in code lengths are escaped
+
+    :param code_lengths: dict
+    :param frequencies: dict
+    :param escape_length: int, bits of escape code and raw symbol
+    :return: float
+    """
+    total = sum(frequencies.values())
+    if not total:
+        return 0.0
+
+    bits = sum(count * code_lengths.get(symbol, escape_length) for symbol, count in frequencies.items())
+
+    return bits / total
+
+
+class Sampler:
+    """
+    Estimates symbol frequencies from blocks read at sampled positions across the whole file
+
+    Blocks are read in rounds of doubling size. After every round, codes built from earlier rounds
+    are measured on blocks of the new round and compared to codes built from all blocks read so far,
+    sampling stops when the loss in bits per symbol is small enough or when budget is spent.
+    Escape symbol gets the count of symbols seen once, which estimates how often unseen symbols appear.
+
+    Properties
+    ----------
+    file_path : str
+        sampled file
+    budget : int
+        maximum bytes read
+    mode : str
+        stratified takes one block from every equal part of the file, random takes blocks anywhere
+    binary : bool
+        notes if symbols are raw bytes instead of UTF-8 characters
+    max_loss : float
+        bits per symbol the estimated codes may lose on unseen blocks
+    seed : int
+        seed of block positions, same seed samples same blocks
+    loss : float
+        loss in bits per symbol measured on the last round, none before second round
+    sampled : int
+        bytes read
+    """
+    def __init__(self, file_path, budget=SAMPLE_BUDGET, mode=SAMPLING_STRATIFIED, binary=False,
+                 max_loss=MAX_SAMPLE_LOSS, seed=0):
+        """
+        Sampler constructor
+
+        :param file_path: str
+        :param budget: int
+        :param mode: str
+        :param binary: bool
+        :param max_loss: float
+        :param seed: int
+        """
+        if mode not in SAMPLING_MODES:
+            raise ValueError('Unknown sampling mode: {}'.format(mode))
+        self.file_path = file_path
+        self.budget = budget
+        self.mode = mode
+        self.binary = binary
+        self.max_loss = max_loss
+        self.seed = seed
+        self.loss = None
+        self.sampled = 0
+
+    def get_offsets(self) -> list:
+        """
+        Get offsets of all blocks budget allows, in order they are read
+
+        :return: list
+        """
+        file_size = os.path.getsize(self.file_path)
+        count = max(self.budget // SAMPLE_BLOCK_SIZE, 1)
+        last_offset = max(file_size - SAMPLE_BLOCK_SIZE, 0)
+        generator = random.Random(self.seed)
+
+        if self.mode == SAMPLING_RANDOM:
+            return [generator.randint(0, last_offset) for _ in range(count)]
+
+        # one block from every stratum, strata are visited in random order so every round covers whole file
+        stratum_size = last_offset / count
+        offsets = [int(stratum * stratum_size + generator.random() * stratum_size) for stratum in range(count)]
+        generator.shuffle(offsets)
+
+        return offsets
+
+    def read_block(self, data_stream, offset):
+        """
+        Reads one block, in text mode partial UTF-8 sequences at block edges are dropped
+
+        :param data_stream: BufferedReader
+        :param offset: int
+        :return: str or bytes
+        """
+        data_stream.seek(offset)
+        block = data_stream.read(SAMPLE_BLOCK_SIZE)
+        self.sampled += len(block)
+        if self.binary:
+            return block
+
+        start = 0
+        while start < len(block) and is_continuation_byte(block[start]):
+            start += 1
+
+        return block[start:].decode('utf8', errors='ignore')
+
+    def estimate_frequencies(self) -> dict:
+        """
+        Samples file until estimated codes are close to optimal and gets sampled frequencies with escape
+
+        :return: dict
+        """
+        escape = BYTE_ESCAPE if self.binary else ESCAPE
+        escape_bits = BYTE_ESCAPE_BITS if self.binary else ESCAPE_BITS
+        offsets = self.get_offsets()
+        frequencies = Counter()
+        self.loss = None
+        self.sampled = 0
+
+        with open(self.file_path, 'rb') as rf:
+            round_start, round_size = 0, 1
+            while round_start < len(offsets):
+                round_frequencies = Counter()
+                for offset in offsets[round_start:round_start + round_size]:
+                    round_frequencies.update(self.read_block(rf, offset))
+                round_start += round_size
+                round_size *= 2
+
+                previous_lengths = None
+                if frequencies:
+                    previous_lengths = get_code_lengths(self.with_escape(frequencies, escape))
+                frequencies.update(round_frequencies)
+
+                if previous_lengths:
+                    code_lengths = get_code_lengths(self.with_escape(frequencies, escape))
+                    estimated = get_cost(previous_lengths, round_frequencies, previous_lengths[escape] + escape_bits)
+                    optimal = get_cost(code_lengths, round_frequencies, code_lengths[escape] + escape_bits)
+                    self.loss = estimated - optimal
+
+                if self.loss is not None and self.loss <= self.max_loss:
+                    break
+
+        return self.with_escape(frequencies, escape)
+
+    @staticmethod
+    def with_escape(frequencies, escape) -> dict:
+        """
+        Get frequencies with escape symbol counted as often as symbols seen only once
+
+        :param frequencies: dict
+        :param escape: str or int
+        :return: dict
+        """
+        escaped = dict(frequencies)
+        escaped[escape] = max(sum(1 for count in frequencies.values() if count == 1), 1)
+
+        return escaped
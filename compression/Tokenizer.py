@@ -0,0 +1,169 @@
+#!/usr/bin/python3
+
+import re
+from collections import Counter
+from multiprocessing import Pool
+
+from Histogram import RANGE_SIZE, get_ranges, read_range
+
+TOKENS_WORDS = 'words'
+TOKENS_NGRAMS = 'ngrams'
+TOKENS_DIGRAPHS = 'digraphs'
+TOKENIZER_MODES = (TOKENS_WORDS, TOKENS_NGRAMS, TOKENS_DIGRAPHS)
+
+# Default count of multi character tokens kept in vocabulary
+VOCABULARY_SIZE = 4096
+# Characters in one piece of a word in n-gram mode
+NGRAM_LENGTH = 3
+# Longer words are never added to vocabulary
+MAX_TOKEN_LENGTH = 32
+# Lithuanian diphthongs, always part of digraph vocabulary
+DIPHTHONGS = ('ai', 'au', 'ei', 'ui', 'ie', 'uo')
+
+# Runs of word characters, or pieces of them, and every other character on its own
+WORD_PATTERN = r'\w+|\W'
+PIECE_PATTERN = r'\w{{1,{}}}|\W'
+
+
+class Tokenizer:
+    """
+    Splits text into words or pieces of words, pieces not found in vocabulary fall back to single characters
+
+    Splitting is a single regular expression search, pieces outside of vocabulary are not split
+    further by tokenizer, coder codes them as their characters.
+
+    Properties
+    ----------
+    mode : str
+        words keeps whole words, ngrams and digraphs split words into pieces of ngram_length or 2 characters
+    vocabulary : set
+        multi character tokens
+    ngram_length : int
+        characters in one piece of a word in n-gram mode
+    pattern : Pattern
+        expression matching one piece
+    """
+    def __init__(self, mode, vocabulary=(), ngram_length=NGRAM_LENGTH):
+        """
+        Tokenizer constructor
+
+        :param mode: str
+        :param vocabulary: iterable
+        :param ngram_length: int
+        """
+        if mode not in TOKENIZER_MODES:
+            raise ValueError('Unknown tokenizer mode: {}'.format(mode))
+        self.mode = mode
+        self.vocabulary = set(vocabulary)
+        self.ngram_length = 2 if mode == TOKENS_DIGRAPHS else ngram_length
+        if mode == TOKENS_WORDS:
+            self.pattern = re.compile(WORD_PATTERN)
+        else:
+            self.pattern = re.compile(PIECE_PATTERN.format(self.ngram_length))
+
+    def split(self, text) -> list:
+        """
+        Splits text into pieces, pieces are candidate tokens
+
+        :param text: str
+        :return: list
+        """
+        return self.pattern.findall(text)
+
+    def count_tokens(self, pieces) -> Counter:
+        """
+        Counts tokens of counted pieces, characters of pieces missing in vocabulary are counted instead
+
+        :param pieces: dict of piece counts by piece
+        :return: Counter
+        """
+        tokens = Counter()
+        for piece, count in pieces.items():
+            if len(piece) == 1 or piece in self.vocabulary:
+                tokens[piece] += count
+                continue
+            for character in piece:
+                tokens[character] += count
+
+        return tokens
+
+    def build_vocabulary(self, candidates, size) -> None:
+        """
+        Keeps candidates which save the most characters, diphthongs are always kept in digraph mode
+
+        :param candidates: dict of candidate counts by candidate
+        :param size: int
+        :return: None
+        """
+        saved = {
+            candidate: count * (len(candidate) - 1)
+            for candidate, count in candidates.items()
+            if 1 < len(candidate) <= MAX_TOKEN_LENGTH
+        }
+        self.vocabulary = set(sorted(saved, key=lambda candidate: (-saved[candidate], candidate))[:size])
+        if self.mode == TOKENS_DIGRAPHS:
+            self.vocabulary.update(diphthong for diphthong in DIPHTHONGS if diphthong in candidates)
+
+
+def count_candidates(file_path, start, end, tokenizer) -> Counter:
+    """
+    Counts candidate tokens of one range of file
+
+    :param file_path: str
+    :param start: int
+    :param end: int
+    :param tokenizer: Tokenizer
+    :return: Counter
+    """
+    return Counter(tokenizer.split(read_range(file_path, start, end)))
+
+
+def count_tokens(file_path, start, end, tokenizer) -> tuple:
+    """
+    Counts tokens of one range of file
+
+    :param file_path: str
+    :param start: int
+    :param end: int
+    :param tokenizer: Tokenizer
+    :return: Counter, count of characters in range
+    """
+    text = read_range(file_path, start, end)
+
+    return tokenizer.count_tokens(Counter(tokenizer.split(text))), len(text)
+
+
+def build_tokenizer(file_path, processes, mode, vocabulary_size=VOCABULARY_SIZE) -> tuple:
+    """
+    Builds vocabulary of file and counts its tokens, both passes run in parallel over ranges of file
+
+    :param file_path: str
+    :param processes: int
+    :param mode: str
+    :param vocabulary_size: int
+    :return: Tokenizer, dict of token frequencies, count of characters in file
+    """
+    tokenizer = Tokenizer(mode)
+    ranges = get_ranges(file_path, RANGE_SIZE)
+    candidates = Counter()
+    frequencies = Counter()
+    total = 0
+
+    with Pool(processes) as pool:
+        for partial_candidates in pool.starmap(count_candidates, [(file_path, *r, tokenizer) for r in ranges]):
+            candidates.update(partial_candidates)
+        tokenizer.build_vocabulary(candidates, vocabulary_size)
+
+        for partial_frequencies, length in pool.starmap(count_tokens, [(file_path, *r, tokenizer) for r in ranges]):
+            frequencies.update(partial_frequencies)
+            total += length
+
+    # vocabulary tokens never counted would only waste codes
+    tokenizer.vocabulary &= set(frequencies)
+    # chunk boundary may split a token, its pieces are coded as their characters
+    for token in tokenizer.vocabulary:
+        for character in token:
+            if character not in frequencies:
+                frequencies[character] = 1
+
+    return tokenizer, dict(frequencies), total
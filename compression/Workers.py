@@ -0,0 +1,205 @@
+#!/usr/bin/python3
+
+from collections import Counter
+
+from Archive import get_checksum
+from ArithmeticCoding import ArithmeticCoder
+from Blocks import pack_table, unpack_table
+from Codecs import decode_chunk, encode_chunk
+from HuffmanCoder import BYTE_ESCAPE, ESCAPE, HuffmanCoder
+from HuffmanTree import get_canonical_codes
+from Sampling import get_code_lengths
+
+# Block code tables kept built by one pool worker process
+TABLE_CACHE_SIZE = 16
+
+# Coder, coding mode and newline symbol of pool worker process, set once when worker starts
+worker_coder = None
+worker_binary = False
+worker_newline = '\n'
+# Coders of block code tables used by pool worker process by packed table
+worker_tables = {}
+# Tokenizer of pool worker process, none if symbols are single characters
+worker_tokenizer = None
+# Match finder of pool worker process, none unless chunks are coded as literals and matches
+worker_matcher = None
+# Notes if chunks of pool worker process start with codec id
+worker_codecs = False
+# Maximum code length of code tables built by pool worker process, none for unlimited codes
+worker_max_length = None
+
+
+def init_worker(codes=None, binary=False, tokenizer=None, matcher=None, frequencies=None, coder=None,
+                codecs=False, max_length=None) -> None:
+    """
+    Builds coding tables once per pool worker process, blocks with own code tables need no codes
+
+    :param codes: dict
+    :param binary: bool
+    :param tokenizer: Tokenizer
+    :param matcher: MatchFinder
+    :param frequencies: dict of quantized frequencies, arithmetic coder is built instead of huffman coder if given
+    :param coder: ContextModel, AnsCoder, MatchFinder or StoredCodec, used as is if given
+    :param codecs: bool, notes if chunks start with codec id
+    :param max_length: int, maximum code length of code tables built by worker
+    :return: None
+    """
+    global worker_coder, worker_binary, worker_newline, worker_tokenizer, worker_matcher, worker_codecs, \
+        worker_max_length
+    worker_coder = HuffmanCoder(codes, binary) if codes is not None else None
+    if frequencies is not None:
+        worker_coder = ArithmeticCoder(frequencies, binary)
+    if coder is not None:
+        worker_coder = coder
+    worker_binary = binary
+    worker_tokenizer = tokenizer
+    worker_matcher = matcher
+    worker_codecs = codecs
+    worker_max_length = max_length
+    worker_newline = b'\n' if binary else '\n'
+    worker_tables.clear()
+
+
+def get_table_coder(table, binary=False) -> HuffmanCoder:
+    """
+    Builds coder of packed block code table
+
+    :param table: bytes
+    :param binary: bool
+    :return: HuffmanCoder
+    """
+    return HuffmanCoder(get_canonical_codes(unpack_table(table, binary)), binary)
+
+
+def get_worker_table_coder(table) -> HuffmanCoder:
+    """
+    Gets coder of packed block code table in pool worker process, recently used coders are kept
+
+    :param table: bytes
+    :return: HuffmanCoder
+    """
+    coder = worker_tables.get(table)
+    if coder is None:
+        if len(worker_tables) >= TABLE_CACHE_SIZE:
+            del worker_tables[next(iter(worker_tables))]
+        coder = worker_tables[table] = get_table_coder(table, worker_binary)
+
+    return coder
+
+
+def get_data_checksum(data, binary=False) -> tuple:
+    """
+    Get CRC32 and byte length of chunk, text chunks are checked as UTF-8 bytes
+
+    :param data: str or bytes
+    :param binary: bool
+    :return: checksum, byte length
+    """
+    raw = data if binary else data.encode('utf8')
+
+    return get_checksum(raw), len(raw)
+
+
+def encode_worker_chunk(chunk) -> tuple:
+    """
+    Encodes one chunk in pool worker process
+
+    :param chunk: str or bytes
+    :return: encoded chunk, chunk length, newline count in chunk, checksum and byte length of chunk
+    """
+    coder = worker_matcher or worker_coder
+    symbols = worker_tokenizer.split(chunk) if worker_tokenizer else chunk
+    if worker_codecs:
+        encoded = encode_chunk(coder, chunk, symbols, worker_binary)
+    else:
+        encoded = coder.encode(symbols)
+
+    return (encoded, len(chunk), chunk.count(worker_newline)) + get_data_checksum(chunk, worker_binary)
+
+
+def decode_worker_chunk(chunk, size=None) -> str:
+    """
+    Decodes one chunk in pool worker process
+
+    :param chunk: bytes
+    :param size: int, decoded length of chunk recorded by archive, none if unknown
+    :return: str or bytes
+    """
+    if worker_codecs:
+        return decode_chunk(worker_coder, chunk, worker_binary, size)
+
+    return worker_coder.decode(chunk)
+
+
+def encode_worker_block(block) -> tuple:
+    """
+    Encodes one block with its own code table in pool worker process
+
+    :param block: tuple of raw block bytes and packed code table
+    :return: encoded block, block length, newline count in block, checksum and byte length of block,
+        packed code table
+    """
+    data, table = block
+    checksum, raw_size = get_checksum(data), len(data)
+    if not worker_binary:
+        data = data.decode('utf8')
+    coder = get_worker_table_coder(table)
+    encoded = encode_chunk(coder, data, binary=worker_binary) if worker_codecs else coder.encode(data)
+
+    return encoded, len(data), data.count(worker_newline), checksum, raw_size, table
+
+
+def encode_worker_stream(data) -> tuple:
+    """
+    Encodes one chunk of streamed input with code table built from the chunk in pool worker process
+
+    :param data: bytes, raw chunk, text chunks end with complete UTF-8 sequence
+    :return: encoded chunk, chunk length, newline count in chunk, checksum and byte length of chunk,
+        packed code table
+    """
+    frequencies = Counter(data if worker_binary else data.decode('utf8'))
+    escape = BYTE_ESCAPE if worker_binary else ESCAPE
+    table = pack_table(get_code_lengths(frequencies, worker_max_length, escape), worker_binary)
+
+    return encode_worker_block((data, table))
+
+
+def decode_worker_block(block, size=None) -> str:
+    """
+    Decodes one block with its own code table in pool worker process
+
+    :param block: tuple of encoded block and packed code table
+    :param size: int, decoded length of block recorded by archive, none if unknown
+    :return: str or bytes
+    """
+    chunk, table = block
+    if worker_codecs:
+        return decode_chunk(get_worker_table_coder(table), chunk, worker_binary, size)
+
+    return get_worker_table_coder(table).decode(chunk)
+
+
+def check_worker_chunk(task) -> tuple:
+    """
+    Decodes one chunk or block in pool worker process and verifies its checksum and newline count against
+    index entry if it is given
+
+    :param task: tuple of decoding function, its argument, decoded length recorded by archive or none,
+        IndexEntry or none and flag to return decoded data
+    :return: decoded data or none, checksum and byte length of decoded data
+    """
+    decode, chunk, size, entry, keep = task
+    offset = 'unknown' if entry is None else entry.offset
+    try:
+        data = decode(chunk, size)
+    except Exception as error:
+        # corrupted chunk may fail anywhere in decoder, every failure is reported as failure of the chunk
+        raise ValueError('Chunk at offset {} cannot be decoded: {!r}'.format(offset, error)) from error
+    checksum, raw_size = get_data_checksum(data, worker_binary)
+    if entry is not None and checksum != entry.checksum:
+        raise ValueError('Checksum mismatch of chunk at offset {}'.format(offset))
+    # lines are not covered by checksum, line ranges are extracted by them
+    if entry is not None and data.count(worker_newline) != entry.lines:
+        raise ValueError('Line count mismatch of chunk at offset {}'.format(offset))
+
+    return data if keep else None, checksum, raw_size
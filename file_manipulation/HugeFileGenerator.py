@@ -2,16 +2,30 @@
 
 import random
 import time
+from itertools import accumulate
 
 from multiprocessing import Pool
 
+# Words are picked by their frequency in words.csv or all equally often
+DISTRIBUTION_WEIGHTED = 'weighted'
+DISTRIBUTION_UNIFORM = 'uniform'
+DISTRIBUTIONS = (DISTRIBUTION_WEIGHTED, DISTRIBUTION_UNIFORM)
+
 
 class HugeFileGenerator:
-    def __init__(self):
+    def __init__(self, words_path='words.csv', distribution=DISTRIBUTION_WEIGHTED, seed=None):
+        """
+        Seeded generator writes the same file on every run, it generates in a single process then
+
+        :param words_path: str
+        :param distribution: str
+        :param seed: int, none for random files generated in parallel
+        """
         self.words = []
         self.weights = []
+        self.random = None if seed is None else random.Random(seed)
 
-        with open('words.csv', 'r', encoding='utf8') as rf:
+        with open(words_path, 'r', encoding='utf8') as rf:
             lines = rf.readlines()
 
         total_freq = 0
@@ -22,18 +36,21 @@ class HugeFileGenerator:
         for line in lines:
             word, freq = line.split(',')
             self.words.append(str.strip(word, '"'))
-            self.weights.append(int(freq) / total_freq)
+            self.weights.append(int(freq) / total_freq if distribution == DISTRIBUTION_WEIGHTED else 1 / len(lines))
+        # cumulative weights are computed once instead of on every pick
+        self.cum_weights = list(accumulate(self.weights))
 
     def get_random_word(self, _):
-        random_separator = random.randint(1, 1000)
+        generator = self.random or random
+        random_separator = generator.randint(1, 1000)
         if random_separator < 5:
-            return random.choices(self.words, self.weights)[0] + '.\n'\
-                   + random.choices(self.words, self.weights)[0].capitalize()
+            return generator.choices(self.words, cum_weights=self.cum_weights)[0] + '.\n'\
+                   + generator.choices(self.words, cum_weights=self.cum_weights)[0].capitalize()
         elif random_separator < 100:
-            return random.choices(self.words, self.weights)[0] + '. '\
-                   + random.choices(self.words, self.weights)[0].capitalize()
+            return generator.choices(self.words, cum_weights=self.cum_weights)[0] + '. '\
+                   + generator.choices(self.words, cum_weights=self.cum_weights)[0].capitalize()
         else:
-            return random.choices(self.words, self.weights)[0] + ' '
+            return generator.choices(self.words, cum_weights=self.cum_weights)[0] + ' '
 
     def generate_file(self, filename, size=1.0):
         """
@@ -41,10 +58,15 @@ class HugeFileGenerator:
         """
         size_bytes = size * 1024 * 1024
         text = ''
-        pool = Pool(2)
         start_time = time.time()
-        while len(text) < size_bytes:
-            text += ''.join(pool.map(self.get_random_word, range(2048)))
+        if self.random:
+            # words of seeded generator are picked in order
+            while len(text) < size_bytes:
+                text += ''.join(map(self.get_random_word, range(2048)))
+        else:
+            pool = Pool(2)
+            while len(text) < size_bytes:
+                text += ''.join(pool.map(self.get_random_word, range(2048)))
 
         with open(filename, 'w', encoding='utf8') as wf:
             wf.write(text)
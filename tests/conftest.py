@@ -0,0 +1,23 @@
+import os
+import subprocess
+import sys
+
+import pytest
+
+COMPRESSION_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir, 'compression')
+# scripts of compression directory import each other by module name
+sys.path.insert(0, COMPRESSION_PATH)
+
+
+@pytest.fixture
+def run_tool():
+    """
+    Runs a command line tool of compression directory with few pool processes, returns finished process
+    """
+    def run(script, *args, stdin=None):
+        return subprocess.run(
+            [sys.executable, os.path.join(COMPRESSION_PATH, script)] + [str(arg) for arg in args] + ['-p', '2'],
+            input=stdin, stdout=subprocess.PIPE, stderr=subprocess.PIPE
+        )
+
+    return run
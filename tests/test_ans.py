@@ -0,0 +1,66 @@
+from collections import Counter
+
+import pytest
+
+from AnsCoder import ANS_BITS, STATE, STATES, AnsCoder
+from ArithmeticCoding import SYMBOL_COUNT, quantize_frequencies
+from HuffmanCoder import BYTE_ESCAPE, ESCAPE
+
+TEXT = 'Lietuvos Respublika yra nepriklausoma demokratinė respublika. ' * 40
+
+
+def get_coder(sample, binary=False) -> AnsCoder:
+    escape = BYTE_ESCAPE if binary else ESCAPE
+    frequencies = dict(Counter(sample))
+    frequencies[escape] = 1
+
+    return AnsCoder(quantize_frequencies(frequencies, ANS_BITS, escape), binary)
+
+
+@pytest.mark.parametrize('chunk', ['', 'a', TEXT, TEXT[:STATES + 1]])
+def test_text_round_trip(chunk):
+    coder = get_coder(TEXT)
+
+    assert coder.decode(coder.encode(chunk)) == chunk
+
+
+def test_bytes_round_trip():
+    chunk = bytes(range(256)) * 4 + b'\x00' * 1000
+    coder = get_coder(chunk, True)
+
+    assert coder.decode(coder.encode(chunk)) == chunk
+
+
+def test_symbols_missing_in_model_are_escaped():
+    coder = get_coder(TEXT)
+    chunk = TEXT + '中文 \U0001f600 ÿ'
+
+    assert coder.decode(coder.encode(chunk)) == chunk
+
+
+def test_missing_symbol_without_escape_is_refused():
+    coder = AnsCoder(quantize_frequencies(dict(Counter(TEXT)), ANS_BITS))
+
+    with pytest.raises(KeyError):
+        coder.encode('中')
+
+
+def test_alphabet_larger_than_model_is_folded_into_escape():
+    chunk = ''.join(chr(0x4e00 + code) for code in range(1 << ANS_BITS)) + TEXT
+    coder = get_coder(chunk)
+
+    assert len(coder.frequencies) <= 1 << (ANS_BITS - 1)
+    assert coder.decode(coder.encode(chunk)) == chunk
+
+
+def test_frequencies_must_sum_up_to_power_of_two():
+    with pytest.raises(ValueError, match='power of two'):
+        AnsCoder({'a': 3, 'b': 2})
+
+
+def test_truncated_chunk_is_refused():
+    coder = get_coder(TEXT)
+    encoded = coder.encode(TEXT)
+
+    with pytest.raises(IndexError):
+        coder.decode(encoded[:SYMBOL_COUNT.size + STATE.size * STATES])
@@ -0,0 +1,160 @@
+import io
+
+import pytest
+
+from Archive import FOOTER, FRAME, FRAME_END, HEADER, INDEX, MAGIC, SECTION_CODE_LENGTHS, SECTION_PROPERTIES, \
+    VERSION, ArchiveReader, ArchiveWriter, combine_checksums, get_checksum, pack_code_lengths, pack_sections, \
+    unpack_code_lengths, unpack_sections
+
+
+def write_archive(chunks, sections=None, flags=0) -> bytes:
+    stream = io.BytesIO()
+    writer = ArchiveWriter(stream)
+    writer.write_header(sections or {SECTION_PROPERTIES: b'test'}, flags)
+    for chunk in chunks:
+        writer.write_chunk(chunk, len(chunk), chunk.count(b'\n'), checksum=get_checksum(chunk))
+    writer.write_footer()
+
+    return stream.getvalue()
+
+
+def test_sections_round_trip():
+    sections = {SECTION_PROPERTIES: b'name', SECTION_CODE_LENGTHS: b'', 12: bytes(range(256))}
+
+    assert unpack_sections(pack_sections(sections)) == sections
+
+
+@pytest.mark.parametrize('cut', [1, 4, 6])
+def test_truncated_sections_are_refused(cut):
+    body = pack_sections({SECTION_PROPERTIES: b'name'})
+
+    with pytest.raises(ValueError):
+        unpack_sections(body[:-cut])
+
+
+def test_code_lengths_round_trip():
+    code_lengths = [('a', 1), ('b', 2), ('中', 3), ('\U0001f600', 3)]
+
+    assert unpack_code_lengths(pack_code_lengths(code_lengths)) == code_lengths
+
+
+def test_archive_round_trip():
+    chunks = [b'first\nchunk', b'', b'third chunk\n\n']
+    reader = ArchiveReader(io.BytesIO(write_archive(chunks, flags=1)))
+
+    assert reader.read_header() == {SECTION_PROPERTIES: b'test'}
+    assert reader.flags == 1
+    assert list(reader.read_chunks()) == [(chunk, len(chunk)) for chunk in chunks]
+    assert reader.checksum == get_checksum(b''.join(chunks))
+
+    index = reader.read_index()
+    assert [reader.read_chunk(entry) for entry in index] == chunks
+    assert [entry.lines for entry in index] == [1, 0, 2]
+
+
+def test_combined_checksum_equals_checksum_of_joined_data():
+    first, second = b'some text ' * 100, b'other text'
+
+    assert combine_checksums(get_checksum(first), get_checksum(second), len(second)) == get_checksum(first + second)
+
+
+def test_corrupted_header_is_refused():
+    data = bytearray(write_archive([b'chunk']))
+    data[HEADER.size + 6] ^= 1
+
+    with pytest.raises(ValueError, match='checksum'):
+        ArchiveReader(io.BytesIO(bytes(data))).read_header()
+
+
+def test_header_without_checksum_is_refused():
+    body = pack_sections({SECTION_PROPERTIES: b'test'})
+    data = HEADER.pack(MAGIC, VERSION, 0, len(body)) + body
+
+    with pytest.raises(ValueError, match='Header checksum not found'):
+        ArchiveReader(io.BytesIO(data)).read_header()
+
+
+def test_other_version_is_refused():
+    data = bytearray(write_archive([b'chunk']))
+    data[len(MAGIC)] = VERSION - 1
+
+    with pytest.raises(ValueError, match='Unsupported archive version'):
+        ArchiveReader(io.BytesIO(bytes(data))).read_header()
+
+
+def test_foreign_file_is_refused():
+    with pytest.raises(ValueError, match='Not an archive'):
+        ArchiveReader(io.BytesIO(b'plain text file')).read_header()
+
+
+@pytest.mark.parametrize('cut', [2, 9, 20, 31, 40])
+def test_truncated_archive_is_refused(cut):
+    data = write_archive([b'chunk' * 4])
+    header_size = HEADER.size + HEADER.unpack_from(data)[3]
+    # chunk frame, chunk and end frame with checksum take 9 + 20 + 9 + 4 bytes
+    reader = ArchiveReader(io.BytesIO(data[:header_size + cut]))
+    reader.read_header()
+
+    with pytest.raises(ValueError, match='truncated'):
+        list(reader.read_chunks())
+
+
+def test_frame_size_larger_than_archive_is_refused():
+    data = bytearray(write_archive([b'chunk']))
+    reader = ArchiveReader(io.BytesIO(bytes(data)))
+    reader.read_header()
+    position = reader.data_stream.tell()
+    data[position:position + FRAME.size] = FRAME.pack(1, 1 << 30, 5)
+    reader = ArchiveReader(io.BytesIO(bytes(data)))
+    reader.read_header()
+
+    with pytest.raises(ValueError, match='truncated'):
+        list(reader.read_chunks())
+
+
+def test_index_is_checked_against_frames():
+    chunks = [b'first', b'second', b'third']
+    reader = ArchiveReader(io.BytesIO(write_archive(chunks)))
+    reader.read_header()
+    index = reader.read_index()
+
+    assert [chunk for chunk, _ in reader.read_chunks(index)] == chunks
+
+
+@pytest.mark.parametrize('corrupt', [
+    lambda index: [index[0]._replace(offset=index[0].offset + 1)] + index[1:],
+    lambda index: [index[0]._replace(size=index[0].size + 1)] + index[1:],
+    lambda index: [index[0]._replace(table=index[0].offset)] + index[1:],
+    lambda index: index[:-1],
+    lambda index: index + index[-1:],
+])
+def test_index_not_matching_frames_is_refused(corrupt):
+    reader = ArchiveReader(io.BytesIO(write_archive([b'first', b'second'])))
+    reader.read_header()
+    index = corrupt(reader.read_index())
+
+    with pytest.raises(ValueError, match='index'):
+        list(reader.read_chunks(index))
+
+
+def test_end_frame_without_checksum_is_refused():
+    data = write_archive([b'chunk'])
+    index_offset = FOOTER.unpack(data[-FOOTER.size:])[0]
+    end = index_offset - FRAME.size - 4
+    reader = ArchiveReader(io.BytesIO(data[:end] + FRAME.pack(FRAME_END, 0, 0) + data[index_offset:]))
+    reader.read_header()
+
+    with pytest.raises(ValueError, match='end frame'):
+        list(reader.read_chunks())
+
+
+def test_index_of_other_entry_size_is_refused():
+    data = bytearray(write_archive([b'chunk']))
+    index_offset = FOOTER.unpack(data[-FOOTER.size:])[0]
+    count, entry_size = INDEX.unpack_from(data, index_offset)
+    data[index_offset:index_offset + INDEX.size] = INDEX.pack(count, entry_size - 4)
+    reader = ArchiveReader(io.BytesIO(bytes(data)))
+    reader.read_header()
+
+    with pytest.raises(ValueError, match='index entries'):
+        reader.read_index()
@@ -0,0 +1,79 @@
+import os
+from collections import Counter
+
+import pytest
+
+from Benchmark import CODER_PARTIAL, RATIO_TOLERANCE, check_codecs, compare_reports, encode_case
+from Codecs import CODEC_ARITHMETIC, CODEC_HUFFMAN, CODEC_MATCHES, CODEC_STORED
+from HuffmanPartial import CODER_ARITHMETIC
+
+
+def get_result(coder='partial', **values) -> dict:
+    result = {'corpus': 'words-1', 'coder': coder, 'chunk_size': 1024, 'processes': 2, 'verified': True,
+              'ratio': 2.0, 'encode_mbps': 10.0, 'decode_mbps': 20.0, 'encode_peak_rss': 1000, 'decode_peak_rss': 500}
+    result.update(values)
+
+    return result
+
+
+def test_equal_reports_have_no_regressions():
+    report = {'results': [get_result(), get_result('arithmetic')]}
+
+    assert compare_reports(report, report) == []
+
+
+@pytest.mark.parametrize('values, metric', [
+    ({'encode_mbps': 8.0}, 'encode_mbps'),
+    ({'decode_mbps': 17.0}, 'decode_mbps'),
+    ({'encode_peak_rss': 1200}, 'encode_peak_rss'),
+    ({'ratio': 2.0 * (1 - 2 * RATIO_TOLERANCE)}, 'ratio'),
+])
+def test_changes_beyond_tolerance_are_regressions(values, metric):
+    regressions = compare_reports({'results': [get_result(**values)]}, {'results': [get_result()]})
+
+    assert len(regressions) == 1
+    assert regressions[0].startswith('words-1 partial 1024 2: {}'.format(metric))
+
+
+def test_changes_within_tolerance_and_improvements_pass():
+    report = {'results': [get_result(encode_mbps=9.5, decode_mbps=40.0, decode_peak_rss=100, ratio=3.0)]}
+
+    assert compare_reports(report, {'results': [get_result()]}) == []
+
+
+def test_errors_and_wrong_output_are_regressions():
+    baseline = {'results': [get_result(), get_result('arithmetic')]}
+    report = {'results': [get_result(verified=False), {**get_result('arithmetic'), 'error': 'encode: failed'}]}
+
+    assert compare_reports(report, baseline) == [
+        'words-1 partial 1024 2: decoded file differs from corpus',
+        'words-1 arithmetic 1024 2: encode: failed',
+    ]
+
+
+def test_cases_missing_or_failed_in_baseline_are_skipped():
+    baseline = {'results': [get_result(error='decode: failed')]}
+    report = {'results': [get_result(encode_mbps=1.0), get_result('ans', encode_mbps=1.0)]}
+
+    assert compare_reports(report, baseline) == []
+
+
+def test_codecs_other_than_benchmarked_fail():
+    check_codecs(Counter({CODEC_HUFFMAN: 3, CODEC_STORED: 1}), CODEC_HUFFMAN)
+
+    with pytest.raises(ValueError, match='Chunks are coded by matches instead of arithmetic'):
+        check_codecs(Counter({CODEC_ARITHMETIC: 1, CODEC_MATCHES: 7}), CODEC_ARITHMETIC)
+    with pytest.raises(ValueError, match='Chunks are coded by stored instead of huffman'):
+        check_codecs(Counter({CODEC_STORED: 2}), CODEC_HUFFMAN)
+
+
+@pytest.mark.parametrize('coder', [CODER_PARTIAL, CODER_ARITHMETIC])
+def test_encoded_case_uses_requested_coder(tmp_path, coder):
+    source = tmp_path / 'text.txt'
+    source.write_text('Lietuva Vilnius Kaunas upė miškas ežeras\n' * 2000, encoding='utf8')
+    output = tmp_path / 'out'
+    output.mkdir()
+
+    encoded_path, _ = encode_case(coder, str(source), str(output), 8192, 2)
+
+    assert os.path.getsize(encoded_path) < source.stat().st_size
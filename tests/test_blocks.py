@@ -0,0 +1,83 @@
+from collections import Counter
+
+import pytest
+
+from Blocks import get_table_cost, pack_table, plan_tables, split_blocks, unpack_table
+from HuffmanCoder import BYTE_ESCAPE, ESCAPE
+from HuffmanTree import sort_canonical
+from Sampling import get_code_lengths
+
+
+def get_segments(texts) -> list:
+    segments = []
+    start = 0
+    for text in texts:
+        data = text.encode()
+        segments.append((start, start + len(data), Counter(text)))
+        start += len(data)
+
+    return segments
+
+
+def test_similar_segments_are_joined():
+    blocks = split_blocks(get_segments(['abcabc' * 100, 'abcabc' * 100, 'cbacba' * 100]), 1 << 20)
+
+    assert len(blocks) == 1
+    assert blocks[0][:2] == (0, 1800)
+    assert blocks[0][2] == Counter('abc' * 600)
+
+
+def test_different_segments_stay_apart():
+    blocks = split_blocks(get_segments(['ab' * 2000, 'xyz' * 2000, 'ab' * 2000]), 1 << 20)
+
+    assert [(start, end) for start, end, _ in blocks] == [(0, 4000), (4000, 10000), (10000, 14000)]
+
+
+def test_blocks_respect_maximum_size():
+    blocks = split_blocks(get_segments(['abc' * 100] * 10), 900)
+
+    assert [(start, end) for start, end, _ in blocks] == [(0, 900), (900, 1800), (1800, 2700), (2700, 3000)]
+
+
+def test_blocks_end_at_segment_boundaries():
+    segments = get_segments(['ąž' * 50, 'ab' * 70, 'ąž' * 50])
+    blocks = split_blocks(segments, 1 << 20)
+
+    assert {end for _, end, _ in blocks} <= {end for _, end, _ in segments}
+    assert sum((frequencies for _, _, frequencies in blocks), Counter()) == \
+        sum((frequencies for _, _, frequencies in segments), Counter())
+
+
+def test_tables_are_reused_when_they_fit():
+    blocks = [(0, 10, Counter('aaabbc' * 100)), (10, 20, Counter('aaabbc' * 90)), (20, 30, Counter('xyz' * 1000))]
+    plan, lost_bits = plan_tables(blocks)
+
+    assert plan[0][2] is plan[1][2]
+    assert plan[2][2] is not plan[1][2]
+    assert lost_bits == 0
+
+
+@pytest.mark.parametrize('binary', [False, True])
+def test_tables_round_trip(binary):
+    symbols = [0, 32, 200, 255] if binary else ['a', 'ą', '中', '\U0001f600']
+    code_lengths = get_code_lengths(dict(zip(symbols, [10, 5, 2, 1])))
+
+    assert unpack_table(pack_table(code_lengths, binary), binary) == sort_canonical(code_lengths)
+
+
+@pytest.mark.parametrize('binary', [False, True])
+def test_limited_tables_hold_escape(binary):
+    symbols = range(256) if binary else [chr(0x4e00 + index) for index in range(300)]
+    frequencies = Counter({symbol: 1 + index for index, symbol in enumerate(symbols)})
+    plan, lost_bits = plan_tables([(0, 1000, frequencies)], binary, 6)
+    code_lengths = dict(unpack_table(plan[0][2], binary))
+
+    assert len(code_lengths) == 64
+    assert (BYTE_ESCAPE if binary else ESCAPE) in code_lengths
+    assert max(code_lengths.values()) <= 6
+    assert lost_bits > 0
+
+
+def test_table_cost_counts_symbol_bytes():
+    assert get_table_cost({'a': 1, 'ž': 1}) == 8 * (2 + 3)
+    assert get_table_cost({0: 1}, binary=True) == 256 * 8
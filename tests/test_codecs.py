@@ -0,0 +1,142 @@
+import random
+from collections import Counter
+
+import pytest
+
+from Codecs import CODEC_ANS, CODEC_CONTEXT, CODEC_HUFFMAN, CODEC_MATCHES, CODEC_STORED, SAMPLE_SIZE, StoredCodec, \
+    decode_chunk, encode_chunk, get_sample
+from ContextModel import ContextModel
+from HuffmanCoder import BYTE_ESCAPE, ESCAPE, HuffmanCoder
+from HuffmanTree import get_canonical_codes, sort_canonical
+from Matches import MatchFinder
+from Sampling import get_code_lengths
+from test_ans import get_coder as get_ans_coder
+
+TEXT = 'Lietuvos Respublika yra nepriklausoma demokratinė respublika, suverenitetas priklauso tautai. '
+
+
+def get_huffman_coder(sample, binary=False) -> HuffmanCoder:
+    frequencies = dict(Counter(sample))
+    frequencies[BYTE_ESCAPE if binary else ESCAPE] = 1
+
+    return HuffmanCoder(get_canonical_codes(sort_canonical(get_code_lengths(frequencies))), binary)
+
+
+def get_words(size, seed=1) -> str:
+    generator = random.Random(seed)
+    words = TEXT.split()
+
+    return ' '.join(generator.choice(words) for _ in range(size))
+
+
+def get_characters(size, seed=1) -> str:
+    # characters picked by their frequency in TEXT, matches find little in them
+    generator = random.Random(seed)
+    counts = Counter(TEXT)
+
+    return ''.join(generator.choices(list(counts), list(counts.values()), k=size))
+
+
+def test_text_chunk_is_coded_by_header_coder():
+    chunk = get_characters(20000)
+    coder = get_huffman_coder(chunk)
+    encoded = encode_chunk(coder, chunk)
+
+    assert encoded[0] == CODEC_HUFFMAN
+    assert decode_chunk(coder, encoded, size=len(chunk)) == chunk
+
+
+def test_random_bytes_are_stored():
+    generator = random.Random(1)
+    chunk = bytes(generator.randrange(256) for _ in range(10000))
+    coder = get_huffman_coder(b'abc', True)
+    encoded = encode_chunk(coder, chunk, binary=True)
+
+    assert encoded[0] == CODEC_STORED
+    assert decode_chunk(coder, encoded, True, len(chunk)) == chunk
+
+
+def test_repeated_chunk_keeps_header_coder():
+    chunk = TEXT * 200
+    coder = get_huffman_coder(chunk)
+    encoded = encode_chunk(coder, chunk)
+
+    # matches would code it smaller, they are used only when archive is coded with matches
+    assert encoded[0] == CODEC_HUFFMAN
+    assert decode_chunk(coder, encoded, size=len(chunk)) == chunk
+
+
+def test_matches_are_used_when_chosen():
+    chunk = (TEXT * 200).encode('utf8')
+    encoded = encode_chunk(MatchFinder(), chunk, binary=True)
+
+    assert encoded[0] == CODEC_MATCHES
+    assert decode_chunk(MatchFinder(), encoded, True, len(chunk)) == chunk
+    with pytest.raises(ValueError, match='not described by archive header'):
+        decode_chunk(None, encoded, True, len(chunk))
+
+
+def test_stored_codec_stores_every_chunk():
+    chunk = TEXT * 10
+
+    assert encode_chunk(StoredCodec(), chunk)[0] == CODEC_STORED
+
+
+@pytest.mark.parametrize('get_coder, codec', [
+    (lambda chunk: get_ans_coder(chunk), CODEC_ANS),
+    (lambda chunk: ContextModel(2, 1 << 16), CODEC_CONTEXT),
+])
+def test_chunk_round_trip_with_other_coders(get_coder, codec):
+    chunk = get_words(3000)
+    coder = get_coder(chunk)
+    encoded = encode_chunk(coder, chunk)
+
+    assert encoded[0] == codec
+    assert decode_chunk(coder, encoded, size=len(chunk)) == chunk
+
+
+@pytest.mark.parametrize('chunk, binary', [('', False), (b'', True), ('ą', False)])
+def test_tiny_chunks_round_trip(chunk, binary):
+    coder = get_huffman_coder(chunk or (b'a' if binary else 'a'), binary)
+
+    assert decode_chunk(coder, encode_chunk(coder, chunk, binary=binary), binary, len(chunk)) == chunk
+
+
+def test_token_symbols_are_coded_instead_of_chunk():
+    chunk = get_words(2000)
+    tokens = chunk.split(' ')
+    tokens = [token for pair in zip(tokens, [' '] * len(tokens)) for token in pair][:-1]
+    coder = get_huffman_coder(tokens)
+    encoded = encode_chunk(coder, chunk, tokens)
+
+    assert encoded[0] == CODEC_HUFFMAN
+    assert decode_chunk(coder, encoded, size=len(chunk)) == chunk
+
+
+def test_codec_missing_in_header_is_refused():
+    chunk = get_characters(20000)
+    encoded = encode_chunk(get_huffman_coder(chunk), chunk)
+
+    with pytest.raises(ValueError, match='not described by archive header'):
+        decode_chunk(get_ans_coder(chunk), encoded)
+
+
+def test_matches_longer_than_chunk_size_are_refused():
+    chunk = TEXT * 200
+    encoded = bytes((CODEC_MATCHES,)) + MatchFinder().encode(chunk.encode('utf8'))
+
+    with pytest.raises(ValueError, match='more than'):
+        decode_chunk(MatchFinder(), encoded, True, 100)
+
+
+def test_sample_of_large_chunk_is_bounded():
+    chunk = get_words(SAMPLE_SIZE)
+
+    assert len(get_sample(chunk)) == SAMPLE_SIZE
+    assert get_sample(chunk[:100]) == chunk[:100]
+    assert get_sample(list(chunk)) == list(get_sample(chunk))
+
+
+def test_stored_cost_counts_utf8_bytes():
+    assert StoredCodec().get_cost({'ą': 2, 'a': 1}) == 40.0
+    assert StoredCodec(True).get_cost({0: 3}) == 24.0
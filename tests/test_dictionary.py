@@ -0,0 +1,88 @@
+import pytest
+
+from Dictionary import DICTIONARY_EXTENSION, find_dictionary, get_dictionary_coder, get_dictionary_id, \
+    read_dictionary, train, write_dictionary
+from HuffmanCoder import BYTE_ESCAPE, ESCAPE
+
+CORPUS = 'Vilnius yra Lietuvos sostinė ir didžiausias šalies miestas. ' * 50
+
+
+@pytest.fixture
+def corpus(tmp_path):
+    directory = tmp_path / 'corpus'
+    directory.mkdir()
+    for index in range(3):
+        (directory / '{}.txt'.format(index)).write_text(CORPUS[index:], encoding='utf8')
+    (directory / 'empty').mkdir()
+
+    return directory
+
+
+@pytest.mark.parametrize('binary', [False, True])
+def test_dictionary_file_round_trip(corpus, tmp_path, binary):
+    dictionary = train(str(corpus), 2, binary)
+    path = str(tmp_path / ('lt' + DICTIONARY_EXTENSION))
+    write_dictionary(path, dictionary)
+
+    assert read_dictionary(path) == dictionary
+    assert dictionary.id == get_dictionary_id(dictionary.code_lengths, binary)
+    assert (BYTE_ESCAPE if binary else ESCAPE) in dict(dictionary.code_lengths)
+
+
+def test_equal_tables_share_id(corpus):
+    assert train(str(corpus), 2).id == train(str(corpus / '*.txt'), 1).id
+    assert train(str(corpus), 2).id != train(str(corpus), 2, True).id
+
+
+def test_code_lengths_are_limited(corpus):
+    dictionary = train(str(corpus), 2, max_length=6)
+
+    assert max(length for _, length in dictionary.code_lengths) <= 6
+
+
+def test_symbols_missing_in_corpus_are_escaped(corpus):
+    coder = get_dictionary_coder(train(str(corpus), 2))
+    text = CORPUS + 'Ąžuolas 中文'
+
+    assert coder.decode(coder.encode(text)) == text
+
+
+def test_dictionary_is_found_by_id(corpus, tmp_path):
+    directory = tmp_path / 'dictionaries'
+    directory.mkdir()
+    text_dictionary = train(str(corpus), 2)
+    write_dictionary(str(directory / ('text' + DICTIONARY_EXTENSION)), text_dictionary)
+    write_dictionary(str(directory / ('bytes' + DICTIONARY_EXTENSION)), train(str(corpus), 2, True))
+
+    assert find_dictionary(str(directory), text_dictionary.id) == text_dictionary
+    with pytest.raises(ValueError, match='not found'):
+        find_dictionary(str(directory), text_dictionary.id ^ 1)
+
+
+def test_other_files_are_refused(tmp_path):
+    path = tmp_path / ('fake' + DICTIONARY_EXTENSION)
+    path.write_bytes(b'\x00' * 64)
+
+    with pytest.raises(ValueError, match='Not a dictionary'):
+        read_dictionary(str(path))
+
+
+def test_archive_encoded_with_dictionary_round_trip(run_tool, corpus, tmp_path):
+    dictionary_path = tmp_path / ('lt' + DICTIONARY_EXTENSION)
+    trained = run_tool('Dictionary.py', '-f', corpus, '-o', dictionary_path)
+    assert trained.returncode == 0, trained.stderr
+    source = tmp_path / 'note.txt'
+    source.write_text('Kaunas yra antras pagal dydį Lietuvos miestas. ' * 20, encoding='utf8')
+
+    encoded = run_tool('HuffmanPartial.py', '-f', source, '-o', tmp_path, '-e', '--dict', dictionary_path)
+    assert encoded.returncode == 0, encoded.stderr
+    archive = tmp_path / 'note.gm'
+
+    (tmp_path / 'decoded').mkdir()
+    missing = run_tool('HuffmanPartial.py', '-f', archive, '-o', tmp_path / 'decoded', '-d')
+    assert missing.returncode != 0
+    assert b'path of dictionary is required' in missing.stderr
+
+    decoded = run_tool('HuffmanPartial.py', '-f', archive, '-o', tmp_path / 'decoded', '-d', '--dict', tmp_path)
+    assert decoded.returncode == 0, decoded.stderr
+    assert (tmp_path / 'decoded' / 'note.txt').read_bytes() == source.read_bytes()
@@ -0,0 +1,68 @@
+from collections import Counter
+
+import pytest
+
+from Histogram import count_segments, count_symbols, get_complete_end, split_ranges
+
+TEXT = 'aą中\U0001f600b' * 7
+
+
+@pytest.mark.parametrize('data, end', [
+    (b'', 0),
+    (b'abc', 3),
+    ('aą'.encode(), 3),
+    ('aą'.encode()[:2], 1),
+    ('a中'.encode()[:2], 1),
+    ('a中'.encode()[:3], 1),
+    ('a\U0001f600'.encode()[:4], 1),
+    ('a\U0001f600'.encode(), 5),
+    # stray continuation bytes are left for decoder to refuse
+    (b'a\x80\x80\x80\x80', 5),
+])
+def test_complete_end(data, end):
+    assert get_complete_end(data) == end
+
+
+def test_complete_end_at_every_cut():
+    data = TEXT.encode()
+    for cut in range(len(data) + 1):
+        end = get_complete_end(data[:cut])
+        assert cut - 3 <= end <= cut
+        data[:end].decode('utf8')
+
+
+@pytest.mark.parametrize('range_size', [1, 2, 3, 5, 8, 1000])
+def test_ranges_never_split_characters(range_size):
+    data = TEXT.encode()
+    ranges = split_ranges(data, range_size)
+
+    assert ranges[0][0] == 0 and ranges[-1][1] == len(data)
+    assert all(end == next_start for (_, end), (next_start, _) in zip(ranges, ranges[1:]))
+    assert ''.join(data[start:end].decode('utf8') for start, end in ranges) == TEXT
+
+
+def test_binary_ranges_have_exact_size():
+    data = TEXT.encode()
+
+    ranges = split_ranges(data, 4, binary=True)
+
+    assert ranges == [(start, min(start + 4, len(data))) for start in range(0, len(data), 4)]
+
+
+@pytest.mark.parametrize('binary', [False, True])
+def test_counts_of_ranges_equal_counts_of_file(tmp_path, binary):
+    path = tmp_path / 'text.txt'
+    path.write_text(TEXT * 50, encoding='utf8')
+    expected = Counter(path.read_bytes() if binary else TEXT * 50)
+
+    assert count_symbols(str(path), 2, binary, range_size=7) == (dict(expected), sum(expected.values()))
+    segments = count_segments(str(path), 2, binary, segment_size=7)
+    assert sum((frequencies for _, _, frequencies in segments), Counter()) == expected
+
+
+def test_empty_file_has_no_symbols(tmp_path):
+    path = tmp_path / 'empty.txt'
+    path.write_bytes(b'')
+
+    assert count_symbols(str(path), 2) == ({}, 0)
+    assert count_segments(str(path), 2) == []
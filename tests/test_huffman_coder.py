@@ -0,0 +1,84 @@
+import random
+
+import pytest
+
+from HuffmanCoder import BYTE_ESCAPE, ESCAPE, ESCAPE_BITS, TABLE_BITS, HuffmanCoder
+from HuffmanTree import HuffmanTree, get_canonical_codes, sort_canonical
+
+
+def get_coder(frequencies, binary=False) -> HuffmanCoder:
+    tree = HuffmanTree(sorted(frequencies.items(), key=lambda item: item[1]))
+    tree.build()
+
+    return HuffmanCoder(get_canonical_codes(sort_canonical(tree.get_code_lengths())), binary)
+
+
+def get_bits(chunk) -> str:
+    # chunk is little endian integer, sentinel 1 marks start of codes
+    return bin(int.from_bytes(chunk, 'little'))[3:]
+
+
+@pytest.mark.parametrize('text', ['', 'a', 'abracadabra', 'žąsis ir ančiukas ' * 50],
+                         ids=['empty', 'one', 'short', 'long'])
+def test_round_trip(text):
+    coder = get_coder({symbol: 1 + index for index, symbol in enumerate('abcdrž ąsinčuk')})
+
+    assert coder.decode(coder.encode(text)) == text
+
+
+def test_long_codes_use_secondary_tables():
+    # fibonacci counts give codes up to 24 bits
+    counts = [1, 1]
+    while len(counts) < 25:
+        counts.append(counts[-1] + counts[-2])
+    symbols = [chr(ord('A') + index) for index in range(len(counts))]
+    coder = get_coder(dict(zip(symbols, counts)))
+    text = ''.join(random.Random(1).choice(symbols) for _ in range(2000)) + symbols[0] + symbols[1]
+
+    assert max(map(len, coder.codes.values())) > TABLE_BITS
+    assert coder.long_tables
+    assert coder.decode(coder.encode(text)) == text
+    assert coder.decode_bits(get_bits(coder.encode(text))) == text
+
+
+@pytest.mark.parametrize('missing', ['x', 'ą', '中', '\U0001f600'])
+def test_missing_character_is_escaped_with_raw_code_point(missing):
+    coder = get_coder({'a': 50, 'b': 20, 'c': 5, ESCAPE: 1})
+    text = 'abc' + missing + 'cab'
+    bits = get_bits(coder.encode(text))
+
+    assert len(bits) == sum(len(coder.codes[symbol]) for symbol in 'abccab') + len(coder.codes[ESCAPE]) + ESCAPE_BITS
+    assert coder.decode(coder.encode(text)) == text
+    assert coder.decode_bits(bits) == text
+
+
+def test_escape_longer_than_table_bits_is_decoded():
+    frequencies = {chr(ord('a') + index): 1 << index for index in range(16)}
+    frequencies[ESCAPE] = 1
+    coder = get_coder(frequencies)
+    text = 'pa\U0001f600b' * 10
+
+    assert len(coder.codes[ESCAPE]) > TABLE_BITS
+    assert coder.decode(coder.encode(text)) == text
+
+
+def test_missing_character_without_escape_is_refused():
+    coder = get_coder({'a': 2, 'b': 1})
+
+    with pytest.raises(KeyError):
+        coder.encode('abc')
+
+
+def test_missing_byte_is_escaped_in_byte_mode():
+    coder = get_coder({0: 100, 32: 40, 255: 10, BYTE_ESCAPE: 1}, binary=True)
+    data = bytes([0, 32, 7, 255, 0, 128, 32])
+
+    assert coder.decode(coder.encode(data)) == data
+
+
+def test_all_bytes_round_trip_in_byte_mode():
+    generator = random.Random(2)
+    data = bytes(generator.randrange(256) for _ in range(5000))
+    coder = get_coder({value: data.count(value) for value in set(data)}, binary=True)
+
+    assert coder.decode(coder.encode(data)) == data
@@ -0,0 +1,141 @@
+import random
+
+import pytest
+
+from Archive import FOOTER, HEADER, INDEX, INDEX_ENTRY, IndexEntry
+
+
+def get_text(size, seed=1) -> str:
+    generator = random.Random(seed)
+    words = 'Lietuva Vilnius Kaunas upė miškas ežeras namas kelias žmonės diena naktis vasara žiema'.split()
+    lines = []
+    while sum(map(len, lines)) < size:
+        lines.append(' '.join(generator.choice(words) for _ in range(generator.randrange(3, 12))))
+
+    return '\n'.join(lines)
+
+
+@pytest.fixture
+def source(tmp_path):
+    path = tmp_path / 'text.txt'
+    path.write_text(get_text(60000), encoding='utf8')
+
+    return path
+
+
+def encode(run_tool, source, output, *flags):
+    encoded = run_tool('HuffmanPartial.py', '-f', source, '-o', output, '-e', '-c', 8192, *flags)
+    assert encoded.returncode == 0, encoded.stderr
+
+    return output / (source.name.split('.', 1)[0] + '.gm')
+
+
+@pytest.mark.parametrize('flags, codec', [
+    ([], 'huffman'),
+    (['-b'], 'huffman'),
+    (['-a'], 'huffman'),
+    (['-n', '8'], 'huffman'),
+    (['-w', 'words', '-v', '16'], 'huffman'),
+    (['-z', '3'], 'matches'),
+    (['-u', 'arithmetic'], 'arithmetic'),
+    (['-u', 'ans'], 'ans'),
+    (['-u', 'context', '-q', 'fast'], 'context'),
+    (['-u', 'stored'], 'stored'),
+])
+def test_round_trip(run_tool, source, tmp_path, flags, codec):
+    encoded = run_tool('HuffmanPartial.py', '-f', source, '-o', tmp_path, '-e', '-c', 8192, *flags)
+    assert encoded.returncode == 0, encoded.stderr
+    codecs = encoded.stdout.decode().split('Chunks by codec: ')[1].split('\n')[0].split(', ')
+    # chunk is coded by the chosen coder unless storing it is cheaper
+    assert codec in {name.split()[0] for name in codecs}
+    assert {name.split()[0] for name in codecs} <= {codec, 'stored'}
+    archive = tmp_path / 'text.gm'
+    (tmp_path / 'decoded').mkdir()
+
+    assert run_tool('HuffmanPartial.py', '-f', archive, '-t').returncode == 0
+    decoded = run_tool('HuffmanPartial.py', '-f', archive, '-o', tmp_path / 'decoded', '-d')
+    assert decoded.returncode == 0, decoded.stderr
+    assert (tmp_path / 'decoded' / source.name).read_bytes() == source.read_bytes()
+
+
+def test_standard_streams_round_trip(run_tool, source):
+    encoded = run_tool('HuffmanPartial.py', '-f', '-', '-o', '-', '-e', '-c', 8192, stdin=source.read_bytes())
+    assert encoded.returncode == 0, encoded.stderr
+
+    decoded = run_tool('HuffmanPartial.py', '-f', '-', '-o', '-', '-d', stdin=encoded.stdout)
+    assert decoded.returncode == 0, decoded.stderr
+    assert decoded.stdout == source.read_bytes()
+
+
+def get_cjk_text(size, seed=1) -> str:
+    generator = random.Random(seed)
+    # far more characters than codes of 6 bits hold
+    characters = [chr(code) for code in range(0x4e00, 0x4e00 + 300)]
+
+    return '\n'.join(''.join(generator.choice(characters) for _ in range(40)) for _ in range(size // 40))
+
+
+@pytest.mark.parametrize('stream', [False, True])
+def test_block_tables_escape_symbols_beyond_length_limit(run_tool, tmp_path, stream):
+    data = get_cjk_text(30000).encode()
+    if stream:
+        encoded = run_tool('HuffmanPartial.py', '-f', '-', '-o', '-', '-e', '-c', 8192, '-n', 6, stdin=data)
+        assert encoded.returncode == 0, encoded.stderr
+        decoded = run_tool('HuffmanPartial.py', '-f', '-', '-o', '-', '-d', stdin=encoded.stdout)
+        assert decoded.returncode == 0, decoded.stderr
+        assert decoded.stdout == data
+        return
+
+    source = tmp_path / 'cjk.txt'
+    source.write_bytes(data)
+    archive = encode(run_tool, source, tmp_path, '-a', '-n', 6)
+    (tmp_path / 'decoded').mkdir()
+    decoded = run_tool('HuffmanPartial.py', '-f', archive, '-o', tmp_path / 'decoded', '-d')
+    assert decoded.returncode == 0, decoded.stderr
+    assert (tmp_path / 'decoded' / source.name).read_bytes() == data
+
+
+def test_line_range_is_extracted(run_tool, source, tmp_path):
+    archive = encode(run_tool, source, tmp_path)
+    (tmp_path / 'range').mkdir()
+    extracted = run_tool('HuffmanPartial.py', '-f', archive, '-o', tmp_path / 'range', '-x', '-r', '100:250', '-l')
+    assert extracted.returncode == 0, extracted.stderr
+
+    lines = source.read_text(encoding='utf8').split('\n')
+    output = list((tmp_path / 'range').iterdir())
+    assert len(output) == 1
+    assert output[0].read_text(encoding='utf8') == '\n'.join(lines[100:250]) + '\n'
+
+
+@pytest.mark.parametrize('flags', [[], ['-z', '1'], ['-u', 'ans'], ['-w', 'words', '-v', '16']])
+def test_corrupted_archive_fails_test(run_tool, source, tmp_path, flags):
+    archive = encode(run_tool, source, tmp_path, *flags)
+    data = archive.read_bytes()
+    generator = random.Random(7)
+    header_size = HEADER.size + HEADER.unpack_from(data)[3]
+    index_offset = FOOTER.unpack_from(data, len(data) - FOOTER.size)[0]
+    # flips in header, in chunks and in index
+    positions = [generator.randrange(header_size) for _ in range(3)] + \
+        [generator.randrange(header_size, index_offset) for _ in range(5)] + \
+        [generator.randrange(index_offset, len(data)) for _ in range(3)]
+    for position in positions:
+        corrupted = bytearray(data)
+        corrupted[position] ^= 1 << generator.randrange(8)
+        archive.write_bytes(bytes(corrupted))
+
+        tested = run_tool('HuffmanPartial.py', '-f', archive, '-t')
+        assert tested.returncode == 1, (position, tested.stderr)
+        assert b'Traceback' not in tested.stderr
+
+
+def test_wrong_line_count_in_index_fails_test(run_tool, source, tmp_path):
+    archive = encode(run_tool, source, tmp_path)
+    data = bytearray(archive.read_bytes())
+    position = FOOTER.unpack_from(data, len(data) - FOOTER.size)[0] + INDEX.size
+    entry = IndexEntry(*INDEX_ENTRY.unpack_from(data, position))
+    data[position:position + INDEX_ENTRY.size] = INDEX_ENTRY.pack(*entry._replace(lines=entry.lines + 1))
+    archive.write_bytes(bytes(data))
+
+    tested = run_tool('HuffmanPartial.py', '-f', archive, '-t')
+    assert tested.returncode == 1
+    assert b'Line count mismatch' in tested.stderr
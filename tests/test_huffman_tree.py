@@ -0,0 +1,126 @@
+import itertools
+import random
+from collections import Counter
+
+import pytest
+
+from HuffmanTree import HuffmanTree, get_canonical_codes, limit_code_lengths, sort_canonical
+
+
+def get_baseline_codes(weighted_symbols) -> dict:
+    # node based tree of the first version: nodes are sorted by parent presence, probability and creation,
+    # the two first are merged and the heavier child gets bit 1
+    nodes = [{'symbol': symbol, 'weight': weight, 'created': created, 'parent': None, 'bit': ''}
+             for created, (symbol, weight) in enumerate(weighted_symbols)]
+    while sum(1 for node in nodes if node['parent'] is None) > 1:
+        nodes.sort(key=lambda node: (node['parent'] is not None, node['weight'], node['created']))
+        first, second = nodes[0], nodes[1]
+        parent = {'symbol': None, 'weight': first['weight'] + second['weight'], 'created': len(nodes),
+                  'parent': None, 'bit': ''}
+        first['parent'] = second['parent'] = parent
+        first['bit'], second['bit'] = ('1', '0') if first['weight'] > second['weight'] else ('0', '1')
+        nodes.append(parent)
+
+    codes = {}
+    for leaf in (node for node in nodes if node['symbol'] is not None):
+        code, node = '', leaf
+        while node['parent'] is not None:
+            code, node = node['bit'] + code, node['parent']
+        codes[leaf['symbol']] = code or '0'
+
+    return codes
+
+
+def get_weighted_symbols(text) -> list:
+    return sorted(Counter(text).items(), key=lambda item: item[1])
+
+
+def get_cost(frequencies, code_lengths) -> int:
+    return sum(count * code_lengths[symbol] for symbol, count in frequencies.items())
+
+
+@pytest.mark.parametrize('text', [
+    'a',
+    'ab',
+    'abracadabra',
+    'aabbccdd',
+    'Lietuva, Vilnius ir Kaunas. Lietuvos upė – Nemunas; ąžuolas.',
+    ''.join(random.Random(3).choice('abcdefgh') for _ in range(500)),
+])
+def test_codes_match_baseline_tie_breaking(text):
+    weighted_symbols = get_weighted_symbols(text)
+    tree = HuffmanTree(weighted_symbols)
+    tree.build()
+
+    assert tree.get_codes() == get_baseline_codes(weighted_symbols)
+
+
+def test_code_lengths_match_codes():
+    tree = HuffmanTree(get_weighted_symbols('mississippi river banks'))
+    tree.build()
+
+    assert tree.get_code_lengths() == {symbol: len(code) for symbol, code in tree.get_codes().items()}
+
+
+def test_empty_tree_has_no_codes():
+    tree = HuffmanTree([])
+    tree.build()
+
+    assert tree.get_codes() == {} and tree.get_code_lengths() == {}
+
+
+def test_canonical_codes_are_prefix_free():
+    code_lengths = {'a': 1, 'b': 3, 'c': 3, 'd': 3, 'e': 4, 'f': 4}
+    codes = get_canonical_codes(sort_canonical(code_lengths))
+
+    assert {symbol: len(code) for symbol, code in codes.items()} == code_lengths
+    assert not any(first != second and second.startswith(first)
+                   for first, second in itertools.permutations(codes.values(), 2))
+
+
+def get_minimal_cost(frequencies, max_length) -> int:
+    # every assignment of lengths which fits Kraft inequality, only small alphabets
+    best = None
+    for lengths in itertools.product(range(1, max_length + 1), repeat=len(frequencies)):
+        if sum(2.0 ** -length for length in lengths) <= 1:
+            cost = sum(count * length for count, length in zip(frequencies.values(), lengths))
+            best = cost if best is None else min(best, cost)
+
+    return best
+
+
+@pytest.mark.parametrize('seed', range(8))
+@pytest.mark.parametrize('max_length', [3, 4])
+def test_limited_code_lengths_are_minimal(seed, max_length):
+    generator = random.Random(seed)
+    frequencies = {symbol: generator.choice([1, 2, 3, 10, 100, 1000]) for symbol in 'abcdefg'}
+    code_lengths = limit_code_lengths(frequencies, max_length)
+
+    assert set(code_lengths) == set(frequencies)
+    assert max(code_lengths.values()) <= max_length
+    assert sum(2.0 ** -length for length in code_lengths.values()) <= 1
+    assert get_cost(frequencies, code_lengths) == get_minimal_cost(frequencies, max_length)
+
+
+def test_limit_above_huffman_depth_keeps_huffman_cost():
+    # fibonacci weights make the deepest unlimited tree
+    frequencies = dict(zip('abcdefghij', [1, 1, 2, 3, 5, 8, 13, 21, 34, 55]))
+    tree = HuffmanTree(sorted(frequencies.items(), key=lambda item: item[1]))
+    tree.build()
+    free_lengths = tree.get_code_lengths()
+    limited = limit_code_lengths(frequencies, 5)
+
+    assert max(free_lengths.values()) == 9
+    assert max(limited.values()) <= 5
+    assert get_cost(frequencies, limit_code_lengths(frequencies, 9)) == get_cost(frequencies, free_lengths)
+    assert get_cost(frequencies, limited) > get_cost(frequencies, free_lengths)
+
+
+def test_too_many_symbols_for_length_are_refused():
+    with pytest.raises(ValueError, match='cannot be coded'):
+        limit_code_lengths({symbol: 1 for symbol in 'abcde'}, 2)
+
+
+@pytest.mark.parametrize('frequencies, expected', [({}, {}), ({'a': 5}, {'a': 1})])
+def test_limit_of_tiny_alphabets(frequencies, expected):
+    assert limit_code_lengths(frequencies, 4) == expected
@@ -0,0 +1,85 @@
+import random
+
+import pytest
+
+from Matches import LEVELS, MIN_MATCH, MatchFinder, decode_matches, read_varints, write_varint
+
+TEXT = b'the quick brown fox jumps over the lazy dog, the quick brown cat sleeps. ' * 50
+
+
+def get_random_bytes(size, seed=1) -> bytes:
+    generator = random.Random(seed)
+
+    return bytes(generator.randrange(256) for _ in range(size))
+
+
+def test_varints_round_trip():
+    stream = bytearray()
+    values = [0, 1, 127, 128, 300, 1 << 20, (1 << 35) + 7]
+    for value in values:
+        write_varint(stream, value)
+
+    assert read_varints(stream) == values
+
+
+@pytest.mark.parametrize('level', sorted(LEVELS))
+def test_round_trip_every_level(level):
+    encoded = MatchFinder(level).encode(TEXT)
+
+    assert len(encoded) < len(TEXT) // 4
+    assert MatchFinder.decode(encoded, len(TEXT)) == TEXT
+
+
+@pytest.mark.parametrize('data', [
+    b'',
+    b'abc',
+    b'a' * 1000,
+    b'ab' * 500 + b'c',
+    get_random_bytes(5000),
+    get_random_bytes(2000) * 3,
+])
+def test_round_trip_edge_cases(data):
+    assert MatchFinder.decode(MatchFinder().encode(data), len(data)) == data
+
+
+def test_matches_are_limited_by_window():
+    data = get_random_bytes(3000)
+    literals, _, _ = MatchFinder(window=1000).find_matches(data + data)
+
+    assert len(literals) == len(data) * 2
+
+
+def test_overlapping_match_repeats_bytes():
+    literals, lengths, distances = MatchFinder().find_matches(b'xyz' * 100)
+
+    assert literals == b'xyz'
+    assert read_varints(lengths) == [3, 297 - MIN_MATCH]
+    assert read_varints(distances) == [3 - 1]
+
+
+def test_output_longer_than_size_is_refused():
+    encoded = MatchFinder().encode(TEXT)
+
+    with pytest.raises(ValueError, match='more than'):
+        decode_matches(encoded, len(TEXT) - 1)
+
+
+@pytest.mark.parametrize('cut', [1, 10, 300])
+def test_truncated_chunk_is_refused(cut):
+    encoded = MatchFinder().encode(TEXT)
+
+    with pytest.raises(ValueError, match='truncated'):
+        decode_matches(encoded[:-cut], len(TEXT))
+
+
+def test_corrupted_chunks_never_decode_out_of_bounds():
+    encoded = MatchFinder().encode(TEXT)
+    generator = random.Random(3)
+    for _ in range(200):
+        corrupted = bytearray(encoded)
+        corrupted[generator.randrange(len(corrupted))] ^= 1 << generator.randrange(8)
+        try:
+            decoded = decode_matches(bytes(corrupted), len(TEXT))
+        except ValueError:
+            continue
+        assert len(decoded) <= len(TEXT)
@@ -0,0 +1,147 @@
+import os
+
+import pytest
+
+from Archive import Member
+from Members import MemberWriter, find_member, find_members, get_member_path, is_multiple_input, read_members, \
+    write_member
+
+FILES = {
+    'a.txt': b'first file\n' * 100,
+    'empty.txt': b'',
+    'logs/2020/app.txt': b'log line\n' * 3000,
+    'logs/2020/app.bin': bytes(range(256)) * 40,
+    'logs/other.txt': b'x',
+}
+
+
+@pytest.fixture
+def tree(tmp_path):
+    root = tmp_path / 'tree'
+    for name, data in FILES.items():
+        path = root.joinpath(*name.split('/'))
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_bytes(data)
+    (root / 'logs' / 'none').mkdir()
+
+    return root
+
+
+def read_tree(root) -> dict:
+    files = {}
+    for directory, directories, names in os.walk(root):
+        for name in names:
+            path = os.path.join(directory, name)
+            with open(path, 'rb') as rf:
+                files[os.path.relpath(path, root).replace(os.sep, '/')] = rf.read()
+        if not (directories or names):
+            files[os.path.relpath(directory, root).replace(os.sep, '/') + '/'] = None
+
+    return files
+
+
+def test_existing_file_is_never_a_pattern(tmp_path):
+    path = tmp_path / 'report[1].txt'
+    path.write_bytes(b'data')
+
+    assert not is_multiple_input(str(path))
+    assert is_multiple_input(str(tmp_path / '*.txt'))
+    assert is_multiple_input(str(tmp_path))
+
+
+def test_directory_members(tree):
+    base_path, members = find_members(str(tree))
+
+    assert base_path == str(tree)
+    assert [member.name for member in members] == sorted(list(FILES) + ['logs/none/'])
+    assert {member.name: member.size for member in members if member.name in FILES} == \
+        {name: len(data) for name, data in FILES.items()}
+
+
+def test_pattern_members(tree):
+    base_path, members = find_members(str(tree / 'logs' / '**' / '*.txt'))
+
+    assert base_path == str(tree / 'logs')
+    assert [member.name for member in members] == ['2020/app.txt', 'other.txt']
+
+
+def test_pattern_matching_nothing_is_refused(tree):
+    with pytest.raises(ValueError, match='No files match'):
+        find_members(str(tree / '*.csv'))
+
+
+@pytest.mark.parametrize('name', ['../up.txt', '/root.txt', 'a//b.txt', 'a/../../b.txt'])
+def test_unsafe_member_names_are_refused(tmp_path, name):
+    with pytest.raises(ValueError, match='Unsafe'):
+        get_member_path(str(tmp_path), Member(name, 1, 0.0, 0.0))
+
+
+@pytest.mark.parametrize('chunk_size', [1, 7, 4096, 1 << 20])
+def test_members_are_read_in_chunks(tree, chunk_size):
+    base_path, members = find_members(str(tree))
+    chunks = list(read_members(base_path, members, chunk_size))
+
+    assert all(len(chunk) == chunk_size for chunk in chunks[:-1])
+    assert b''.join(chunks) == b''.join(FILES[member.name] for member in members if member.name in FILES)
+
+
+def test_writer_splits_content_at_member_sizes(tree, tmp_path):
+    base_path, members = find_members(str(tree))
+    output = tmp_path / 'output'
+    with MemberWriter(str(output), members) as writer:
+        for chunk in read_members(base_path, members, 1000):
+            writer.write(chunk)
+
+    assert read_tree(output) == read_tree(tree)
+
+
+def test_writer_refuses_content_of_wrong_length(tree, tmp_path):
+    base_path, members = find_members(str(tree))
+    content = b''.join(read_members(base_path, members, 1 << 20))
+
+    with pytest.raises(ValueError, match='shorter'):
+        with MemberWriter(str(tmp_path / 'short'), members) as writer:
+            writer.write(content[:-1])
+    with pytest.raises(ValueError, match='longer'):
+        with MemberWriter(str(tmp_path / 'long'), members) as writer:
+            writer.write(content + b'!')
+
+
+def test_member_is_found_with_offset_of_its_content(tree):
+    _, members = find_members(str(tree))
+    member, start = find_member(members, 'logs/2020/app.txt')
+
+    assert member.size == len(FILES['logs/2020/app.txt'])
+    assert start == sum(member.size for member in members[:members.index(member)])
+    with pytest.raises(ValueError, match='not found'):
+        find_member(members, 'logs/2021/app.txt')
+
+
+def test_single_member_is_written_under_its_base_name(tmp_path):
+    member = Member('logs/2020/app.txt', 4, 1000000.0, 2000000.0)
+    path = write_member(str(tmp_path / 'single'), member, b'data')
+
+    assert path == str(tmp_path / 'single' / 'app.txt')
+    assert (tmp_path / 'single' / 'app.txt').read_bytes() == b'data'
+    assert (tmp_path / 'single' / 'app.txt').stat().st_mtime == 2000000.0
+    assert (tmp_path / write_member(str(tmp_path), Member('logs/none/', 0, 0.0, 0.0))).is_dir()
+
+
+@pytest.mark.parametrize('flags', [[], ['-z', '1']])
+def test_directory_archive_round_trip(run_tool, tree, tmp_path, flags):
+    encoded = run_tool('HuffmanPartial.py', '-f', tree, '-o', tmp_path, '-e', '-c', 4096, *flags)
+    assert encoded.returncode == 0, encoded.stderr
+    archive = tmp_path / 'tree.gm'
+
+    listed = run_tool('HuffmanPartial.py', '-f', archive, '-i')
+    assert 'logs/none/' in listed.stdout.decode()
+
+    decoded = run_tool('HuffmanPartial.py', '-f', archive, '-o', tmp_path / 'decoded', '-d')
+    assert decoded.returncode == 0, decoded.stderr
+    assert read_tree(tmp_path / 'decoded' / 'tree') == read_tree(tree)
+
+    extracted = run_tool(
+        'HuffmanPartial.py', '-f', archive, '-o', tmp_path / 'single', '-x', '-g', 'logs/2020/app.bin'
+    )
+    assert extracted.returncode == 0, extracted.stderr
+    assert (tmp_path / 'single' / 'app.bin').read_bytes() == FILES['logs/2020/app.bin']
@@ -0,0 +1,87 @@
+import os
+import random
+
+import pytest
+
+from HuffmanCoder import BYTE_ESCAPE, ESCAPE
+from Sampling import SAMPLE_BLOCK_SIZE, SAMPLING_RANDOM, SAMPLING_STRATIFIED, Sampler, fold_rare_symbols, \
+    get_code_lengths
+
+
+@pytest.fixture
+def text_file(tmp_path):
+    generator = random.Random(5)
+    path = tmp_path / 'text.txt'
+    # 2 MB of the same distribution, codes of the first blocks fit the rest
+    path.write_text(''.join(generator.choice('aaaabbbcčdeėęfgž ') for _ in range(2 << 20)), encoding='utf8')
+
+    return str(path)
+
+
+def test_sampling_stops_once_loss_is_small(text_file):
+    sampler = Sampler(text_file, budget=1 << 20)
+    frequencies = sampler.estimate_frequencies()
+
+    assert sampler.loss is not None and sampler.loss <= sampler.max_loss
+    assert sampler.sampled < 1 << 20
+    assert set(frequencies) == set('abcčdeėęfgž ') | {ESCAPE}
+
+
+def test_sampling_spends_budget_if_loss_stays_high(text_file):
+    sampler = Sampler(text_file, budget=8 * SAMPLE_BLOCK_SIZE, max_loss=-1)
+    sampler.estimate_frequencies()
+
+    assert sampler.sampled == 8 * SAMPLE_BLOCK_SIZE
+
+
+def test_escape_counts_symbols_seen_once():
+    assert Sampler.with_escape({'a': 5, 'b': 1, 'c': 1}, ESCAPE) == {'a': 5, 'b': 1, 'c': 1, ESCAPE: 2}
+    assert Sampler.with_escape({0: 5}, BYTE_ESCAPE) == {0: 5, BYTE_ESCAPE: 1}
+
+
+def test_bytes_are_sampled_in_byte_mode(tmp_path):
+    path = tmp_path / 'data.bin'
+    path.write_bytes(bytes(range(256)) * 1024)
+    frequencies = Sampler(str(path), budget=4 * SAMPLE_BLOCK_SIZE, binary=True).estimate_frequencies()
+
+    assert set(frequencies) == set(range(256)) | {BYTE_ESCAPE}
+
+
+@pytest.mark.parametrize('mode', [SAMPLING_STRATIFIED, SAMPLING_RANDOM])
+def test_offsets_are_repeatable_and_inside_file(text_file, mode):
+    offsets = Sampler(text_file, budget=16 * SAMPLE_BLOCK_SIZE, mode=mode, seed=3).get_offsets()
+
+    assert offsets == Sampler(text_file, budget=16 * SAMPLE_BLOCK_SIZE, mode=mode, seed=3).get_offsets()
+    assert len(offsets) == 16
+    assert all(0 <= offset <= os.path.getsize(text_file) - SAMPLE_BLOCK_SIZE for offset in offsets)
+
+
+def test_stratified_offsets_cover_every_stratum(text_file):
+    offsets = Sampler(text_file, budget=16 * SAMPLE_BLOCK_SIZE).get_offsets()
+    stratum_size = (os.path.getsize(text_file) - SAMPLE_BLOCK_SIZE) / 16
+
+    assert sorted(int(offset // stratum_size) for offset in offsets) == list(range(16))
+
+
+def test_block_edges_inside_characters_are_dropped(tmp_path):
+    path = tmp_path / 'text.txt'
+    path.write_text('ž' * SAMPLE_BLOCK_SIZE, encoding='utf8')
+    sampler = Sampler(str(path))
+    with open(str(path), 'rb') as rf:
+        block = sampler.read_block(rf, 1)
+
+    assert block == 'ž' * (SAMPLE_BLOCK_SIZE // 2 - 1)
+
+
+def test_unknown_mode_is_refused(text_file):
+    with pytest.raises(ValueError, match='Unknown sampling mode'):
+        Sampler(text_file, mode='everything')
+
+
+def test_rare_symbols_fold_into_escape():
+    frequencies = {'a': 50, 'b': 20, 'c': 3, 'd': 2, 'e': 1}
+    folded = fold_rare_symbols(frequencies, 2, ESCAPE)
+
+    assert folded == {'a': 50, 'b': 20, 'c': 3, ESCAPE: 3}
+    assert fold_rare_symbols(folded, 2, ESCAPE) is folded
+    assert max(get_code_lengths(frequencies, 2, ESCAPE).values()) == 2
@@ -0,0 +1,73 @@
+from collections import Counter
+
+import pytest
+
+from Tokenizer import DIPHTHONGS, MAX_TOKEN_LENGTH, TOKENS_DIGRAPHS, TOKENS_NGRAMS, TOKENS_WORDS, Tokenizer, \
+    build_tokenizer
+
+TEXT = 'Lietuva, Vilnius ir Kaunas.\nLietuvos upė – Nemunas; ąžuolas 2020 m.'
+
+
+@pytest.mark.parametrize('mode, pieces', [
+    (TOKENS_WORDS, ['Lietuva', ',', ' ', 'Vilnius', ' ', 'ir', ' ', 'Kaunas', '.', '\n']),
+    (TOKENS_NGRAMS, ['Lie', 'tuv', 'a', ',', ' ', 'Vil', 'niu', 's', ' ', 'ir', ' ', 'Kau', 'nas', '.', '\n']),
+    (TOKENS_DIGRAPHS, ['Li', 'et', 'uv', 'a', ',', ' ', 'Vi', 'ln', 'iu', 's', ' ', 'ir', ' ', 'Ka', 'un', 'as', '.',
+                       '\n']),
+])
+def test_split_pieces(mode, pieces):
+    assert Tokenizer(mode).split(TEXT)[:len(pieces)] == pieces
+
+
+@pytest.mark.parametrize('mode', [TOKENS_WORDS, TOKENS_NGRAMS, TOKENS_DIGRAPHS])
+def test_split_covers_whole_text(mode):
+    assert ''.join(Tokenizer(mode).split(TEXT)) == TEXT
+
+
+def test_unknown_mode_is_refused():
+    with pytest.raises(ValueError, match='Unknown tokenizer mode'):
+        Tokenizer('sentences')
+
+
+def test_pieces_missing_in_vocabulary_are_counted_as_characters():
+    tokenizer = Tokenizer(TOKENS_WORDS, {'Lietuva'})
+    tokens = tokenizer.count_tokens(Counter(tokenizer.split('Lietuva Lietuvos')))
+
+    assert tokens['Lietuva'] == 1
+    assert 'Lietuvos' not in tokens
+    assert tokens['L'] == 1 and tokens['s'] == 1 and tokens[' '] == 1
+
+
+def test_vocabulary_keeps_tokens_saving_most_characters():
+    tokenizer = Tokenizer(TOKENS_WORDS)
+    tokenizer.build_vocabulary({'ab': 10, 'abcdef': 3, 'x': 100, 'y' * (MAX_TOKEN_LENGTH + 1): 50}, 1)
+
+    assert tokenizer.vocabulary == {'abcdef'}
+
+
+def test_diphthongs_are_always_digraphs():
+    tokenizer = Tokenizer(TOKENS_DIGRAPHS)
+    tokenizer.build_vocabulary({'ab': 10, 'ie': 1, 'uo': 1}, 1)
+
+    assert tokenizer.vocabulary == {'ab', 'ie', 'uo'}
+    assert set(DIPHTHONGS) >= tokenizer.vocabulary - {'ab'}
+
+
+@pytest.mark.parametrize('mode', [TOKENS_WORDS, TOKENS_NGRAMS])
+def test_built_tokenizer_counts_whole_file(tmp_path, mode):
+    path = tmp_path / 'text.txt'
+    path.write_text(TEXT * 200, encoding='utf8')
+    tokenizer, frequencies, total = build_tokenizer(str(path), 2, mode, 8)
+
+    assert total == len(TEXT) * 200
+    assert len(tokenizer.vocabulary) <= 8
+    assert tokenizer.vocabulary <= set(frequencies)
+
+
+def test_characters_of_tokens_are_coded_when_token_is_split(tmp_path):
+    path = tmp_path / 'text.txt'
+    # every v and s is inside a vocabulary word, a chunk boundary may still split it
+    path.write_text('Lietuva Vilnius ' * 500, encoding='utf8')
+    tokenizer, frequencies, _ = build_tokenizer(str(path), 2, TOKENS_WORDS, 16)
+
+    assert tokenizer.vocabulary == {'Lietuva', 'Vilnius'}
+    assert all(character in frequencies for character in 'LietuvaVilnius')